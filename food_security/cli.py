@@ -1,20 +1,91 @@
 """A lightweight CLI for the food security module."""
 
+from __future__ import annotations
+
 import argparse
 import logging
+import sys
 from pathlib import Path
 
+from food_security.data_reader import HIS_STORE_SUFFIXES, HisFile
+from food_security.fao_api import FAOClient
+from food_security.fao_cache import DEFAULT_FAO_CACHE_PATH, FAOCache
+from food_security.fao_mirror import (
+    DEFAULT_FAO_MIRROR_PATH,
+    FAO_MIRROR_DATASETS,
+    FAOMirror,
+)
 from food_security.main import FoodSecurity
 
 logger = logging.getLogger(__name__)
 
-parser = argparse.ArgumentParser()
-parser.add_argument("path", help="Path to config file")
+parser = argparse.ArgumentParser(prog="food_security")
+subparsers = parser.add_subparsers(dest="command", required=True)
 
+run_parser = subparsers.add_parser("run", help="Run the food security model")
+run_parser.add_argument("path", help="Path to config file")
+run_parser.add_argument(
+    "--fao-cache",
+    type=Path,
+    default=DEFAULT_FAO_CACHE_PATH,
+    help="Path to the on-disk cache of FAO responses",
+)
+run_parser.add_argument(
+    "--no-fao-cache",
+    action="store_true",
+    help="Always request FAO data from the FAOSTAT API",
+)
+run_parser.add_argument(
+    "--fao-mirror",
+    type=Path,
+    default=DEFAULT_FAO_MIRROR_PATH,
+    help="Path to the local mirror of FAOSTAT bulk downloads",
+)
+run_parser.add_argument(
+    "--offline",
+    action="store_true",
+    help="Only use FAO data from the cache, never call the FAOSTAT API",
+)
 
-if __name__ == "__main__":
-    args = parser.parse_args()
-    config_file = Path(args[0])
+import_parser = subparsers.add_parser(
+    "fao-import",
+    help="Import a FAOSTAT bulk download into the local mirror",
+)
+import_parser.add_argument("dataset", choices=list(FAO_MIRROR_DATASETS))
+import_parser.add_argument("path", help="Path to the bulk CSV or ZIP file")
+import_parser.add_argument(
+    "--fao-mirror",
+    type=Path,
+    default=DEFAULT_FAO_MIRROR_PATH,
+    help="Path to the local mirror of FAOSTAT bulk downloads",
+)
+
+convert_parser = subparsers.add_parser(
+    "his-convert",
+    help="Convert RIBASIM HIS files to chunked Zarr or NetCDF stores",
+)
+convert_parser.add_argument("paths", nargs="+", help="Paths to HIS files")
+convert_parser.add_argument(
+    "--format",
+    choices=list(HIS_STORE_SUFFIXES),
+    default="zarr",
+    help="Format of the converted store",
+)
+convert_parser.add_argument(
+    "--force",
+    action="store_true",
+    help="Also convert HIS files that have an up to date store",
+)
+
+
+def run(
+    config_file: Path,
+    fao_cache: Path | None = DEFAULT_FAO_CACHE_PATH,
+    fao_mirror: Path | None = DEFAULT_FAO_MIRROR_PATH,
+    *,
+    offline: bool = False,
+) -> None:
+    """Run the food security model for a TOML configuration."""
     if not config_file.exists():
         err_msg = "Config file not found"
         raise FileNotFoundError(err_msg)
@@ -22,5 +93,50 @@ if __name__ == "__main__":
         err_msg = f"Expected a TOML file configuration, but got {config_file}"
         raise ValueError(err_msg)
 
-    fs = FoodSecurity(cfg_path=config_file)
+    if fao_cache is None and offline:
+        err_msg = "Offline runs need a FAO cache"
+        raise ValueError(err_msg)
+    cache = None if fao_cache is None else FAOCache(fao_cache, offline=offline)
+    mirror = None if fao_mirror is None else FAOMirror(fao_mirror)
+    fao_client = FAOClient(cache=cache, mirror=mirror)
+    fs = FoodSecurity(cfg_path=config_file, fao_client=fao_client)
     fs.run()
+
+
+def fao_import(dataset: str, path: Path, fao_mirror: Path) -> None:
+    """Import a FAOSTAT bulk download that runs then read instead of the API."""
+    if not path.is_file():
+        err_msg = f"FAOSTAT bulk download not found: {path}"
+        raise FileNotFoundError(err_msg)
+    FAOMirror(fao_mirror).import_bulk(dataset, path)
+
+
+def his_convert(paths: list[Path], fmt: str, *, force: bool = False) -> None:
+    """Convert HIS files to stores that HisFile.read prefers over the source."""
+    for path in paths:
+        if not path.is_file():
+            err_msg = f"HIS file not found: {path}"
+            raise FileNotFoundError(err_msg)
+        store = HisFile(path, crop=None).convert(fmt=fmt, force=force)
+        logger.info("%s -> %s", path, store)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point of the food_security command."""
+    logging.basicConfig(level=logging.INFO)
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # food_security config.toml is short for food_security run config.toml
+    if argv and argv[0] not in subparsers.choices and not argv[0].startswith("-"):
+        argv = ["run", *argv]
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        fao_cache = None if args.no_fao_cache else args.fao_cache
+        run(Path(args.path), fao_cache, args.fao_mirror, offline=args.offline)
+    elif args.command == "fao-import":
+        fao_import(args.dataset, Path(args.path), args.fao_mirror)
+    elif args.command == "his-convert":
+        his_convert([Path(p) for p in args.paths], args.format, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ from __future__ import annotations
 import logging
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 from food_security.fao_api import FAOClient
@@ -21,8 +22,7 @@ class FoodProduction(FSBase):
         """Add modeled crops to region GeoDataFrame."""
         config = self.cfg["food_production"]["modelled_crops"]
         file_path = config["path"]
-        crop_data = pd.read_csv(file_path)
-        crop_data = crop_data[crop_data["year"] == self.year]
+        crop_data = self.inputs.read_rows(file_path, "year", self.year)
 
         # Rename region column if region column is not called Name
         if config["region_column"] != "Name":
@@ -35,6 +35,14 @@ class FoodProduction(FSBase):
         if crops is None:
             crops = crop_data["crop_name"].unique()
 
+        # Sum the yield of all crops per region at once, a column per FAO crop name
+        yield_column = config.get("yield_column", "corrected_yield")
+        crop_yields = (
+            crop_data.groupby(by=["Name", "crop_name_fao"])[yield_column]
+            .sum()
+            .unstack("crop_name_fao")
+        )
+        crop_columns = {}
         for crop in crops:
             logger.info("Parsing %s yield from file", crop)
             crop_name = config.get(crop, {}).get("crop_name_fao", None)
@@ -42,21 +50,13 @@ class FoodProduction(FSBase):
                 crop_name = crop_data[crop_data["crop_name"] == crop][
                     "crop_name_fao"
                 ].iloc[0]
-            crop_df = crop_data[crop_data["crop_name_fao"] == crop_name]
-            crop_df = pd.DataFrame(
-                crop_df.groupby(by="Name")[
-                    config.get("yield_column", "corrected_yield")
-                ]
-                .sum()
-                .reset_index(),
-            )
-            crop_df = crop_df.rename(
-                columns={config.get("yield_column", "corrected_yield"): crop}
-            )
-            if not crop_df.empty:
+            if crop_name in crop_yields.columns:
                 logger.info("Adding modelled %s production to regions", crop)
+                crop_columns[crop] = crop_yields[crop_name]
 
-                self.region = self.region.merge(crop_df, how="left", on="Name")
+        # Join the yields of all crops to the regions in one go
+        if crop_columns:
+            self.region = self.region.join(pd.DataFrame(crop_columns), on="Name")
 
     def add_other_crops(self) -> None:
         """Add other crop production."""
@@ -67,6 +67,7 @@ class FoodProduction(FSBase):
             )
             join_column = self.cfg["food_production"]["other_crops"]["region_column"]
             self.region = self.region.merge(other_crops, how="left", on=join_column)
+            self.region = self.items.take_columns(self.region)
         else:
             logger.info("No other crop file found. Pulling other crop data from FAO")
 
@@ -89,12 +90,27 @@ class FoodProduction(FSBase):
             # Set crop and production result to float
             other_crops["Value"] = other_crops["Value"].astype(float)
 
-            for _, row in other_crops.iterrows():
-                # Iterrate over available other crop production data and attach
-                # to region dataframe
-                col_name = f"{row['ITEM Nutrition']}_{row['Item Code']}"
-                self.region[col_name] = self.region["land_ratio"] * row["Value"]
-                self.region[col_name] = self.region[col_name].round(2)
+            # Production of all other crops per region, a column per item. An item
+            # that is given twice keeps its last production
+            production = pd.DataFrame(
+                np.outer(
+                    self.region["land_ratio"].to_numpy(), other_crops["Value"]
+                ).round(2),
+                columns=other_crops["ITEM Nutrition"].astype(str)
+                + "_"
+                + other_crops["Item Code"].astype(str),
+                index=self.region.index,
+            )
+            production = production.loc[
+                :, ~production.columns.duplicated(keep="last")
+            ]
+            self.region = self.region.drop(
+                columns=production.columns.intersection(self.region.columns)
+            )
+            # Move the item columns to the item block, as for other crop files
+            self.region = self.items.take_columns(
+                pd.concat([self.region, production], axis=1)
+            )
 
     def fetch_foastat_production_data(self) -> pd.DataFrame:
         """Fetch the crop and livestock data of the FAO."""
@@ -102,20 +118,7 @@ class FoodProduction(FSBase):
             country_name=self.cfg["main"]["country"],
             year=self.year,
         )
-        conversion_path = (
-            Path(self.cfg["main"]["input_path"])
-            / self.cfg["food_production"]["fao"]["conversion_table"]["path"]
-        )
-
-        if conversion_path.suffix.lower() == ".csv":
-            conversion_table = pd.read_csv(conversion_path)
-        elif conversion_path.suffix.lower() in [".xls", ".xlsx"]:
-            conversion_table = pd.read_excel(
-                conversion_path,
-                sheet_name=self.cfg["food_production"]["fao"]["conversion_table"].get(
-                    "sheet_name", 0
-                ),
-            )
+        conversion_table = self.read_conversion_table()
         # Prepare table for merge, removing duplicates and renaming code column
         conversion_table = _prep_conversion_table(conversion_table)
 
@@ -129,7 +132,4 @@ class FoodProduction(FSBase):
 
     def calculate_region_area(self) -> None:
         """Calculate the area of the region in square meters."""
-        utm = self.region.estimate_utm_crs()
-        gdf = self.region.copy()
-        gdf = gdf.to_crs(utm)
-        self.region["area"] = gdf.geometry.area
+        self.region["area"] = self.geometry.areas(self.region)
@@ -1,12 +1,12 @@
 """Module containing the FoodSupply class."""
 
 import logging
-import re
 
 import pandas as pd
 
 from food_security.fao_api import FAOClient
 from food_security.interface.base import FSBase
+from food_security.items import ItemBlock, region_keys
 
 logger = logging.getLogger(__name__)
 
@@ -17,11 +17,8 @@ class FoodSupply(FSBase):
     def add_food_supply(self) -> None:
         """Calculate food supply for regions."""
         trade_flux = self.get_food_trade_fluxes()
-        self.region = self.region.apply(
-            self._calculate_trade_fluxes,
-            axis=1,
-            args=(trade_flux,),
-        )
+        self.items.align(region_keys(self.region))
+        self._calculate_trade_fluxes(self.items, self.region, trade_flux)
 
     def get_food_trade_fluxes(self) -> pd.DataFrame:
         """Retrieve import and export of food items and calculate the flux."""
@@ -76,28 +73,17 @@ class FoodSupply(FSBase):
         return total_trade[["Item Code", "trade_flux"]]
 
     @staticmethod
-    def _calculate_trade_fluxes(row: pd.Series, trade_flux: pd.DataFrame) -> pd.Series:
-        # Use regex pattern to check if col is <item>_<item code> col
-        pattern = re.compile(r"^[A-Z ,/]+_[0-9]+$")
-        for col in row.index:
-            if pattern.match(col):
-                item_code = col.split("_")[-1]
-                # If item is in trade flux df calculate the supply of that item
-                # based on the land ratio and the trade flux
-                if item_code in trade_flux["Item Code"].to_numpy():
-                    row[col] = row[col] + (
-                        trade_flux.loc[
-                            trade_flux["Item Code"] == item_code,
-                            "trade_flux",
-                        ].to_numpy()[0]
-                        * row["land_ratio"]
-                    )
-        return row
+    def _calculate_trade_fluxes(
+        items: ItemBlock, region: pd.DataFrame, trade_flux: pd.DataFrame
+    ) -> None:
+        # The supply of an item with a trade flux is its production plus the
+        # land ratio of the region times the trade flux of the country
+        items.add_outer(
+            region["land_ratio"].to_numpy(),
+            trade_flux.set_index("Item Code")["trade_flux"],
+        )
 
     @property
     def get_food_items(self) -> list[tuple]:
         """Return food item with item code from dataframe."""
-        data_cols = self.region.columns
-        pattern = re.compile(r"^[A-Z ,/]+_[0-9]+$")
-        other_food_cols = [name for name in data_cols if pattern.match(name)]
-        return [(*col.split("_"),) for col in other_food_cols]
+        return list(zip(self.items.names, self.items.codes))
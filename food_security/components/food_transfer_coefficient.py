@@ -1,51 +1,51 @@
 """Calculate the food transfer coefficient and add it to the region."""
 
 import geopandas as gpd
-import osmnx as ox
+import numpy as np
+import shapely
 
+from food_security.geometry import RegionGeometry
 from food_security.interface.base import FSBase
+from food_security.roads import RoadSource, road_source
 
 
 class FoodTransferCoefficient(FSBase):
     """Calculate the food transfer coefficient."""
 
-    def __init__(self, cfg: dict, region: gpd.GeoDataFrame) -> None:
-        """Instantiate the FoodTransferCoefficient class."""
-        super().__init__(cfg)
-        self.region = region
+    def __init__(
+        self,
+        cfg: dict,
+        region: gpd.GeoDataFrame,
+        geometry: RegionGeometry | None = None,
+        roads: RoadSource | None = None,
+    ) -> None:
+        """Instantiate the FoodTransferCoefficient class.
+
+        Roads are read from the road source of the config when no source is given.
+        """
+        super().__init__(
+            year=None, cfg=cfg, region=region, fao_client=None, geometry=geometry
+        )
+        self.roads = roads if roads is not None else road_source(cfg)
 
     def add_ftc(self) -> None:
         """Calculate the food transfer coefficient."""
         self.calculate_road_density()
 
     def get_roads(self) -> gpd.GeoDataFrame:
-        """Retrieve road features from OMSnx."""
-        # Get road features for total bounds of region
-        road_features = ox.features.features_from_bbox(
-            bbox=self.region.total_bounds,
-            tags={"highway": True},
-        )
-
-        # Drop point geometries
-        return road_features[road_features.geometry.type == "LineString"]
+        """Retrieve the road lines within the bounds of the region."""
+        return self.roads.read(self.geometry.bounds)
 
     def calculate_road_density(self) -> None:
         """Calculate road density and add it to the regions."""
         roads = self.get_roads()
-        utm = self.region.estimate_utm_crs()
-        self.region["road_length"] = 0
-        for region_name in self.region["Name"].to_numpy():
-            region_roads = roads.sjoin(self.region[self.region["Name"] == region_name])
-            # Clip any road geoms that are sticking outside of the region polygon
-            region_roads = gpd.clip(
-                region_roads,
-                self.region[self.region["Name"] == region_name],
-            )
-            region_roads = region_roads.to_crs(utm)
-            region_roads["length"] = region_roads.length
-            self.region.loc[self.region["Name"] == region_name, "road_length"] = (
-                region_roads["length"].sum()
-            )
+        # Project the roads once and measure them within all regions in one pass
+        self.region["road_length"] = _road_lengths(
+            roads.geometry.to_crs(self.geometry.utm_crs),
+            self.geometry.project(self.region),
+        )
+        if "area" not in self.region.columns:
+            self.region["area"] = self.geometry.areas(self.region)
         # Road density is calculated by km of roads diveded by area (km2)
         self.region["road_density"] = (self.region["road_length"] / 1000) / (
             self.region["area"] / 1e6
@@ -53,5 +53,25 @@ class FoodTransferCoefficient(FSBase):
 
     def run(self) -> gpd.GeoDataFrame:
         """Run the FoodTransferCoefficient workflow."""
-        super().run()
-        return self.region
+        return super().run()
+
+
+def _road_lengths(roads: gpd.GeoSeries, regions: gpd.GeoSeries) -> np.ndarray:
+    """Total length of the roads within each region.
+
+    Roads are clipped to the regions they intersect, found with the spatial index
+    of the roads, and their clipped lengths are summed per region.
+
+    Args:
+        roads (gpd.GeoSeries): Road lines in a projected CRS.
+        regions (gpd.GeoSeries): Region polygons in the CRS of the roads.
+
+    Returns:
+        np.ndarray: Length of the roads per region, in the unit of the CRS.
+
+    """
+    region_idx, road_idx = roads.sindex.query(regions.values, predicate="intersects")
+    lengths = shapely.length(
+        shapely.intersection(roads.values[road_idx], regions.values[region_idx])
+    )
+    return np.bincount(region_idx, weights=lengths, minlength=len(regions))
@@ -1,38 +1,20 @@
 """Module containing the FoodValue class."""
 
-import re
-from pathlib import Path
-
-import geopandas as gpd
 import pandas as pd
 
 from food_security.interface.base import FSBase
+from food_security.items import ItemBlock, region_keys
 from food_security.utils import _prep_conversion_table
 
 
 class FoodValue(FSBase):
     """Food value class for calculating caloric value."""
 
-    def calc_caloric_value_per_crop(
-        self,
-        row: gpd.GeoSeries,
-        calories_table: pd.DataFrame,
-        pattern: re.Pattern,
-    ) -> None:
-        """Calculate caloric value for crops row-wise."""
-        # Calculate caloric value for crops from FAO
-        for col in row.index:
-            if pattern.match(col):
-                item_code = col.split("_")[-1]
-                if item_code in calories_table["Item Code"].to_numpy():
-                    row[col] = (
-                        row[col]
-                        * calories_table.loc[
-                            calories_table["Item Code"] == item_code,
-                            "CALORIES kcal",
-                        ].to_numpy()[0]
-                        * 10000  # 100 gr to tonnes
-                    )
+    @staticmethod
+    def calc_caloric_value(items: ItemBlock, calories_table: pd.DataFrame) -> None:
+        """Convert the production of the FAO crops with a caloric value to kcal."""
+        calories = calories_table.set_index("Item Code")["CALORIES kcal"]
+        items.scale(calories * 10000)  # 100 gr to tonnes
         # Calculate caloric value for modelled crops
         # for crop in self.cfg["food_production"]["modelled_crops"]["crops"]:
         #     row[crop] = (
@@ -40,11 +22,10 @@ class FoodValue(FSBase):
         #         * self.cfg["food_production"]["modelled_crops"][crop]["calories"]
         #         * 10000
         #     )
-        return row
 
     def get_population(self) -> None:
         """Add region population."""
-        pop_df = pd.read_csv(self.cfg["main"]["population"]["path"])
+        pop_df = self.inputs.read_table(self.cfg["main"]["population"]["path"])
         if "Name" not in pop_df.columns:
             err_msg = (
                 "Name column in population dataset not present, "
@@ -52,6 +33,7 @@ class FoodValue(FSBase):
             )
             raise ValueError(err_msg)
         self.region = self.region.merge(pop_df, on="Name")
+        self.items.align(region_keys(self.region))
 
     def get_per_capita_per_day_calories(self) -> None:
         """Add per capita per day calories."""
@@ -76,37 +58,16 @@ class FoodValue(FSBase):
 
         food_df = self.region[food_cols]
 
-        self.region["total_cals"] = food_df.sum(axis=1)
+        self.region["total_cals"] = food_df.sum(axis=1) + self.items.total()
         self.region["cal_per_capita_per_day"] = (
             self.region["total_cals"] / self.region["population"] / 365
         )
 
     def add_food_value(self) -> None:
         """Add caloric value to modelled and other crops."""
-        conversion_path = (
-            Path(self.cfg["main"]["input_path"])
-            / self.cfg["food_production"]["fao"]["conversion_table"]["path"]
-        )
-
-        if conversion_path.suffix.lower() == ".csv":
-            calories_table = pd.read_csv(conversion_path)
-        elif conversion_path.suffix.lower() in [".xls", ".xlsx"]:
-            calories_table = pd.read_excel(
-                conversion_path,
-                sheet_name=self.cfg["food_production"]["fao"]["conversion_table"].get(
-                    "sheet_name", 0
-                ),
-            )
-
+        calories_table = self.read_conversion_table()
         calories_table = _prep_conversion_table(calories_table)
-        pattern = re.compile(r"^[A-Z ,/]+_[0-9]+$")
-        self.region = self.region.apply(
-            self.calc_caloric_value_per_crop,
-            axis=1,
-            args=(
-                calories_table,
-                pattern,
-            ),
-        )
+        self.items.align(region_keys(self.region))
+        self.calc_caloric_value(self.items, calories_table)
         self.get_population()
         self.get_per_capita_per_day_calories()
@@ -3,31 +3,171 @@
 from __future__ import annotations
 
 import configparser
+import hashlib
+import json
 import logging
-from datetime import datetime, timedelta
+import math
+import os
+import re
+import shutil
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from struct import unpack
-from typing import TYPE_CHECKING
+from struct import pack, unpack
+from typing import TYPE_CHECKING, NamedTuple
 
 import numpy as np
 import pandas as pd
 import rasterio
+import rasterio.windows
+import shapely
 import xarray as xr
+from affine import Affine
 from rasterstats import zonal_stats
+from xarray.backends import BackendArray
+from xarray.core import indexing
+
+from food_security import zonal
 
 logger = logging.getLogger(__name__)
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
     import geopandas as gpd
+    from shapely.geometry.base import BaseGeometry
+
+# Suffix of the index file that is persisted next to a hisfile
+HIS_INDEX_SUFFIX = ".idx.json"
+
+# Suffixes of the Zarr and NetCDF stores written by HisFile.convert
+HIS_STORE_SUFFIXES = {"zarr": ".zarr", "netcdf": ".nc"}
+
+# HIS station table entry: int32 location number followed by a 20 byte name
+_LOCATION_DTYPE = np.dtype([("nr", "<i4"), ("name", "V20")])
 
 
 class Grid:
-    """Grid class for reading and handling grid data."""
+    """Grid class for reading and handling grid data.
+
+    The grid is read lazily. Reads can be restricted to the bounds of an area of
+    interest and decimated, either by reading an overview level of the file or
+    by reading the centre cell of every n by n block. Zonal statistics of regions
+    that cover more than block_pixels cells and of overlapping regions are computed
+    block by block, so memory stays bounded by the block size instead of the raster
+    size.
+    """
+
+    def __init__(
+        self,
+        file_path: Path | str,
+        nodata: float | None = None,
+        bounds: tuple[float, float, float, float] | None = None,
+        overview_level: int | None = None,
+        decimation: int = 1,
+        block_pixels: int = 2**22,
+    ):
+        """Open a grid.
+
+        Args:
+            file_path (Path | str): Path to the raster file.
+            nodata (float | None, optional): Value to ignore in the statistics.
+                Defaults to -999, like rasterstats.
+            bounds (tuple[float, float, float, float] | None, optional): Bounds of
+                the area of interest in the CRS of the grid, cells outside the bounds
+                are never read. Defaults to None, the full grid.
+            overview_level (int | None, optional): Overview level of the file to
+                read. Defaults to None, the full resolution.
+            decimation (int, optional): Read the centre cell of every n by n block
+                of cells. Defaults to 1.
+            block_pixels (int, optional): Maximum number of cells read at once by
+                the zonal statistics. Defaults to 2**22.
+
+        """
+        if decimation < 1 or block_pixels < 1:
+            err_msg = "decimation and block_pixels should be positive"
+            raise ValueError(err_msg)
+        if overview_level is None:
+            self.dataset = rasterio.open(file_path)
+        else:
+            self.dataset = rasterio.open(file_path, overview_level=overview_level)
+        self.window = rasterio.windows.Window(
+            0, 0, self.dataset.width, self.dataset.height
+        )
+        if bounds is not None:
+            self.window = _cells_window(
+                bounds, self.dataset.transform, self.dataset.shape
+            )
+        self.decimation = decimation
+        self.shape = (
+            max(1, self.window.height // decimation),
+            max(1, self.window.width // decimation),
+        )
+        self.affine = rasterio.windows.transform(
+            self.window, self.dataset.transform
+        ) * Affine.scale(decimation)
+        # rasterstats treats -999 as nodata for arrays without a nodata value
+        self.nodata = -999 if nodata is None else nodata
+        self.block_pixels = block_pixels
+        self._data = None
+        self._zones = {}
+
+    @property
+    def data(self) -> np.ndarray:
+        """Values of the grid, read on first access."""
+        if self._data is None:
+            self._data = self.read()
+        return self._data
+
+    def read(self, window: rasterio.windows.Window | None = None) -> np.ndarray:
+        """Read a window of the grid.
+
+        Args:
+            window (rasterio.windows.Window | None, optional): Window in the cells
+                of the grid. Defaults to None, the full grid.
+
+        Returns:
+            np.ndarray: Values of the window.
+
+        """
+        if window is None:
+            window = rasterio.windows.Window(0, 0, self.shape[1], self.shape[0])
+        if self._data is not None:
+            return self._data[window.toslices()]
+        step = self.decimation
+        source = rasterio.windows.Window(
+            self.window.col_off + window.col_off * step,
+            self.window.row_off + window.row_off * step,
+            window.width * step,
+            window.height * step,
+        ).intersection(self.window)
+        return self.dataset.read(
+            1, window=source, out_shape=(int(window.height), int(window.width))
+        )
 
-    def __init__(self, file_path: Path | str):
-        self.dataset = rasterio.open(file_path)
-        self.affine = self.dataset.transform
-        self.data = self.dataset.read(1)
+    def blocks(
+        self, window: rasterio.windows.Window | None = None
+    ) -> Iterator[rasterio.windows.Window]:
+        """Split a window of the grid into strips of at most block_pixels cells.
+
+        Args:
+            window (rasterio.windows.Window | None, optional): Window in the cells
+                of the grid. Defaults to None, the full grid.
+
+        Yields:
+            rasterio.windows.Window: Strips of full rows of the window.
+
+        """
+        if window is None:
+            window = rasterio.windows.Window(0, 0, self.shape[1], self.shape[0])
+        rows = max(1, self.block_pixels // max(1, window.width))
+        block_rows = self.dataset.block_shapes[0][0]
+        if self.decimation == 1 and rows > block_rows:
+            # Align the strips to the internal blocks of the file
+            rows -= rows % block_rows
+        for row_off in range(window.row_off, window.row_off + window.height, rows):
+            height = min(rows, window.row_off + window.height - row_off)
+            yield rasterio.windows.Window(window.col_off, row_off, window.width, height)
 
     def get_region_stat(
         self,
@@ -35,20 +175,175 @@ class Grid:
         col_name: str,
         stat: str,
     ) -> gpd.GeoDataFrame:
-        z_stats = zonal_stats(regions, self.data, affine=self.affine, stats=[stat])
-        stat_list = [s[stat] for s in z_stats]
-        regions[col_name] = stat_list
-        return regions
+        return self.get_region_stats(regions, cols={col_name: stat})
 
     def get_region_stats(
         self,
         regions: gpd.GeoDataFrame,
         cols: dict,
     ) -> gpd.GeoDataFrame:
+        stats = self.zonal_stats(regions, stats=list(dict.fromkeys(cols.values())))
         for col, stat in cols.items():
-            regions = self.get_region_stat(regions, col_name=col, stat=stat)
+            regions[col] = stats[stat].to_numpy()
         return regions
 
+    def zonal_stats(
+        self,
+        regions: gpd.GeoDataFrame,
+        stats: list[str],
+    ) -> pd.DataFrame:
+        """Compute statistics of the grid in every region with a single scan.
+
+        The regions are rasterized once into a label raster that covers the bounds
+        of the regions, which is cached for later calls with the same regions. All
+        statistics are then computed in one pass over that window of the grid.
+        Windows larger than block_pixels cells are rasterized and read block by
+        block instead. Overlapping regions are read block by block with a pass per
+        region. Statistics that the label raster does not support are computed with
+        rasterstats on the window of the regions.
+
+        Args:
+            regions (gpd.GeoDataFrame): Regions in the CRS of the grid.
+            stats (list[str]): Statistics to compute, e.g. ["sum", "mean"].
+
+        Returns:
+            pd.DataFrame: Statistic per column with the index of the regions.
+
+        """
+        if any(stat not in zonal.ZONAL_STATS for stat in stats):
+            return self._rasterstats(regions, stats)
+        window = _cells_window(regions.total_bounds, self.affine, self.shape)
+        if window.width * window.height > self.block_pixels:
+            overlap = _regions_overlap(regions)
+            if not overlap:
+                table = self._block_stats(regions.geometry, window, stats)
+        else:
+            window, labels, overlap = self._region_zones(regions, window)
+            if not overlap:
+                table = zonal.zonal_statistics(
+                    labels,
+                    self.read(window),
+                    n_zones=len(regions),
+                    stats=stats,
+                    nodata=self.nodata,
+                )
+        if overlap:
+            table = pd.concat(
+                [
+                    self._block_stats(
+                        [geometry],
+                        _cells_window(geometry.bounds, self.affine, self.shape),
+                        stats,
+                    )
+                    for geometry in regions.geometry
+                ]
+            )
+        table.index = regions.index
+        return table
+
+    def _rasterstats(self, regions: gpd.GeoDataFrame, stats: list[str]):
+        # Only the window of the regions is read
+        window = _cells_window(regions.total_bounds, self.affine, self.shape)
+        if 0 in (window.height, window.width):
+            return pd.DataFrame(
+                [dict.fromkeys(stats)] * len(regions), index=regions.index
+            ).astype(float)
+        z_stats = zonal_stats(
+            regions,
+            self.read(window),
+            affine=rasterio.windows.transform(window, self.affine),
+            stats=stats,
+            nodata=self.nodata,
+        )
+        return pd.DataFrame(z_stats, index=regions.index, columns=stats)
+
+    def _block_stats(
+        self,
+        geometries: Sequence[BaseGeometry],
+        window: rasterio.windows.Window,
+        stats: list[str],
+    ) -> pd.DataFrame:
+        return zonal.zonal_statistics_blocks(
+            _ZoneBlocks(self, geometries, window),
+            len(geometries),
+            stats=stats,
+            nodata=self.nodata,
+        )
+
+    def _region_zones(
+        self, regions: gpd.GeoDataFrame, window: rasterio.windows.Window
+    ) -> tuple:
+        wkb = b"".join(regions.geometry.to_wkb())
+        key = hashlib.sha1(wkb).hexdigest()  # noqa: S324
+        if key not in self._zones:
+            shape = (window.height, window.width)
+            if 0 in shape:
+                # The regions do not cover any cell of the grid
+                self._zones[key] = (window, np.zeros(shape, dtype=np.int32), False)
+                return self._zones[key]
+            transform = rasterio.windows.transform(window, self.affine)
+            self._zones[key] = (
+                window,
+                zonal.rasterize_zones(regions.geometry, shape, transform),
+                zonal.zones_overlap(regions.geometry, shape, transform),
+            )
+        return self._zones[key]
+
+
+class _ZoneBlocks:
+    # Label and value grid of the blocks of a window, read again on every iteration
+    # so the median of the blocks can take several passes
+
+    def __init__(
+        self,
+        grid: Grid,
+        geometries: Sequence[BaseGeometry],
+        window: rasterio.windows.Window,
+    ) -> None:
+        self.grid = grid
+        self.geometries = geometries
+        self.window = window
+
+    def __iter__(self) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        for block in self.grid.blocks(self.window):
+            if 0 in (block.height, block.width):
+                continue
+            labels = zonal.rasterize_zones(
+                self.geometries,
+                (block.height, block.width),
+                rasterio.windows.transform(block, self.grid.affine),
+            )
+            if labels.any():
+                yield labels, self.grid.read(block)
+
+
+def _cells_window(
+    bounds: Sequence[float], transform: Affine, shape: tuple[int, int]
+) -> rasterio.windows.Window:
+    # Window of the cells that intersect the bounds, clipped to the grid
+    minx, miny, maxx, maxy = bounds
+    row_start, col_start = rasterio.transform.rowcol(
+        transform, minx, maxy, op=math.floor
+    )
+    row_stop, col_stop = rasterio.transform.rowcol(transform, maxx, miny, op=math.ceil)
+    height, width = shape
+    row_start, row_stop = np.clip([row_start, row_stop], 0, height)
+    col_start, col_stop = np.clip([col_start, col_stop], 0, width)
+    return rasterio.windows.Window.from_slices(
+        (int(row_start), int(row_stop)), (int(col_start), int(col_stop))
+    )
+
+
+def _regions_overlap(regions: gpd.GeoDataFrame) -> bool:
+    # Regions overlap when the intersection of any pair has an area
+    left, right = regions.sindex.query(regions.geometry, predicate="intersects")
+    pairs = left < right
+    geometries = regions.geometry.to_numpy()
+    areas = shapely.area(
+        shapely.intersection(geometries[left[pairs]], geometries[right[pairs]])
+    )
+    return bool((areas > 0).any())
+
 
 def read_and_transform_rice_yield_table(file_path: str | Path, year: int) -> None:
     region_mapper = {
@@ -100,72 +395,239 @@ class HisFile:
         self.file_path = file_path
         self.crop = crop
 
-    def read(self, *, hia: bool = False) -> None:
+    def read(
+        self,
+        *,
+        hia: bool = False,
+        mmap: bool = True,
+        params: list[str] | None = None,
+        stations: list[str] | None = None,
+        time: slice | None = None,
+        lazy: bool = False,
+        prefer_converted: bool = True,
+    ) -> None:
         """Read a hisfile to a xarray.Dataset.
 
         If hia is True, it will use the long location names from the .hia sidecar file
         if it exists.
+
+        The record block is decoded in one go with a structured dtype. If mmap is True
+        (default) the file is memory-mapped and the data variables are read-only,
+        zero-copy views on the file; use ``ds.load()`` or ``ds.copy(deep=True)`` to
+        get an in-memory copy. If mmap is False the record block is read into memory
+        with a single read call.
+
+        Args:
+            hia (bool, optional): Use long names from the .hia sidecar file.
+            mmap (bool, optional): Memory-map the file instead of reading it.
+            params (list[str], optional): Parameters to read, defaults to all. Names
+                are matched after applying the .hia long names.
+            stations (list[str], optional): Stations to read, defaults to all.
+            time (slice, optional): Label based time window, e.g.
+                ``slice("2015-01-01", "2016-01-01")``. Defaults to all timesteps.
+            lazy (bool, optional): Do not read any values until they are accessed.
+                Selections on the dataset only read the byte ranges they cover.
+            prefer_converted (bool, optional): Read from a Zarr or NetCDF store
+                written by ``HisFile.convert`` if it is up to date with the hisfile.
+
         """
         hisfile = Path(self.file_path)
-        filesize = hisfile.stat().st_size
-        if filesize == 0:
+        store = self.converted_store() if prefer_converted else None
+        if store is not None:
+            logger.debug("Reading %s from converted store %s", hisfile, store)
+            self.ds = _read_his_store(
+                store, hia=hia, params=params, stations=stations, time=time, lazy=lazy
+            )
+            return
+
+        head = self.open_metadata(hia=hia)
+        dates = head.times
+
+        time_slice = _time_slice(dates, time)
+        time_index = np.arange(head.notim)[time_slice]
+        station_index = _positions(head.stations, stations, "station")
+        param_index = _positions(head.params, params, "parameter")
+        names = [head.params[p] for p in param_index]
+        coords = {
+            "time": dates[time_slice],
+            "station": [head.stations[s] for s in station_index],
+        }
+
+        if lazy:
+            data_vars = {
+                name: xr.Variable(
+                    ("time", "station"),
+                    indexing.LazilyIndexedArray(
+                        _HisBackendArray(hisfile, head, p, time_index, station_index),
+                    ),
+                )
+                for name, p in zip(names, param_index)
+            }
+        else:
+            records = _open_records(hisfile, head, mmap=mmap)
+            # (time, station, param) strided view on the record block
+            data = records["values"][time_slice]
+            if stations is not None or params is not None:
+                # Gather only the requested cells, a single copy of the selection
+                data = data[:, station_index[:, None], param_index[None, :]]
+                param_index = np.arange(len(names))
+            data_vars = {
+                name: (["time", "station"], data[..., i])
+                for name, i in zip(names, param_index)
+            }
+
+        self.ds = xr.Dataset(
+            data_vars,
+            coords=coords,
+            attrs={"header": head.header, "scu": head.scu, "t0": head.t0},
+        )
+
+    @property
+    def index(self) -> HisIndex:
+        """Metadata of the hisfile, without the long names of the .hia sidecar."""
+        return self.open_metadata()
+
+    def open_metadata(self, *, hia: bool = False) -> HisIndex:
+        """Parse only the header, names and timesteps of the hisfile.
+
+        The index is cached per (path, modification time, size) for the lifetime of
+        the process and persisted in a sidecar file next to the hisfile, so repeated
+        runs over unchanged model output do not scan the file again.
+
+        If hia is True, it will use the long location and parameter names from the
+        .hia sidecar file if it exists.
+        """
+        hisfile = Path(self.file_path).resolve()
+        stat = hisfile.stat()
+        if stat.st_size == 0:
             err_msg = f"HIS file is empty: {hisfile}"
             raise ValueError(err_msg)
-        with hisfile.open("rb") as f:
-            header = f.read(120).decode("utf-8")
-            timeinfo = f.read(40).decode("utf-8")
-            datestr = timeinfo[4:14].replace(" ", "0") + timeinfo[14:23]
-            startdate = datetime.strptime(datestr, "%Y.%m.%d %H:%M:%S")  # noqa: DTZ007
-            try:
-                dt = int(timeinfo[30:-2])  # assumes unit is seconds
-            except ValueError:
-                # in some RIBASIM his files the s is one place earlier
-                dt = int(timeinfo[30:-3])
-            noout, noseg = unpack("ii", f.read(8))
-            notim = int(
-                (filesize - 168 - noout * 20 - noseg * 24) / (4 * (noout * noseg + 1)),
-            )
-            params = []
-            for _ in range(noout):
-                param = (f.read(20).rstrip().lstrip()).decode("utf-8")
-                if (
-                    count := params.count(param)
-                ) > 0:  # Checks if there are duplicate data var names and adds a suffix
-                    param += f"_{count + 1}"
-                params.append(param)
-
-            locnrs, locs = [], []
-            for i in range(noseg):  # noqa: B007
-                locnrs.append(unpack("i", f.read(4))[0])
-                locs.append((f.read(20).rstrip()).decode("utf-8"))
-            dates = []
-            data = np.zeros((noout, notim, noseg), np.float32)
-            for t in range(notim):
-                ts = unpack("i", f.read(4))[0]
-                date = startdate + timedelta(seconds=ts * dt)
-                dates.append(date)
-                for s in range(noseg):
-                    data[:, t, s] = np.fromfile(f, np.float32, noout)
+        index = _load_index(hisfile, stat.st_mtime_ns, stat.st_size)
         if hia:
             # if there is a hia file next to the his, use the long locations
-            hia_path = Path(hisfile).with_suffix(".hia")
+            hia_path = hisfile.with_suffix(".hia")
             if hia_path.is_file():
-                config = configparser.ConfigParser(interpolation=None)
-                config.read(hia_path)
-                locs = self._update_long(locs, config, "Long Locations")
-                params = self._update_long(params, config, "Long Parameters")
+                hia_stat = hia_path.stat()
+                config = _load_hia(hia_path, hia_stat.st_mtime_ns, hia_stat.st_size)
+                locs = self._update_long(
+                    list(index.stations), config, "Long Locations"
+                )
+                params = self._update_long(
+                    list(index.params), config, "Long Parameters"
+                )
+                index = index._replace(stations=tuple(locs), params=tuple(params))
+        return index
 
-        self.ds = xr.Dataset(
-            {
-                param: (["time", "station"], data[i, ...])
-                for (i, param) in enumerate(params)
-            },
+    def convert(
+        self,
+        store: str | Path | None = None,
+        *,
+        fmt: str = "zarr",
+        chunks: tuple[int, int] = (120, 256),
+        force: bool = False,
+    ) -> Path:
+        """Convert the hisfile to a chunked, compressed Zarr or NetCDF store.
+
+        All parameters are written to a single ``values`` variable with dimensions
+        (time, station, parameter), chunked by time and station and with a chunk per
+        parameter. The store is stamped with the size and modification time of the
+        hisfile; a store that is up to date is not written again unless force is True.
+        Long .hia names are not stored, they are applied when the store is read.
+
+        Args:
+            store (str | Path, optional): Path of the store. Defaults to the hisfile
+                path with a .zarr or .nc suffix appended.
+            fmt (str, optional): Either "zarr" or "netcdf". Defaults to "zarr".
+            chunks (tuple[int, int], optional): Chunk size along the time and station
+                dimensions. Defaults to (120, 256).
+            force (bool, optional): Overwrite an up to date store. Defaults to False.
+
+        Returns:
+            Path: Path of the store.
+
+        """
+        if fmt not in HIS_STORE_SUFFIXES:
+            err_msg = (
+                f"Unknown HIS store format {fmt}, "
+                f"expected one of {list(HIS_STORE_SUFFIXES)}"
+            )
+            raise ValueError(err_msg)
+        hisfile = Path(self.file_path)
+        store = Path(store) if store else his_store_path(hisfile, fmt)
+        stat = hisfile.stat()
+        if not force and _store_is_current(store, stat):
+            logger.info("Converted store %s is up to date", store)
+            return store
+
+        index = self.open_metadata()
+        records = _open_records(hisfile, index, mmap=True)
+        ds = xr.Dataset(
+            {"values": (("time", "station", "parameter"), records["values"])},
             coords={
-                "time": dates,
-                "station": locs,
+                "time": index.times,
+                # variable length strings, fixed width unicode has no Zarr v3 spec
+                "station": np.array(index.stations, dtype=object),
+                "parameter": np.array(index.params, dtype=object),
+            },
+            attrs={
+                "header": index.header,
+                "scu": index.scu,
+                "t0": index.t0.isoformat(),
+                "source_mtime_ns": str(stat.st_mtime_ns),
+                "source_size": str(stat.st_size),
             },
-            attrs={"header": header, "scu": dt, "t0": startdate},
         )
+        chunk_shape = (
+            max(1, min(chunks[0], index.notim)),
+            max(1, min(chunks[1], len(index.stations))),
+            1,
+        )
+
+        # Write next to the target and swap it in, so an interrupted conversion
+        # never leaves a store behind that looks up to date
+        tmp_store = store.with_name(store.name + ".tmp")
+        _remove_store(tmp_store)
+        logger.info("Converting %s to %s", hisfile, store)
+        if fmt == "zarr":
+            ds.to_zarr(
+                tmp_store,
+                mode="w",
+                consolidated=False,
+                encoding={"values": {"chunks": chunk_shape}},
+            )
+        else:
+            ds.to_netcdf(
+                tmp_store,
+                encoding={
+                    "values": {"zlib": True, "complevel": 4, "chunksizes": chunk_shape}
+                },
+            )
+        _remove_store(store)
+        tmp_store.rename(store)
+        return store
+
+    def converted_store(self) -> Path | None:
+        """Return the converted store of the hisfile if it is up to date."""
+        hisfile = Path(self.file_path)
+        stat = hisfile.stat()
+        for fmt in HIS_STORE_SUFFIXES:
+            store = his_store_path(hisfile, fmt)
+            if _store_is_current(store, stat):
+                return store
+        return None
+
+    def write(self, ds: xr.Dataset | None = None) -> None:
+        """Write a dataset, by default the dataset that was read, to the hisfile.
+
+        See ``write_his`` for the expected layout of the dataset.
+        """
+        ds = self.ds if ds is None else ds
+        write_his(self.file_path, ds)
+
+    @property
+    def station_index(self) -> StationIndex:
+        """StationIndex of the stations of the dataset that was read."""
+        return StationIndex.from_dataset(self.ds)
 
     def to_table(
         self,
@@ -186,25 +648,541 @@ class HisFile:
         """
         data = []
         time = f"{year}-01-01"
-        for i, region in region_mapper.items():
-            keys = []
-            for x in range(4):
-                if len(i) < 3:  # noqa: PLR2004
-                    i = "_" + i  # noqa: PLW2901
-
-                key = f"Nd_____{i} / Cr__{x + 1} /"
-                if key not in self.ds.station:
-                    continue
-                keys.append(key)
-            total_yield = self.ds.sel(station=keys, time=time)[param].to_numpy().sum()
+        # Gather the first four crops of every node with a single selection
+        positions = self.station_index.node_crop_positions(
+            list(region_mapper), range(1, 5)
+        )
+        values = self.ds[param].sel(time=time).to_numpy()
+        values = values.reshape(-1, values.shape[-1])
+        for region, region_positions in zip(region_mapper.values(), positions):
+            keys = region_positions[region_positions >= 0]
+            total_yield = values[:, keys].sum()
             row = {"region": region, self.crop: total_yield}
             data.append(row)
         return pd.DataFrame(data)
 
-    def _update_long(self, lst: list, config: dict, section: str) -> list:
+    @staticmethod
+    def _update_long(lst: list, config: dict, section: str) -> list:
         if section in config:
             # subtract 1 to get a 0 based index for the location
             long_map = {int(k) - 1: v for (k, v) in config[section].items()}
             for i, long_name in long_map.items():
                 lst[i] = long_name
         return lst
+
+
+class StationIndex:
+    """Lookup table from parsed RIBASIM station names to station positions.
+
+    RIBASIM station names encode the node and crop, e.g. ``Nd______42 / Cr__1 /``,
+    or the node and area name, e.g. ``42 / An Giang``. The names are parsed once so
+    that the positions of many stations can be looked up without building station
+    strings and selecting them one by one.
+    """
+
+    _node_crop_pattern = re.compile(r"^Nd_*(\d+) / Cr_*(\d+) /$")
+    _node_area_pattern = re.compile(r"^(\d+) / (.+)$")
+
+    def __init__(self, stations: list[str] | np.ndarray) -> None:
+        """Instantiate a StationIndex object."""
+        self.stations = [str(station) for station in stations]
+        self._positions = {}
+        self._node_crop = {}
+        self._node_area = {}
+        for i, station in enumerate(self.stations):
+            self._positions.setdefault(station, i)
+            if match := self._node_crop_pattern.match(station):
+                key = (int(match.group(1)), int(match.group(2)))
+                self._node_crop.setdefault(key, i)
+            elif match := self._node_area_pattern.match(station):
+                self._node_area.setdefault((int(match.group(1)), match.group(2)), i)
+
+    @classmethod
+    def from_dataset(cls, ds: xr.Dataset) -> StationIndex:
+        """Create a StationIndex from the station coordinate of a dataset."""
+        return cls(ds["station"].to_numpy())
+
+    def position(self, station: str) -> int | None:
+        """Return the position of a station name."""
+        return self._positions.get(station)
+
+    def node_crop(self, node: int | str, crop: int | str) -> int | None:
+        """Return the position of the ``Nd <node> / Cr <crop> /`` station."""
+        return self._node_crop.get((int(node), int(crop)))
+
+    def node_area(self, node: int | str, area: str) -> int | None:
+        """Return the position of the ``<node> / <area>`` station."""
+        return self._node_area.get((int(node), area))
+
+    def node_crop_positions(
+        self,
+        nodes: list[int | str] | np.ndarray,
+        crops: list[int | str] | np.ndarray,
+    ) -> np.ndarray:
+        """Return the positions of (node, crop) stations, -1 for missing stations.
+
+        The result has shape (len(nodes), len(crops)) and can be used to gather
+        all series with a single ``isel``.
+        """
+        return np.array(
+            [[self._node_crop.get((int(n), int(c)), -1) for c in crops] for n in nodes],
+            dtype=np.intp,
+        ).reshape(len(nodes), len(crops))
+
+
+class HisIndex(NamedTuple):
+    """Metadata of a hisfile: header, names, timesteps and record layout."""
+
+    header: str
+    t0: datetime
+    scu: int
+    params: tuple[str, ...]
+    stations: tuple[str, ...]
+    timesteps: np.ndarray
+    offset: int
+
+    @property
+    def notim(self) -> int:
+        """Number of timesteps in the hisfile."""
+        return len(self.timesteps)
+
+    @property
+    def times(self) -> np.ndarray:
+        """Datetimes of the timesteps."""
+        return np.datetime64(self.t0) + self.timesteps.astype(
+            "timedelta64[s]"
+        ) * np.int64(self.scu)
+
+    @property
+    def record_dtype(self) -> np.dtype:
+        """Structured dtype of a single record of the record block."""
+        return _record_dtype(len(self.stations), len(self.params))
+
+
+class HisWriter:
+    """Write a hisfile block by block, for time series larger than memory.
+
+    The header is written when the writer is opened, after which blocks of records
+    are appended with a single buffered write each. The records are written to a
+    temporary file next to the hisfile, which replaces the hisfile when the writer
+    is closed. A hisfile that is memory-mapped by a read dataset can therefore be
+    overwritten with the values of that dataset:
+
+        with HisWriter(path, params, stations, t0=t0, scu=86400) as writer:
+            for times, values in blocks:
+                writer.write(times, values)
+    """
+
+    def __init__(
+        self,
+        file_path: str | Path,
+        params: list[str],
+        stations: list[str],
+        t0: datetime,
+        scu: int,
+        header: str = "",
+    ) -> None:
+        """Instantiate a HisWriter object."""
+        self.file_path = Path(file_path)
+        self.params = list(params)
+        self.stations = list(stations)
+        self.t0 = t0
+        self.scu = scu
+        self.header = header
+        self.record_dtype = _record_dtype(len(self.stations), len(self.params))
+        self._tmp_path = self.file_path.with_name(
+            f".{self.file_path.name}.{os.getpid()}.tmp"
+        )
+        self._file = None
+
+    def __enter__(self) -> HisWriter:
+        self.open()
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *args: object) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    def open(self) -> None:
+        """Create the hisfile and write the header, names and station table."""
+        self._file = self._tmp_path.open("wb")
+        self._file.write(self.header.ljust(120)[:120].encode("ascii"))
+        t0str = self.t0.strftime("%Y.%m.%d %H:%M:%S")
+        self._file.write(f"T0: {t0str}  (scu={self.scu:8d}s)".encode("ascii"))
+        self._file.write(pack("ii", len(self.params), len(self.stations)))
+        params = np.array(self.params, dtype="S20")
+        self._file.write(np.char.ljust(params, 20).tobytes())
+        loc_table = np.empty(len(self.stations), dtype=_LOCATION_DTYPE)
+        loc_table["nr"] = np.arange(len(self.stations))
+        loc_table["name"] = np.char.ljust(np.array(self.stations, dtype="S20"), 20)
+        self._file.write(loc_table.tobytes())
+
+    def write(self, times: np.ndarray, values: np.ndarray) -> None:
+        """Append records to the hisfile.
+
+        Args:
+            times (np.ndarray): Datetimes of the records.
+            values (np.ndarray): Values with shape (time, station, parameter).
+
+        """
+        if self._file is None:
+            err_msg = "HisWriter is not opened, use it as a context manager"
+            raise ValueError(err_msg)
+        times = np.asarray(times, dtype="datetime64[ns]")
+        records = np.empty(len(times), dtype=self.record_dtype)
+        records["ts"] = (times - np.datetime64(self.t0)) / np.timedelta64(
+            self.scu, "s"
+        )
+        records["values"] = values
+        self._file.write(records.tobytes())
+
+    def close(self) -> None:
+        """Close the hisfile and replace the hisfile by the written records."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._tmp_path.replace(self.file_path)
+
+    def _discard(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._tmp_path.unlink(missing_ok=True)
+
+
+def write_his(file_path: str | Path, ds: xr.Dataset, time_chunk: int = 1000) -> None:
+    """Write a xarray.Dataset to a hisfile.
+
+    The dataset should have the layout of ``HisFile.read``: data variables with
+    (time, station) dimensions and the header, scu and t0 attributes. The dataset
+    may be lazy, it is written in blocks of time_chunk timesteps.
+    """
+    params = list(ds.data_vars)
+    with HisWriter(
+        file_path,
+        params=_strip_duplicate_suffix(params),
+        stations=ds["station"].to_numpy().tolist(),
+        t0=ds.attrs["t0"],
+        scu=ds.attrs["scu"],
+        header=ds.attrs.get("header", ""),
+    ) as writer:
+        for start in range(0, ds.sizes["time"], time_chunk):
+            block = ds.isel(time=slice(start, start + time_chunk))
+            values = np.stack(
+                [block[p].transpose("time", "station").to_numpy() for p in params],
+                axis=-1,
+            )
+            writer.write(block["time"].to_numpy(), values)
+
+
+def _strip_duplicate_suffix(params: list[str]) -> list[str]:
+    """Undo the _<n> suffix that HisFile.read adds to duplicate parameter names."""
+    names = []
+    for param in params:
+        base, _, count = param.rpartition("_")
+        if count.isdigit() and names.count(base) == int(count) - 1 > 0:
+            param = base  # noqa: PLW2901
+        names.append(param)
+    return names
+
+
+def his_store_path(file_path: str | Path, fmt: str = "zarr") -> Path:
+    """Return the default path of the converted store of a hisfile."""
+    file_path = Path(file_path)
+    return file_path.with_name(file_path.name + HIS_STORE_SUFFIXES[fmt])
+
+
+def _open_store(store: Path) -> xr.Dataset:
+    if store.suffix == HIS_STORE_SUFFIXES["zarr"]:
+        return xr.open_zarr(store, chunks=None, consolidated=False)
+    return xr.open_dataset(store)
+
+
+def _store_is_current(store: Path, stat: os.stat_result) -> bool:
+    """Check if a converted store was written from the current hisfile."""
+    if not store.exists():
+        return False
+    try:
+        with _open_store(store) as ds:
+            attrs = dict(ds.attrs)
+    except (OSError, ValueError, ImportError):
+        logger.debug("Could not open converted store %s", store)
+        return False
+    return attrs.get("source_mtime_ns") == str(stat.st_mtime_ns) and attrs.get(
+        "source_size"
+    ) == str(stat.st_size)
+
+
+def _remove_store(store: Path) -> None:
+    if store.is_dir():
+        shutil.rmtree(store)
+    elif store.exists():
+        store.unlink()
+
+
+def _read_his_store(
+    store: Path,
+    *,
+    hia: bool,
+    params: list[str] | None,
+    stations: list[str] | None,
+    time: slice | None,
+    lazy: bool,
+) -> xr.Dataset:
+    """Read a converted store to the same layout as HisFile.read.
+
+    The store is closed after an eager read. A lazy read keeps it open until the
+    returned dataset is closed.
+    """
+    store_ds = _open_store(store)
+    try:
+        his_ds = _his_store_dataset(
+            store_ds, store, hia=hia, params=params, stations=stations, time=time
+        )
+        if not lazy:
+            his_ds = his_ds.load()
+    except Exception:
+        store_ds.close()
+        raise
+    if lazy:
+        his_ds.set_close(store_ds.close)
+    else:
+        store_ds.close()
+    return his_ds
+
+
+def _his_store_dataset(
+    ds: xr.Dataset,
+    store: Path,
+    *,
+    hia: bool,
+    params: list[str] | None,
+    stations: list[str] | None,
+    time: slice | None,
+) -> xr.Dataset:
+    t0 = datetime.fromisoformat(ds.attrs["t0"])
+    locs = [str(loc) for loc in ds["station"].to_numpy()]
+    names = [str(name) for name in ds["parameter"].to_numpy()]
+    if hia:
+        # the store is named after the hisfile, e.g. RIB_CULT_prod.his.zarr
+        hia_path = store.with_suffix("").with_suffix(".hia")
+        if hia_path.is_file():
+            hia_stat = hia_path.stat()
+            config = _load_hia(hia_path, hia_stat.st_mtime_ns, hia_stat.st_size)
+            update_long = HisFile._update_long  # noqa: SLF001
+            locs = update_long(locs, config, "Long Locations")
+            names = update_long(names, config, "Long Parameters")
+    # Match the coordinate dtypes of HisFile.read
+    ds = ds.assign_coords(
+        time=ds["time"].to_numpy().astype(np.datetime64(t0).dtype),
+        station=locs,
+        parameter=names,
+    )
+    if time is not None:
+        ds = ds.sel(time=time)
+    if stations is not None:
+        ds = ds.sel(station=stations)
+    names = params if params is not None else ds["parameter"].to_numpy().tolist()
+    return xr.Dataset(
+        {name: ds["values"].sel(parameter=name, drop=True) for name in names},
+        attrs={
+            "header": ds.attrs["header"],
+            "scu": int(ds.attrs["scu"]),
+            "t0": t0,
+        },
+    )
+
+
+def _record_dtype(noseg: int, noout: int) -> np.dtype:
+    # Each record is an int32 timestep followed by a (noseg, noout) float32 block
+    return np.dtype([("ts", "<i4"), ("values", "<f4", (noseg, noout))])
+
+
+@lru_cache(maxsize=64)
+def _load_index(hisfile: Path, mtime_ns: int, size: int) -> HisIndex:
+    """Load the index of a hisfile from its sidecar, or parse and persist it."""
+    sidecar = hisfile.with_name(hisfile.name + HIS_INDEX_SUFFIX)
+    index = _read_sidecar_index(sidecar, mtime_ns, size)
+    if index is None:
+        index = _parse_his_header(hisfile, size)
+        _write_sidecar_index(sidecar, index, mtime_ns, size)
+    index.timesteps.flags.writeable = False
+    return index
+
+
+@lru_cache(maxsize=64)
+def _load_hia(hia_path: Path, mtime_ns: int, size: int) -> dict:  # noqa: ARG001
+    """Read the long name sections of a .hia sidecar file."""
+    config = configparser.ConfigParser(interpolation=None)
+    config.read(hia_path)
+    return {
+        section: dict(config[section].items())
+        for section in ("Long Locations", "Long Parameters")
+        if section in config
+    }
+
+
+def _parse_his_header(hisfile: Path, filesize: int) -> HisIndex:
+    """Parse the header, parameter names, station table and timesteps."""
+    with hisfile.open("rb") as f:
+        header = f.read(120).decode("utf-8")
+        timeinfo = f.read(40).decode("utf-8")
+        datestr = timeinfo[4:14].replace(" ", "0") + timeinfo[14:23]
+        startdate = datetime.strptime(datestr, "%Y.%m.%d %H:%M:%S")  # noqa: DTZ007
+        try:
+            dt = int(timeinfo[30:-2])  # assumes unit is seconds
+        except ValueError:
+            # in some RIBASIM his files the s is one place earlier
+            dt = int(timeinfo[30:-3])
+        noout, noseg = unpack("ii", f.read(8))
+        notim = int(
+            (filesize - 168 - noout * 20 - noseg * 24) / (4 * (noout * noseg + 1)),
+        )
+        params = []
+        for _ in range(noout):
+            param = (f.read(20).rstrip().lstrip()).decode("utf-8")
+            if (
+                count := params.count(param)
+            ) > 0:  # Checks if there are duplicate data var names and adds a suffix
+                param += f"_{count + 1}"
+            params.append(param)
+
+        loc_table = np.frombuffer(f.read(noseg * 24), dtype=_LOCATION_DTYPE)
+        locs = [bytes(name).rstrip().decode("utf-8") for name in loc_table["name"]]
+        offset = f.tell()
+
+    index = HisIndex(
+        header=header,
+        t0=startdate,
+        scu=dt,
+        params=tuple(params),
+        stations=tuple(locs),
+        timesteps=np.empty(notim, dtype=np.int32),
+        offset=offset,
+    )
+    # Only the int32 timestep of every record is touched
+    timesteps = np.array(_open_records(hisfile, index, mmap=True)["ts"])
+    return index._replace(timesteps=timesteps.astype(np.int32))
+
+
+def _read_sidecar_index(sidecar: Path, mtime_ns: int, size: int) -> HisIndex | None:
+    """Read a persisted index, if it exists and matches the hisfile."""
+    try:
+        with sidecar.open() as f:
+            content = json.load(f)
+        if content["mtime_ns"] != mtime_ns or content["size"] != size:
+            return None
+        return HisIndex(
+            header=content["header"],
+            t0=datetime.fromisoformat(content["t0"]),
+            scu=content["scu"],
+            params=tuple(content["params"]),
+            stations=tuple(content["stations"]),
+            timesteps=np.array(content["timesteps"], dtype=np.int32),
+            offset=content["offset"],
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_sidecar_index(
+    sidecar: Path, index: HisIndex, mtime_ns: int, size: int
+) -> None:
+    """Persist the index next to the hisfile, skipped if the folder is read-only."""
+    content = {
+        "mtime_ns": mtime_ns,
+        "size": size,
+        "header": index.header,
+        "t0": index.t0.isoformat(),
+        "scu": index.scu,
+        "params": list(index.params),
+        "stations": list(index.stations),
+        "timesteps": index.timesteps.tolist(),
+        "offset": index.offset,
+    }
+    try:
+        with sidecar.open("w") as f:
+            json.dump(content, f)
+    except OSError:
+        logger.debug("Could not write HIS index file %s", sidecar)
+
+
+def _open_records(hisfile: Path, head: HisIndex, *, mmap: bool) -> np.ndarray:
+    """Return the record block of a hisfile as a structured array."""
+    if head.notim == 0:
+        return np.empty(0, dtype=head.record_dtype)
+    if mmap:
+        return np.memmap(
+            hisfile,
+            dtype=head.record_dtype,
+            mode="r",
+            offset=head.offset,
+            shape=(head.notim,),
+        )
+    return np.fromfile(
+        hisfile, dtype=head.record_dtype, count=head.notim, offset=head.offset
+    )
+
+
+def _positions(names: list[str], selection: list[str] | None, dim: str) -> np.ndarray:
+    """Return the positions of the selected names, or of all names."""
+    if selection is None:
+        return np.arange(len(names))
+    lookup = {name: i for i, name in enumerate(names)}
+    missing = [name for name in selection if name not in lookup]
+    if missing:
+        err_msg = f"{dim} not found in HIS file: {missing}"
+        raise KeyError(err_msg)
+    return np.array([lookup[name] for name in selection], dtype=np.intp)
+
+
+def _time_slice(dates: np.ndarray, time: slice | None) -> slice:
+    """Convert a label based time slice to a positional slice."""
+    if time is None:
+        return slice(None)
+    return pd.DatetimeIndex(dates).slice_indexer(time.start, time.stop)
+
+
+class _HisBackendArray(BackendArray):
+    """Lazily indexed view on a single parameter of a hisfile.
+
+    Only the file path and the record layout are stored, the file is memory-mapped
+    on access so that indexing reads just the requested byte ranges.
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        head: HisIndex,
+        param: int,
+        time_index: np.ndarray,
+        station_index: np.ndarray,
+    ) -> None:
+        self.file_path = file_path
+        self.head = head
+        self.param = param
+        self.time_index = time_index
+        self.station_index = station_index
+        self.shape = (len(time_index), len(station_index))
+        self.dtype = np.dtype(np.float32)
+
+    def __getitem__(self, key: indexing.ExplicitIndexer) -> np.ndarray:
+        return indexing.explicit_indexing_adapter(
+            key,
+            self.shape,
+            indexing.IndexingSupport.OUTER,
+            self._raw_indexing_method,
+        )
+
+    def _raw_indexing_method(self, key: tuple) -> np.ndarray:
+        rows = self.time_index[key[0]]
+        cols = self.station_index[key[1]]
+        records = _open_records(self.file_path, self.head, mmap=True)
+        values = records["values"][
+            np.atleast_1d(rows)[:, None],
+            np.atleast_1d(cols)[None, :],
+            self.param,
+        ]
+        return values.astype(np.float32).reshape(np.shape(rows) + np.shape(cols))
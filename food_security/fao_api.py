@@ -1,13 +1,56 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
 import faostat
 import pandas as pd
 
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from food_security.fao_cache import FAOCache
+    from food_security.fao_mirror import FAOMirror
+
+logger = logging.getLogger(__name__)
+
+# Tables that FAOClient.prefetch can request for every year
+FAO_PREFETCH_TABLES = ("production", "trade_matrix")
+
 
 class FAOClient:
-    def __init__(self, username: str = None, password: str = None, token: str = None):
+    def __init__(
+        self,
+        username: str = None,
+        password: str = None,
+        token: str = None,
+        cache: FAOCache | None = None,
+        mirror: FAOMirror | None = None,
+    ):
         self.token = token
         self.username = username
         self.password = password
+        # Optional on-disk cache of the API responses
+        self.cache = cache
+        # Optional local mirror of bulk downloads, used instead of the API
+        self.mirror = mirror
+        self._mirrored = set(mirror.datasets()) if mirror is not None else set()
+        # Area code lookups and tables that were requested by prefetch
+        self._pars = {}
+        # Prefetched tables are stored as (table, None) or (None, error)
+        self._prefetched = {}
+        self._set_requests_args()
+
+    def __setstate__(self, state: dict) -> None:
+        # The credentials are module state of faostat, set them in new processes
+        self.__dict__.update(state)
+        self._set_requests_args()
 
+    def _set_requests_args(self) -> None:
+        if self.cache is not None and self.cache.offline:
+            # Offline clients never call the API and need no credentials
+            return
         if self.token is None:
             faostat.set_requests_args(
                 username=self.username,
@@ -16,14 +59,98 @@ class FAOClient:
         else:
             faostat.set_requests_args(token=self.token)
 
+    def prefetch(
+        self,
+        country_name: str,
+        years: Iterable[int],
+        tables: Iterable[str] = FAO_PREFETCH_TABLES,
+        max_workers: int = 8,
+    ) -> None:
+        """Request the FAO tables of all years at once.
+
+        The requests are made concurrently by a pool of threads, later calls to
+        get_food_production_df and get_trade_matrix_df for these years return
+        the prefetched tables. A request that fails raises its error when its
+        table is retrieved.
+
+        Args:
+            country_name (str): Name of the country, like "Viet Nam".
+            years (Iterable[int]): Years to request.
+            tables (Iterable[str], optional): Tables to request, a subset of
+                FAO_PREFETCH_TABLES. Defaults to all of them.
+            max_workers (int, optional): Maximum number of concurrent requests.
+                Defaults to 8.
+
+        """
+        fetchers = {
+            "production": ("QCL", "area", self._fetch_food_production_df),
+            "trade_matrix": ("TM", "reporterarea", self._fetch_trade_matrix_df),
+        }
+        tables = list(tables)
+        unknown = [table for table in tables if table not in fetchers]
+        if unknown:
+            err_msg = f"Unknown FAO tables {unknown}, expected any of {list(fetchers)}"
+            raise ValueError(err_msg)
+        # Look up the area codes once, before the requests that need them
+        for table in tables:
+            ds_code, par, _ = fetchers[table]
+            if ds_code not in self._mirrored:
+                self.get_par(ds_code, par)
+
+        requests = [
+            (table, year)
+            for table in tables
+            for year in years
+            if (table, country_name, year) not in self._prefetched
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                (table, country_name, year): pool.submit(
+                    fetchers[table][2], country_name, year
+                )
+                for table, year in requests
+            }
+        for key, future in futures.items():
+            error = future.exception()
+            self._prefetched[key] = (None if error else future.result(), error)
+        logger.info("Prefetched %d FAO tables of %s", len(requests), country_name)
+
     def get_food_production_df(self, country_name: str, year: int) -> pd.DataFrame:
-        area_code = faostat.get_par("QCL", "area")[country_name]
+        return self._get_prefetched(
+            "production", country_name, year, self._fetch_food_production_df
+        )
+
+    def get_trade_matrix_df(self, country_name: str, year: int) -> pd.DataFrame:
+        return self._get_prefetched(
+            "trade_matrix", country_name, year, self._fetch_trade_matrix_df
+        )
+
+    def _get_prefetched(self, table: str, country_name: str, year: int, fetch):
+        if (table, country_name, year) not in self._prefetched:
+            return fetch(country_name, year)
+        fao_df, error = self._prefetched[table, country_name, year]
+        if error is not None:
+            raise error
+        # Components modify the tables they get
+        return fao_df.copy()
+
+    def _fetch_food_production_df(self, country_name: str, year: int):
+        if "QCL" in self._mirrored:
+            # 5510 is the production element of the data, 2510 of the API
+            return self._get_mirror_df(
+                "QCL", country_name, years=[year], elements=["5510"]
+            )
+        area_code = self.get_par("QCL", "area")[country_name]
         pars = {"area": area_code, "year": str(year), "element": "2510"}
         coding = {"area": "FAO"}
         return self._get_fao_df("QCL", pars=pars, coding=coding)
 
-    def get_trade_matrix_df(self, country_name: str, year: int) -> pd.DataFrame:
-        area_code = faostat.get_par("TM", "reporterarea")[country_name]
+    def _fetch_trade_matrix_df(self, country_name: str, year: int):
+        if "TM" in self._mirrored:
+            return self._get_mirror_df(
+                "TM", country_name, years=[year], elements=["5910", "5610"]
+            )
+        area_code = self.get_par("TM", "reporterarea")[country_name]
         pars = {
             "reporterarea": area_code,
             "element": ["2910", "2610"],
@@ -35,14 +162,40 @@ class FAOClient:
     def get_producer_price_df(
         self, country_name: str, year: int = None
     ) -> pd.DataFrame:
-        area_code = faostat.get_par("PP", "area")[country_name]
+        if "PP" in self._mirrored:
+            return self._get_mirror_df("PP", country_name)
+        area_code = self.get_par("PP", "area")[country_name]
 
         pars = {"area": area_code}
         coding = {}
         return self._get_fao_df("PP", pars=pars, coding=coding)
 
+    def get_par(self, ds_code: str, par: str) -> dict:
+        if (ds_code, par) not in self._pars:
+            request = {"call": "get_par", "code": ds_code, "par": par}
+            self._pars[ds_code, par] = self._cached(
+                request, lambda: faostat.get_par(ds_code, par)
+            )
+        return self._pars[ds_code, par]
+
     def _get_fao_df(self, ds_code: str, pars: dict, coding: dict) -> pd.DataFrame:
-        fao_df = faostat.get_data_df(ds_code, pars=pars, coding=coding)
+        request = {
+            "call": "get_data_df",
+            "code": ds_code,
+            "pars": pars,
+            "coding": coding,
+        }
+        fao_df = self._cached(
+            request, lambda: faostat.get_data_df(ds_code, pars=pars, coding=coding)
+        )
+        return self._check_fao_df(fao_df)
+
+    def _get_mirror_df(self, ds_code: str, country_name: str, **filters):
+        fao_df = self.mirror.query(ds_code, area=country_name, **filters)
+        return self._check_fao_df(fao_df)
+
+    @staticmethod
+    def _check_fao_df(fao_df: pd.DataFrame) -> pd.DataFrame:
         if fao_df.empty:
             err_msg = "No FAO data found for the given parameters."
             raise ValueError(err_msg)
@@ -52,9 +205,23 @@ class FAOClient:
         return fao_df
 
     def get_df(self, ds_code: str, pars: dict, coding: dict):
-        return faostat.get_data_df(
-            ds_code,
-            pars=pars,
-            coding=coding,
-            token=self.token,
+        request = {
+            "call": "get_data_df",
+            "code": ds_code,
+            "pars": pars,
+            "coding": coding,
+        }
+        return self._cached(
+            request,
+            lambda: faostat.get_data_df(
+                ds_code,
+                pars=pars,
+                coding=coding,
+                token=self.token,
+            ),
         )
+
+    def _cached(self, request: dict, fetch):
+        if self.cache is None:
+            return fetch()
+        return self.cache.fetch(request, fetch)
@@ -0,0 +1,202 @@
+"""Persistent on-disk cache for FAOSTAT API responses.
+
+Responses are stored in a SQLite database, keyed by the SHA-256 hash of the
+request: the FAOSTAT call with its dataset code, parameters and coding. Entries
+expire after a time to live and the least recently used entries are evicted when
+the cache grows beyond its size limit. In offline mode expired entries are still
+returned and a request that is not cached raises an error instead of calling the
+API.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import pandas as pd
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+# Default location of the cache database
+DEFAULT_FAO_CACHE_PATH = Path.home() / ".cache" / "food_security" / "fao.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    request TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+
+def request_key(request: dict) -> str:
+    """Content address of a request, independent of the order of its parameters."""
+    content = json.dumps(request, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class FAOCache:
+    """SQLite cache of FAOSTAT responses with a time to live and a size limit."""
+
+    def __init__(
+        self,
+        path: Path | str = DEFAULT_FAO_CACHE_PATH,
+        ttl: float | None = 30 * 24 * 3600,
+        max_bytes: int | None = 512 * 1024**2,
+        *,
+        offline: bool = False,
+    ):
+        """Open or create a cache.
+
+        Args:
+            path (Path | str, optional): Path of the SQLite database. Defaults to
+                DEFAULT_FAO_CACHE_PATH.
+            ttl (float | None, optional): Seconds after which an entry expires.
+                Defaults to 30 days, None never expires entries.
+            max_bytes (int | None, optional): Size limit of the stored responses.
+                Defaults to 512 MiB, None disables eviction.
+            offline (bool, optional): Never call the API, serve expired entries
+                and raise a LookupError for requests that are not cached.
+                Defaults to False.
+
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as con, con:
+            con.execute(_SCHEMA)
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as con:
+            return con.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, request: dict) -> Any | None:
+        """Return the cached response of a request, or None when it is not cached.
+
+        Expired entries are returned in offline mode only.
+        """
+        key = request_key(request)
+        with closing(self._connect()) as con, con:
+            row = con.execute(
+                "SELECT kind, data, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            kind, data, created = row
+            if not self.offline and self._expired(created):
+                return None
+            con.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+        return _loads(kind, data)
+
+    def set(self, request: dict, response: Any) -> None:
+        """Store the response of a request and evict entries beyond the size limit."""
+        kind, data = _dumps(response)
+        now = time.time()
+        with closing(self._connect()) as con, con:
+            con.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    request_key(request),
+                    json.dumps(request, sort_keys=True, default=str),
+                    kind,
+                    data,
+                    len(data),
+                    now,
+                    now,
+                ),
+            )
+        self.evict()
+
+    def fetch(self, request: dict, fetch: Callable[[], Any]) -> Any:
+        """Return the cached response of a request or fetch and cache it.
+
+        Args:
+            request (dict): Description of the request, used as cache key.
+            fetch (Callable[[], Any]): Calls the API, only used on a cache miss.
+
+        Raises:
+            LookupError: The request is not cached and the cache is offline.
+
+        Returns:
+            Any: The response, a DataFrame or a JSON serializable object.
+
+        """
+        response = self.get(request)
+        if response is not None:
+            return response
+        if self.offline:
+            err_msg = f"FAO request {request} is not cached and the cache is offline"
+            raise LookupError(err_msg)
+        response = fetch()
+        if isinstance(response, pd.DataFrame) and response.empty:
+            # Not cached, the data may still be published
+            return response
+        self.set(request, response)
+        return response
+
+    def evict(self) -> None:
+        """Remove expired entries and the least recently used beyond max_bytes."""
+        with closing(self._connect()) as con, con:
+            if self.ttl is not None and not self.offline:
+                con.execute(
+                    "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)
+                )
+            if self.max_bytes is None:
+                return
+            total = con.execute("SELECT COALESCE(SUM(size), 0) FROM responses")
+            total = total.fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            rows = con.execute("SELECT key, size FROM responses ORDER BY accessed")
+            for key, size in rows.fetchall():
+                if total <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            con.executemany("DELETE FROM responses WHERE key = ?", evicted)
+            logger.debug("Evicted %d FAO responses from %s", len(evicted), self.path)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with closing(self._connect()) as con, con:
+            con.execute("DELETE FROM responses")
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per operation, so the cache can be shared between threads
+        return sqlite3.connect(self.path, timeout=30)
+
+
+def _dumps(response: Any) -> tuple[str, str]:
+    if isinstance(response, pd.DataFrame):
+        return "frame", response.to_json(orient="split", index=False)
+    return "json", json.dumps(response)
+
+
+def _loads(kind: str, data: str) -> Any:
+    if kind == "frame":
+        return pd.read_json(
+            io.StringIO(data), orient="split", dtype=False, convert_dates=False
+        )
+    return json.loads(data)
@@ -0,0 +1,228 @@
+"""Local mirror of FAOSTAT bulk downloads.
+
+The FAOSTAT bulk downloads (CSV files or the ZIP archives of the normalized
+datasets) are imported into a SQLite database with a table per dataset, indexed
+on area, year, element and item. FAOClient answers requests for an imported
+dataset from the mirror instead of the FAOSTAT API. The rows are returned as
+strings with the column names of the API, like ``faostat.get_data_df``.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import zipfile
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import IO, TYPE_CHECKING
+
+import pandas as pd
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Default location of the mirror database
+DEFAULT_FAO_MIRROR_PATH = Path.home() / ".cache" / "food_security" / "fao_mirror.sqlite"
+
+# Column with the country name of the datasets that can be mirrored
+FAO_MIRROR_DATASETS = {"QCL": "Area", "TM": "Reporter Countries", "PP": "Area"}
+
+# Bulk download columns that the API names after their coding system
+_API_COLUMNS = {
+    "Area Code": "Area Code (FAO)",
+    "Reporter Country Code": "Reporter Country Code (FAO)",
+    "Partner Country Code": "Partner Country Code (FAO)",
+}
+
+# Columns that are indexed, after the country name column
+_INDEX_COLUMNS = ("Year", "Element Code", "Item Code")
+
+
+class FAOMirror:
+    """SQLite mirror of FAOSTAT datasets imported from bulk downloads."""
+
+    def __init__(self, path: Path | str = DEFAULT_FAO_MIRROR_PATH):
+        self.path = Path(path)
+
+    def __contains__(self, ds_code: str) -> bool:
+        return ds_code in self.datasets()
+
+    def datasets(self) -> list[str]:
+        """Codes of the imported datasets."""
+        if not self.path.exists():
+            return []
+        with closing(self._connect()) as con:
+            tables = con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            names = {name for (name,) in tables.fetchall()}
+        return [code for code in FAO_MIRROR_DATASETS if _table(code) in names]
+
+    def import_bulk(
+        self,
+        ds_code: str,
+        file_path: Path | str,
+        encoding: str | None = None,
+        chunksize: int = 200_000,
+    ) -> int:
+        """Import a bulk download of a dataset, replacing an earlier import.
+
+        Args:
+            ds_code (str): FAOSTAT dataset code, one of FAO_MIRROR_DATASETS.
+            file_path (Path | str): CSV file or ZIP archive of the dataset. The
+                normalized CSV file is used of archives with several files.
+            encoding (str | None, optional): Encoding of the CSV file. Defaults to
+                None, UTF-8 when the file starts as valid UTF-8 and Latin-1
+                otherwise.
+            chunksize (int, optional): Number of rows read at once. Defaults to
+                200_000.
+
+        Returns:
+            int: Number of imported rows.
+
+        """
+        area_column = _area_column(ds_code)
+        table = _table(ds_code)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        n_rows = 0
+        with _open_bulk(Path(file_path)) as f, closing(self._connect()) as con, con:
+            if encoding is None:
+                encoding = _sniff_encoding(f.read(1 << 16))
+                f.seek(0)
+            con.execute(f"DROP TABLE IF EXISTS {table}")
+            reader = pd.read_csv(
+                f,
+                dtype=str,
+                keep_default_na=False,
+                encoding=encoding,
+                chunksize=chunksize,
+            )
+            for chunk in reader:
+                chunk = _api_schema(chunk)
+                if area_column not in chunk.columns:
+                    err_msg = f"{file_path} has no {area_column} column of {ds_code}"
+                    raise ValueError(err_msg)
+                chunk.to_sql(table, con, if_exists="append", index=False)
+                n_rows += len(chunk)
+            if n_rows == 0:
+                err_msg = f"{file_path} contains no {ds_code} rows"
+                raise ValueError(err_msg)
+            columns = [
+                column
+                for column in (area_column, *_INDEX_COLUMNS)
+                if column in chunk.columns
+            ]
+            con.execute(
+                f"CREATE INDEX {table}_area ON {table} "
+                f"({', '.join(_quote(column) for column in columns[:3])})"
+            )
+            if "Item Code" in columns:
+                con.execute(f'CREATE INDEX {table}_item ON {table} ("Item Code")')
+        logger.info("Imported %d %s rows from %s", n_rows, ds_code, file_path)
+        return n_rows
+
+    def query(
+        self,
+        ds_code: str,
+        area: str,
+        years: Iterable[str | int] | None = None,
+        elements: Iterable[str] | None = None,
+        items: Iterable[str] | None = None,
+    ) -> pd.DataFrame:
+        """Select the rows of a country from an imported dataset.
+
+        Args:
+            ds_code (str): FAOSTAT dataset code.
+            area (str): Country name, like "Viet Nam".
+            years (Iterable[str | int] | None, optional): Years to select. Defaults
+                to None, all years.
+            elements (Iterable[str] | None, optional): Element codes of the data,
+                like "5510" for production. Defaults to None, all elements.
+            items (Iterable[str] | None, optional): Item codes to select. Defaults
+                to None, all items.
+
+        Returns:
+            pd.DataFrame: Selected rows, all columns are strings.
+
+        """
+        table = _table(ds_code)
+        conditions = [f"{_quote(_area_column(ds_code))} = ?"]
+        params = [area]
+        for column, values in (
+            ("Year", years),
+            ("Element Code", elements),
+            ("Item Code", items),
+        ):
+            if values is None:
+                continue
+            values = [str(value) for value in values]
+            conditions.append(
+                f"{_quote(column)} IN ({', '.join('?' * len(values))})"
+            )
+            params.extend(values)
+        where = " AND ".join(conditions)
+        # Rows in the order of the bulk download
+        sql = f"SELECT * FROM {table} WHERE {where} ORDER BY rowid"  # noqa: S608
+        with closing(self._connect()) as con:
+            return pd.read_sql_query(sql, con, params=params)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+
+def _area_column(ds_code: str) -> str:
+    if ds_code not in FAO_MIRROR_DATASETS:
+        err_msg = (
+            f"Dataset {ds_code} cannot be mirrored, expected any of "
+            f"{list(FAO_MIRROR_DATASETS)}"
+        )
+        raise ValueError(err_msg)
+    return FAO_MIRROR_DATASETS[ds_code]
+
+
+def _table(ds_code: str) -> str:
+    _area_column(ds_code)
+    return ds_code.lower()
+
+
+def _quote(column: str) -> str:
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _api_schema(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk.columns = chunk.columns.str.strip().str.lstrip("\ufeff")
+    chunk = chunk.rename(columns=_API_COLUMNS)
+    if "Value" in chunk.columns:
+        # The API leaves out missing values
+        chunk = chunk[chunk["Value"] != ""].copy()
+    # Bulk downloads prefix codes with a quote to keep their leading zeros
+    for column in chunk.columns[chunk.columns.str.contains("Code")]:
+        chunk[column] = chunk[column].str.lstrip("'")
+    return chunk
+
+
+def _sniff_encoding(head: bytes) -> str:
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character may be cut off at the end of the head
+        if e.start < len(head) - 3:
+            return "latin-1"
+    return "utf-8-sig"
+
+
+@contextmanager
+def _open_bulk(file_path: Path) -> Iterator[IO[bytes]]:
+    if file_path.suffix.lower() != ".zip":
+        with file_path.open("rb") as f:
+            yield f
+        return
+    with zipfile.ZipFile(file_path) as archive:
+        names = [name for name in archive.namelist() if name.lower().endswith(".csv")]
+        normalized = [name for name in names if "normalized" in name.lower()]
+        names = normalized or names
+        if not names:
+            err_msg = f"No CSV file found in {file_path}"
+            raise ValueError(err_msg)
+        with archive.open(sorted(names, key=len)[0]) as f:
+            yield f
@@ -0,0 +1,109 @@
+"""Projection, area and bounds of the regions of a food security run.
+
+Estimating the UTM zone of the regions and reprojecting their boundaries is
+expensive for high resolution boundaries, and the components used to do it for
+every year again. A RegionGeometry is made once per run from the area of
+interest and computes these properties once, when they are first needed. The
+components read them instead of copying and reprojecting the regions.
+"""
+
+from __future__ import annotations
+
+import logging
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+import pandas as pd
+
+from food_security.items import region_keys
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+    import numpy as np
+    from pyproj import CRS
+
+logger = logging.getLogger(__name__)
+
+
+class RegionGeometry:
+    """Geometry properties of the regions of the area of interest."""
+
+    def __init__(self, aoi: gpd.GeoDataFrame, key: str = "Name"):
+        """Create the geometry of the regions of an area of interest.
+
+        Args:
+            aoi (gpd.GeoDataFrame): Regions of the area of interest.
+            key (str, optional): Column with the region names, the index is used
+                when the regions have no such column. Defaults to "Name".
+
+        """
+        self.aoi = aoi
+        self.key = key
+
+    @cached_property
+    def utm_crs(self) -> CRS:
+        """UTM projection of the area of interest."""
+        return self.aoi.estimate_utm_crs()
+
+    @cached_property
+    def projected(self) -> gpd.GeoSeries:
+        """Boundaries of the regions in the UTM projection."""
+        logger.debug("Projecting %s regions to %s", len(self.aoi), self.utm_crs)
+        return self.aoi.geometry.to_crs(self.utm_crs)
+
+    @cached_property
+    def area(self) -> pd.Series:
+        """Area of the regions in square meters by region name."""
+        return pd.Series(
+            self.projected.area.to_numpy(), index=region_keys(self.aoi, self.key)
+        )
+
+    @cached_property
+    def bounds(self) -> np.ndarray:
+        """Bounds of the area of interest, minx, miny, maxx and maxy."""
+        return self.aoi.total_bounds
+
+    def areas(self, region: gpd.GeoDataFrame) -> pd.Series:
+        """Area of regions in square meters.
+
+        The areas of regions of the area of interest are looked up by name, the
+        areas of other regions are computed in the UTM projection of the area of
+        interest.
+
+        Args:
+            region (gpd.GeoDataFrame): Regions to get the area of.
+
+        Returns:
+            pd.Series: Area of the regions, with the index of the regions.
+
+        """
+        keys = region_keys(region, self.key)
+        if self.area.index.is_unique and keys.isin(self.area.index).all():
+            return pd.Series(self.area.loc[keys].to_numpy(), index=region.index)
+        logger.debug("Regions are not in the area of interest, projecting them")
+        return region.geometry.to_crs(self.utm_crs).area
+
+    def project(self, region: gpd.GeoDataFrame) -> gpd.GeoSeries:
+        """Boundaries of regions in the UTM projection of the area of interest.
+
+        The projected boundaries of regions of the area of interest are looked up
+        by name, other regions are projected.
+
+        Args:
+            region (gpd.GeoDataFrame): Regions to project.
+
+        Returns:
+            gpd.GeoSeries: Projected boundaries, with the index of the regions.
+
+        """
+        keys = region_keys(region, self.key)
+        aoi_keys = region_keys(self.aoi, self.key)
+        if aoi_keys.is_unique and keys.isin(aoi_keys).all():
+            projected = self.projected.iloc[aoi_keys.get_indexer(keys)]
+            return projected.set_axis(region.index)
+        return region.geometry.to_crs(self.utm_crs)
+
+    def warm(self) -> RegionGeometry:
+        """Compute the projection and areas now, before the object is shared."""
+        _ = self.area, self.bounds
+        return self
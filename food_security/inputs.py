@@ -0,0 +1,109 @@
+"""Run-scoped registry of the static input tables of the food security components.
+
+The modelled crops, conversion and population tables are the same for every year
+of a run, but the components used to read them for every year again. Parsing the
+Excel conversion tables is particularly slow. The registry reads every table once
+and hands out copies, so a component cannot change the table of another one.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Suffixes of the table files that the registry can read
+CSV_SUFFIXES = (".csv",)
+EXCEL_SUFFIXES = (".xls", ".xlsx")
+
+
+class InputRegistry:
+    """Read input tables once and memoize them by path and modification time."""
+
+    def __init__(self):
+        self._tables = {}
+        self._row_indexes = {}
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def read_table(self, path: Path | str, **kwargs: Any) -> pd.DataFrame:
+        """Read a CSV or Excel table, or return it from the registry.
+
+        A table is read again when its file changed since it was read.
+
+        Args:
+            path (Path | str): Path to a CSV or Excel file.
+            **kwargs: Keyword arguments of pd.read_csv or pd.read_excel, like
+                sheet_name. They are part of the key of the table.
+
+        Raises:
+            ValueError: The file is not a CSV or Excel file.
+
+        Returns:
+            pd.DataFrame: Copy of the table.
+
+        """
+        return self._read(path, **kwargs)[1][1].copy()
+
+    def read_rows(
+        self, path: Path | str, column: str, value: Any, **kwargs: Any
+    ) -> pd.DataFrame:
+        """Read the rows of a table with a value in a column.
+
+        The rows of every value of the column are indexed once per table, so
+        selecting the rows of another value, like the next year of a run, does not
+        scan the whole table again.
+
+        Args:
+            path (Path | str): Path to a CSV or Excel file.
+            column (str): Column to select the rows by.
+            value (Any): Value of the selected rows.
+            **kwargs: Keyword arguments of pd.read_csv or pd.read_excel.
+
+        Raises:
+            ValueError: The file is not a CSV or Excel file.
+
+        Returns:
+            pd.DataFrame: Copy of the rows, empty when no row has the value.
+
+        """
+        key, (version, table) = self._read(path, **kwargs)
+        cached = self._row_indexes.get((key, column))
+        if cached is None or cached[0] != version:
+            self._row_indexes[(key, column)] = (
+                version,
+                table.groupby(column, sort=False).indices,
+            )
+        rows = self._row_indexes[(key, column)][1].get(value, [])
+        return table.iloc[rows].copy()
+
+    def _read(self, path: Path | str, **kwargs: Any) -> tuple[tuple, tuple]:
+        """Return the key and the version and table of a path from the registry."""
+        path = Path(path)
+        suffix = path.suffix.lower()
+        if suffix not in CSV_SUFFIXES + EXCEL_SUFFIXES:
+            err_msg = f"Expected a CSV or Excel file, but got {path}"
+            raise ValueError(err_msg)
+        stat = path.stat()
+        # Arguments like usecols are lists, compare their representations
+        key = (path.resolve(), repr(sorted(kwargs.items())))
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._tables.get(key)
+        if cached is None or cached[0] != version:
+            logger.debug("Reading input table %s", path)
+            if suffix in CSV_SUFFIXES:
+                table = pd.read_csv(path, **kwargs)
+            else:
+                table = pd.read_excel(path, **kwargs)
+            self._tables[key] = (version, table)
+        return key, self._tables[key]
+
+    def clear(self) -> None:
+        """Remove all tables."""
+        self._tables.clear()
+        self._row_indexes.clear()
@@ -1,7 +1,14 @@
 """Module for base class for food security classes."""
 
+from pathlib import Path
+
 import geopandas as gpd
+import pandas as pd
+
 from food_security.fao_api import FAOClient
+from food_security.geometry import RegionGeometry
+from food_security.inputs import InputRegistry
+from food_security.items import ItemBlock
 
 
 class FSBase:
@@ -13,12 +20,30 @@ class FSBase:
         cfg: dict,
         region: gpd.GeoDataFrame,
         fao_client: FAOClient,
+        inputs: InputRegistry | None = None,
+        items: ItemBlock | None = None,
+        geometry: RegionGeometry | None = None,
     ) -> None:
-        """Instantiate a FSBase object."""
+        """Instantiate a FSBase object.
+
+        The input tables are read from the inputs registry of the run, a new
+        registry is used when it is not given. The food item quantities of the
+        regions are read from and written to the items block. Without a block, the
+        item columns of the region are moved into a new block, which run adds back
+        to the region as columns. The projection and areas of the regions are read
+        from the geometry of the run, the geometry of the region is used when it is
+        not given.
+        """
         self.year = year
         self.cfg = cfg
-        self.region = region
         self.fao_client = fao_client
+        self.inputs = inputs if inputs is not None else InputRegistry()
+        self._expand_items = items is None
+        if items is None:
+            items, region = ItemBlock.from_region(region)
+        self.items = items
+        self.region = region
+        self.geometry = geometry if geometry is not None else RegionGeometry(region)
 
     def run(self) -> gpd.GeoDataFrame:
         """Run the add data methods of a FSbase object."""
@@ -26,4 +51,19 @@ class FSBase:
             if attr.startswith("add"):
                 method = getattr(self, attr)
                 method()
+        if self._expand_items:
+            return self.items.expand(self.region)
         return self.region
+
+    def read_conversion_table(self) -> pd.DataFrame:
+        """Read the FAO item conversion table of the config."""
+        return read_conversion_table(self.cfg, self.inputs)
+
+
+def read_conversion_table(cfg: dict, inputs: InputRegistry) -> pd.DataFrame:
+    """Read the FAO item conversion table of a config from an inputs registry."""
+    config = cfg["food_production"]["fao"]["conversion_table"]
+    conversion_path = Path(cfg["main"]["input_path"]) / config["path"]
+    if conversion_path.suffix.lower() == ".csv":
+        return inputs.read_table(conversion_path)
+    return inputs.read_table(conversion_path, sheet_name=config.get("sheet_name", 0))
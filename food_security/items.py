@@ -0,0 +1,222 @@
+"""Dense block of the food item quantities of all regions.
+
+The food security components used to store the quantity of every food item in a
+GeoDataFrame column named <item>_<item code>, adding them one at a time and
+finding them back by matching the column names. An ItemBlock holds these
+quantities in a single regions by items array instead, which the components
+update in place. The block is expanded to the wide columns only for the output.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+from food_security.utils import ITEM_COLUMN_PATTERN
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class ItemBlock:
+    """Quantities of food items per region, keyed by the region name."""
+
+    def __init__(
+        self,
+        regions: Sequence[str],
+        names: Sequence[str] = (),
+        codes: Sequence[str] = (),
+        values: np.ndarray | None = None,
+    ):
+        """Create a block.
+
+        Args:
+            regions (Sequence[str]): Names of the regions, the rows of the block.
+            names (Sequence[str], optional): Names of the items. Defaults to none.
+            codes (Sequence[str], optional): FAO item codes of the items. Defaults
+                to none.
+            values (np.ndarray | None, optional): Quantities with a row per region
+                and a column per item. Defaults to None, no items.
+
+        """
+        self.regions = pd.Index(regions)
+        self.names = [str(name) for name in names]
+        self.codes = [str(code) for code in codes]
+        if values is None:
+            values = np.empty((len(self.regions), 0))
+        self.values = np.asarray(values, dtype=np.float64)
+        if self.values.shape != (len(self.regions), len(self.codes)) or len(
+            self.names
+        ) != len(self.codes):
+            err_msg = (
+                f"Item block of {len(self.regions)} regions and {len(self.codes)} "
+                f"items does not match values of shape {self.values.shape}"
+            )
+            raise ValueError(err_msg)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def columns(self) -> list[str]:
+        """Wide column names of the items, <item>_<item code>."""
+        return [f"{name}_{code}" for name, code in zip(self.names, self.codes)]
+
+    @classmethod
+    def from_region(
+        cls, region: pd.DataFrame, key: str = "Name"
+    ) -> tuple[ItemBlock, pd.DataFrame]:
+        """Move the item columns of a region frame into a new block.
+
+        Args:
+            region (pd.DataFrame): Regions with item columns named
+                <item>_<item code>.
+            key (str, optional): Column with the region names, the index is used
+                when the region has no such column. Defaults to "Name".
+
+        Returns:
+            tuple[ItemBlock, pd.DataFrame]: The block and the regions without the
+                item columns.
+
+        """
+        block = cls(region_keys(region, key))
+        return block, block.take_columns(region, key=key)
+
+    def take_columns(self, region: pd.DataFrame, key: str = "Name") -> pd.DataFrame:
+        """Move the item columns of a region frame into the block.
+
+        Args:
+            region (pd.DataFrame): Regions with item columns named
+                <item>_<item code>.
+            key (str, optional): Column with the region names, the index is used
+                when the region has no such column. Defaults to "Name".
+
+        Returns:
+            pd.DataFrame: The regions without the item columns.
+
+        """
+        columns = [col for col in region.columns if ITEM_COLUMN_PATTERN.match(col)]
+        if not columns:
+            return region
+        self.align(region_keys(region, key))
+        names, codes = zip(*(col.rsplit("_", 1) for col in columns))
+        self.set_items(names, codes, region[columns].to_numpy(dtype=np.float64))
+        return region.drop(columns=columns)
+
+    def set_items(
+        self, names: Sequence[str], codes: Sequence[str], values: np.ndarray
+    ) -> None:
+        """Set the quantities of items, adding the items that are not in the block.
+
+        Args:
+            names (Sequence[str]): Names of the items.
+            codes (Sequence[str]): FAO item codes of the items.
+            values (np.ndarray): Quantities with a row per region and a column per
+                item. The last column of an item that is given twice is used.
+
+        """
+        values = np.asarray(values, dtype=np.float64)
+        # The last column of an item that is given twice is used
+        last = {f"{name}_{code}": i for i, (name, code) in enumerate(zip(names, codes))}
+        positions = {column: i for i, column in enumerate(self.columns)}
+        new = [i for column, i in last.items() if column not in positions]
+        if new:
+            self.names += [str(names[i]) for i in new]
+            self.codes += [str(codes[i]) for i in new]
+            self.values = np.hstack(
+                [self.values, np.full((len(self.regions), len(new)), np.nan)]
+            )
+            positions = {column: i for i, column in enumerate(self.columns)}
+        targets = [positions[column] for column in last]
+        self.values[:, targets] = values[:, list(last.values())]
+
+    def code_values(self, values: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+        """Align values per item code to the items of the block.
+
+        Args:
+            values (pd.Series): Value per item code. The first value of a code
+                that is given twice is used.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Positions of the items with a value and
+                their values.
+
+        """
+        values = values[~values.index.duplicated()]
+        positions = np.flatnonzero(pd.Index(self.codes).isin(values.index))
+        aligned = values.loc[[self.codes[i] for i in positions]].to_numpy()
+        return positions, aligned
+
+    def add_outer(self, weights: np.ndarray, values: pd.Series) -> None:
+        """Add the outer product of region weights and values per item code.
+
+        Items without a value are unchanged.
+        """
+        positions, aligned = self.code_values(values)
+        self.values[:, positions] += np.outer(weights, aligned)
+
+    def scale(self, factors: pd.Series) -> None:
+        """Multiply the quantities of items by a factor per item code.
+
+        Items without a factor are unchanged.
+        """
+        positions, aligned = self.code_values(factors)
+        self.values[:, positions] *= aligned
+
+    def total(self) -> np.ndarray:
+        """Sum of the items of every region, ignoring missing quantities."""
+        return np.nansum(self.values, axis=1)
+
+    def align(self, regions: Sequence[str]) -> None:
+        """Reorder the rows of the block to the given regions.
+
+        Regions that are not in the block get missing quantities.
+        """
+        regions = pd.Index(regions)
+        if regions.equals(self.regions):
+            return
+        if not self.regions.is_unique:
+            err_msg = "Item blocks with duplicate region names cannot be aligned"
+            raise ValueError(err_msg)
+        rows = self.regions.get_indexer(regions)
+        values = np.full((len(regions), len(self.codes)), np.nan)
+        values[rows >= 0] = self.values[rows[rows >= 0]]
+        self.regions = regions
+        self.values = values
+
+    def to_frame(self, index: pd.Index | None = None) -> pd.DataFrame:
+        """Wide frame of the block with a column per item."""
+        return pd.DataFrame(
+            self.values,
+            index=self.regions if index is None else index,
+            columns=self.columns,
+        )
+
+    def expand(self, region: pd.DataFrame, key: str = "Name") -> pd.DataFrame:
+        """Add the items to a region frame as <item>_<item code> columns.
+
+        Args:
+            region (pd.DataFrame): Regions to add the items to.
+            key (str, optional): Column with the region names, the index is used
+                when the region has no such column. Defaults to "Name".
+
+        Returns:
+            pd.DataFrame: The regions with a column per item.
+
+        """
+        self.align(region_keys(region, key))
+        columns = self.to_frame(index=region.index)
+        region = region.drop(columns=[c for c in columns if c in region.columns])
+        return pd.concat([region, columns], axis=1)
+
+
+def region_keys(region: pd.DataFrame, key: str = "Name") -> pd.Index:
+    """Names of the regions that key the rows of an item block."""
+    if key in region.columns:
+        return pd.Index(region[key])
+    return region.index
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import geopandas as gpd
@@ -10,6 +11,10 @@ import pandas as pd
 from food_security.fao_api import FAOClient
 from food_security.components import FoodProduction, FoodSupply, FoodValue
 from food_security.config import ConfigReader
+from food_security.geometry import RegionGeometry
+from food_security.inputs import InputRegistry
+from food_security.interface.base import read_conversion_table
+from food_security.items import ItemBlock, region_keys
 
 DEFAULT_CRS = "EPSG:4326"
 
@@ -23,45 +28,48 @@ class FoodSecurity:
         fao_client: FAOClient,
         output_path: Path | str | None = None,
         root: Path | str | None = None,
+        max_workers: int | None = None,
     ) -> None:
-        """Instantiate a food security object."""
+        """Instantiate a food security object.
+
+        Years are run in parallel by max_workers processes, which defaults to the
+        max_workers option of the main section of the config, or 1.
+        """
         self.config = ConfigReader(cfg_path, root=root)
         self.fao_client = fao_client
         self.aoi = gpd.read_file(self.config["main"]["aoi"]["path"])
+        # Projection and areas of the AOI, computed once per run
+        self.geometry = RegionGeometry(self.aoi)
+        # Input tables of the components, read once per run or worker process
+        self.inputs = InputRegistry()
         self.output_path = output_path
         self.years = (
             [self.config["main"]["year"]]
             if not isinstance(self.config["main"]["year"], list)
             else self.config["main"]["year"]
         )
+        self.max_workers = (
+            max_workers
+            if max_workers is not None
+            else self.config["main"].get("max_workers", 1)
+        )
 
     def run(self) -> None:
         """Run food security module."""
-        results = []
-
-        for year in self.years:
-            # Calculate food production
-            gdf = self.aoi.copy(deep=True)
-            gdf["year"] = year
-            food_production = FoodProduction(
-                year=year, cfg=self.config, region=gdf, fao_client=self.fao_client
-            )
-            gdf = food_production.run()
-
-            # Calculate food supply for the provinces
-            food_supply = FoodSupply(
-                year=year, cfg=self.config, region=gdf, fao_client=self.fao_client
-            )
-            gdf = food_supply.run()
-
-            # Calculate food value and variety
-            food_value = FoodValue(
-                year=year, cfg=self.config, region=gdf, fao_client=self.fao_client
-            )
-            gdf = food_value.run()
-
-            # Calculate food security per province
-            results.append(self._calculate_food_security(region=gdf))
+        self._prefetch_fao_tables()
+        workers = min(self.max_workers, len(self.years))
+        if workers > 1:
+            # Project the AOI and read the input tables before they are sent to the
+            # workers
+            self.geometry.warm()
+            self._read_inputs()
+            # The AOI, config and prefetched FAO tables are sent once per worker
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(self,)
+            ) as pool:
+                results = list(pool.map(_run_year_worker, self.years))
+        else:
+            results = [self.run_year(year) for year in self.years]
 
         # Write result to file
         output_path = (
@@ -73,5 +81,92 @@ class FoodSecurity:
         results = pd.concat(results)
         results.to_file(output_path)
 
+    def run_year(self, year: int) -> gpd.GeoDataFrame:
+        """Run the food security components for a single year."""
+        # The components add columns, the geometries of the AOI are shared
+        gdf = self.aoi.copy(deep=False)
+        gdf["year"] = year
+        # Food item quantities of the regions, shared by the components
+        items = ItemBlock(region_keys(gdf))
+
+        # Calculate food production
+        food_production = FoodProduction(
+            year=year,
+            cfg=self.config,
+            region=gdf,
+            fao_client=self.fao_client,
+            inputs=self.inputs,
+            items=items,
+            geometry=self.geometry,
+        )
+        gdf = food_production.run()
+
+        # Calculate food supply for the provinces
+        food_supply = FoodSupply(
+            year=year,
+            cfg=self.config,
+            region=gdf,
+            fao_client=self.fao_client,
+            inputs=self.inputs,
+            items=items,
+            geometry=self.geometry,
+        )
+        gdf = food_supply.run()
+
+        # Calculate food value and variety
+        food_value = FoodValue(
+            year=year,
+            cfg=self.config,
+            region=gdf,
+            fao_client=self.fao_client,
+            inputs=self.inputs,
+            items=items,
+            geometry=self.geometry,
+        )
+        gdf = food_value.run()
+
+        # Calculate food security per province
+        gdf = items.expand(gdf)
+        return self._calculate_food_security(region=gdf)
+
+    def _read_inputs(self) -> None:
+        # Parse the static input tables of the components once, in this process
+        main = self.config["main"]
+        food_production = self.config["food_production"]
+        modelled_crops = food_production.get("modelled_crops", {}).get("path", "")
+        if Path(modelled_crops).is_file():
+            self.inputs.read_rows(modelled_crops, "year", self.years[0])
+        population = main.get("population", {}).get("path", "")
+        if Path(population).is_file():
+            self.inputs.read_table(population)
+        conversion_table = food_production.get("fao", {}).get("conversion_table")
+        if isinstance(conversion_table, dict) and "input_path" in main:
+            conversion_path = Path(main["input_path"]) / conversion_table["path"]
+            if conversion_path.is_file():
+                read_conversion_table(self.config, self.inputs)
+
+    def _prefetch_fao_tables(self) -> None:
+        # Request the FAO tables of all years concurrently before the components
+        # ask for them one year at a time
+        tables = ["trade_matrix"]
+        if not Path(self.config["food_production"]["other_crops"]["path"]).is_file():
+            tables.append("production")
+        self.fao_client.prefetch(
+            self.config["main"]["country"], self.years, tables=tables
+        )
+
     def _calculate_food_security(self, region: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
         return region
+
+
+# Food security run of a worker process of FoodSecurity.run
+_worker_fs: FoodSecurity | None = None
+
+
+def _init_worker(fs: FoodSecurity) -> None:
+    global _worker_fs  # noqa: PLW0603
+    _worker_fs = fs
+
+
+def _run_year_worker(year: int) -> gpd.GeoDataFrame:
+    return _worker_fs.run_year(year)
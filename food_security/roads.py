@@ -0,0 +1,214 @@
+"""Sources of the road network used for the food transfer coefficient.
+
+Roads are read from OpenStreetMap with osmnx by default, which needs network
+access and a lot of memory for large areas. Instead, the highway ways can be
+read from a local OSM PBF extract or a GeoParquet file. Both are filtered by the
+bounds of the area of interest while reading. The roads that were read for an
+area can be cached on disk as a GeoPackage, so the next run reads them from the
+cache.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import geopandas as gpd
+import pyogrio
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROAD_CACHE_PATH = Path.home() / ".cache" / "food_security" / "roads"
+# Suffixes of the road files that can be read
+PBF_SUFFIXES = (".pbf",)
+PARQUET_SUFFIXES = (".parquet", ".geoparquet")
+# Columns of the roads that are kept, next to the geometry
+ROAD_COLUMNS = ["highway"]
+
+
+class RoadSource(ABC):
+    """Base class of the sources of road lines."""
+
+    def read(self, bounds: Sequence[float]) -> gpd.GeoDataFrame:
+        """Read the road lines within bounds.
+
+        Args:
+            bounds (Sequence[float]): Bounds to read, minx, miny, maxx and maxy in
+                the CRS of the source, EPSG:4326 for OpenStreetMap data.
+
+        Returns:
+            gpd.GeoDataFrame: Road line strings with their highway type.
+
+        """
+        roads = self._read(bounds)
+        # Drop point and polygon geometries
+        roads = roads[roads.geometry.type == "LineString"]
+        columns = [col for col in ROAD_COLUMNS if col in roads.columns]
+        return roads[[*columns, roads.geometry.name]].reset_index(drop=True)
+
+    @property
+    @abstractmethod
+    def key(self) -> str:
+        """Description of the source and its version, for the road cache."""
+
+    @abstractmethod
+    def _read(self, bounds: Sequence[float]) -> gpd.GeoDataFrame:
+        """Read the roads within bounds, before they are filtered."""
+
+
+class OSMnxRoads(RoadSource):
+    """Roads from the OpenStreetMap Overpass API, through osmnx."""
+
+    @property
+    def key(self) -> str:
+        """Description of the source for the road cache."""
+        return "osmnx"
+
+    def _read(self, bounds: Sequence[float]) -> gpd.GeoDataFrame:
+        import osmnx as ox
+
+        logger.info("Downloading roads from OpenStreetMap")
+        return ox.features.features_from_bbox(
+            bbox=tuple(bounds),
+            tags={"highway": True},
+        )
+
+
+class _FileRoads(RoadSource):
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+
+    @property
+    def key(self) -> str:
+        """Description of the file and its version for the road cache."""
+        stat = self.path.stat()
+        return f"{self.path.resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class PBFRoads(_FileRoads):
+    """Roads from a local OpenStreetMap PBF extract.
+
+    The ways of the extract are streamed by the GDAL OSM driver, which only keeps
+    the highway lines within the bounds.
+    """
+
+    def _read(self, bounds: Sequence[float]) -> gpd.GeoDataFrame:
+        logger.info("Reading roads from %s", self.path)
+        return pyogrio.read_dataframe(
+            self.path,
+            layer="lines",
+            columns=ROAD_COLUMNS,
+            bbox=tuple(bounds),
+            where="highway IS NOT NULL",
+        )
+
+
+class ParquetRoads(_FileRoads):
+    """Roads from a GeoParquet file, like a converted OpenStreetMap extract.
+
+    Row groups outside of the bounds are skipped. Reading GeoParquet needs
+    pyarrow.
+    """
+
+    def _read(self, bounds: Sequence[float]) -> gpd.GeoDataFrame:
+        logger.info("Reading roads from %s", self.path)
+        roads = gpd.read_parquet(self.path, bbox=tuple(bounds))
+        if "highway" in roads.columns:
+            roads = roads[roads["highway"].notna()]
+        return roads
+
+
+class CachedRoads(RoadSource):
+    """Roads of another source, cached on disk per source and bounds."""
+
+    def __init__(self, source: RoadSource, path: Path | str):
+        """Cache the roads of a source.
+
+        Args:
+            source (RoadSource): Source of the roads.
+            path (Path | str): Directory of the cached roads.
+
+        """
+        self.source = source
+        self.path = Path(path)
+
+    @property
+    def key(self) -> str:
+        """Description of the cached source."""
+        return self.source.key
+
+    def read(self, bounds: Sequence[float]) -> gpd.GeoDataFrame:
+        """Read the roads within bounds from the cache, or from the source.
+
+        Args:
+            bounds (Sequence[float]): Bounds to read, minx, miny, maxx and maxy.
+
+        Returns:
+            gpd.GeoDataFrame: Road line strings with their highway type.
+
+        """
+        cache_file = self.path / f"{self._cache_key(bounds)}.gpkg"
+        if cache_file.is_file():
+            logger.info("Reading cached roads from %s", cache_file)
+            return gpd.read_file(cache_file)
+        roads = self._read(bounds)
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, so a failed write is never read
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp.gpkg")
+        roads.to_file(tmp_file, driver="GPKG")
+        tmp_file.replace(cache_file)
+        return roads
+
+    def _read(self, bounds: Sequence[float]) -> gpd.GeoDataFrame:
+        return self.source.read(bounds)
+
+    def _cache_key(self, bounds: Sequence[float]) -> str:
+        key = json.dumps([self.source.key, [round(float(b), 6) for b in bounds]])
+        return hashlib.sha256(key.encode()).hexdigest()
+
+
+def road_source(cfg: dict) -> RoadSource:
+    """Make the road source of a config.
+
+    The roads section of the food_transfer_coefficient section of the config
+    selects the source. Its path is an OSM PBF or GeoParquet file, roads are
+    downloaded with osmnx when no path is given. When cache is true, the roads
+    are cached in the directory of cache_path, DEFAULT_ROAD_CACHE_PATH when it is
+    not given.
+
+    Args:
+        cfg (dict): Food security config.
+
+    Raises:
+        FileNotFoundError: The road file does not exist.
+        ValueError: The road file is not an OSM PBF or GeoParquet file.
+
+    Returns:
+        RoadSource: Source of the roads.
+
+    """
+    config = cfg.get("food_transfer_coefficient", {}).get("roads", {})
+    path = Path(config["path"]) if config.get("path") else None
+    if path is None:
+        source = OSMnxRoads()
+    elif not path.is_file():
+        err_msg = f"Road file {path} does not exist"
+        raise FileNotFoundError(err_msg)
+    elif path.suffix.lower() in PBF_SUFFIXES:
+        source = PBFRoads(path)
+    elif path.suffix.lower() in PARQUET_SUFFIXES:
+        source = ParquetRoads(path)
+    else:
+        err_msg = f"Expected an OSM PBF or GeoParquet road file, but got {path}"
+        raise ValueError(err_msg)
+    if not config.get("cache", False):
+        return source
+    return CachedRoads(source, config.get("cache_path", DEFAULT_ROAD_CACHE_PATH))
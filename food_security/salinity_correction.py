@@ -1,6 +1,12 @@
 import datetime
+import hashlib
+import json
 import logging
+import os
 import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 from typing import List, Optional, Union
 
@@ -11,11 +17,12 @@ import pandas as pd
 import rasterio
 import xarray as xr
 from rasterio.io import MemoryFile
+from rasterio.features import geometry_mask
 from rasterio.mask import mask
 from rasterio.transform import from_origin
 from tqdm.auto import tqdm
 
-from food_security import append_labour, data_reader
+from food_security import append_labour, data_reader, zonal
 from food_security.config import ConfigReader
 from food_security.fao_api import FAOClient
 from food_security.utils import (
@@ -39,17 +46,13 @@ def load_input_data(
     input_path: Union[str, Path],
     fao_client: FAOClient,
 ):
-    ribasim_path = Path(ribasim_path)
     input_path = Path(input_path)
 
-    # Read the HIS file and create a dataset for crop production data.
-    production_his_file = data_reader.HisFile(ribasim_path / his_file, crop=None)
-    production_his_file.read()
-    production_ds = production_his_file.ds.copy(deep=True)
-
-    hectare_his_file = data_reader.HisFile(ribasim_path / hectare_his_file, crop=None)
-    hectare_his_file.read(hia=True)
-    hectare_ds = hectare_his_file.ds.copy(deep=True)
+    production_ds, hectare_ds = read_his_inputs(
+        ribasim_path, his_file, hectare_his_file
+    )
+    production_ds = production_ds.copy(deep=True)
+    hectare_ds = hectare_ds.copy(deep=True)
     # Read the communes shapefile and create a geopandas dataframe.
     if communes_file:
         communes_gdf = gpd.read_file(communes_file)
@@ -98,43 +101,103 @@ def load_input_data(
     )
 
 
-def create_salinity_raster(salinity_file, crs="EPSG:32648"):
-    # Load DFlow salinity results
-    salinity = np.loadtxt(salinity_file)
+def read_his_inputs(
+    ribasim_path: Union[str, Path],
+    his_file: Union[str, Path],
+    hectare_his_file: Union[str, Path],
+):
+    ribasim_path = Path(ribasim_path)
+
+    # Read the HIS file and create a dataset for crop production data.
+    production_his_file = data_reader.HisFile(ribasim_path / his_file, crop=None)
+    production_his_file.read(params=["Actual farm gate pr"])
+
+    # The hectare file holds a parameter per crop, only read the cells that are used
+    hectare_his_file = data_reader.HisFile(ribasim_path / hectare_his_file, crop=None)
+    hectare_his_file.read(hia=True, lazy=True)
+    return production_his_file.ds, hectare_his_file.ds
+
+
+def read_xyz(xyz_file: Union[str, Path], chunksize: int = 1_000_000) -> np.ndarray:
+    """Read the x, y and value columns of a whitespace separated .xyz file.
+
+    The file is parsed in chunks of chunksize lines with the pandas C parser, which
+    gives the same values as np.loadtxt.
+    """
+    chunks = pd.read_csv(
+        xyz_file,
+        sep=r"\s+",
+        header=None,
+        usecols=[0, 1, 2],
+        comment="#",
+        dtype=np.float64,
+        float_precision="round_trip",
+        chunksize=chunksize,
+    )
+    return np.concatenate([chunk.to_numpy() for chunk in chunks])
+
+
+def grid_xyz(xyz: Union[str, Path, np.ndarray], chunksize: int = 1_000_000):
+    """Grid the points of a .xyz salinity map.
+
+    Args:
+        xyz (str | Path | np.ndarray): Path to a .xyz file or an array with x, y and
+            value columns.
+        chunksize (int, optional): Lines parsed at once. Defaults to 1_000_000.
+
+    Returns:
+        tuple[np.ndarray, Affine]: Raster with NaN for cells without a point and the
+            transform of the raster.
+
+    """
+    if not isinstance(xyz, np.ndarray):
+        xyz = read_xyz(xyz, chunksize=chunksize)
 
     # Get x-coords, y-coords and corresponding salinity (in PSU)
-    xcoords = salinity[:, 0]
-    ycoords = salinity[:, 1]
-    salinity_values = salinity[:, 2]
+    xcoords = xyz[:, 0]
+    ycoords = xyz[:, 1]
+    salinity_values = xyz[:, 2]
+    n_x = len(np.unique(xcoords))
+    n_y = len(np.unique(ycoords))
 
     # Compute resolution in x and y direction
-    resolution_x = (xcoords.max() - xcoords.min()) / len(np.unique(xcoords))
-    resolution_y = (ycoords.max() - ycoords.min()) / len(np.unique(ycoords))
+    resolution_x = (xcoords.max() - xcoords.min()) / n_x
+    resolution_y = (ycoords.max() - ycoords.min()) / n_y
 
     # Define transform, to map to correct position
     transform = from_origin(
         west=xcoords.min(), north=ycoords.max(), xsize=resolution_x, ysize=resolution_y
     )
 
+    # Compute the cell of every point, the last point in a cell wins
+    rows = ((ycoords.max() - ycoords) / resolution_x).astype(np.intp)
+    cols = ((xcoords - xcoords.min()) / resolution_y).astype(np.intp)
+    raster = np.full((n_y, n_x + 1), np.nan)
+    if rows.max() >= raster.shape[0] or cols.max() >= raster.shape[1]:
+        err_msg = f"Salinity points fall outside of the {raster.shape} raster"
+        raise ValueError(err_msg)
+    cells = np.ravel_multi_index((rows, cols), raster.shape)
+    _, last = np.unique(cells[::-1], return_index=True)
+    points = len(cells) - 1 - last
+    raster[rows[points], cols[points]] = salinity_values[points]
+    return raster, transform
+
+
+def create_salinity_raster(salinity_file, crs="EPSG:32648"):
+    # Grid the DFlow salinity results
+    raster, transform = grid_xyz(salinity_file)
+
     # Create tif file
     raster_file = MemoryFile()
     dst = raster_file.open(
         driver="GTiff",
-        height=len(np.unique(ycoords)),
-        width=len(np.unique(xcoords)),
+        height=raster.shape[0],
+        width=raster.shape[1] - 1,
         count=1,
-        dtype=salinity_values.dtype,
+        dtype=raster.dtype,
         crs=crs,
         transform=transform,
     )
-    # Initialize raster
-    raster = np.full((len(np.unique(ycoords)), len(np.unique(xcoords)) + 1), np.nan)
-
-    # Fill the raster with values
-    for i in range(len(salinity_values)):
-        row = int((ycoords.max() - ycoords[i]) / resolution_x)
-        col = int((xcoords[i] - xcoords.min()) / resolution_y)
-        raster[row, col] = salinity_values[i]
 
     # Write the raster to the file
     dst.write(raster, 1)
@@ -292,6 +355,22 @@ def get_crop_info(
     )
 
 
+def crop_timeframe(
+    year: int,
+    crop_start_ts: str,
+    crop_end_ts: str,
+    crop_start_ts_dt: datetime.datetime,
+    crop_end_ts_dt: datetime.datetime,
+):
+    # A growing season that ends before it starts continues into the next year
+    start_ts = f"{year}-{crop_start_ts}"
+    if crop_start_ts_dt >= crop_end_ts_dt:
+        end_ts = f"{year + 1}-{crop_end_ts}"
+    else:
+        end_ts = f"{year}-{crop_end_ts}"
+    return start_ts, end_ts
+
+
 def get_year_info(production_ds):
     # Get years from dataset
     years = production_ds.time.values
@@ -303,21 +382,27 @@ def get_year_info(production_ds):
     return production_ds, years
 
 
-def get_production_value(production_ds, area_id, crop_id, year):
-    # Create string for production station name from RIBASIM 8 model
-    number_of_underscores_area = 8 - len(str(area_id))
-    number_of_underscores_crop = 3 - len(str(int(crop_id)))
-
-    underscores_area = number_of_underscores_area * "_"
-    underscores_crop = number_of_underscores_crop * "_"
-    production_station = (
-        f"Nd{underscores_area}{area_id} / Cr{underscores_crop}{int(crop_id)} /"
-    )
+def get_production_value(
+    production_ds,
+    area_id,
+    crop_id,
+    year,
+    station_index: Optional[data_reader.StationIndex] = None,
+):
+    if station_index is None:
+        station_index = data_reader.StationIndex.from_dataset(production_ds)
+    # Look up the "Nd______42 / Cr__1 /" production station of the RIBASIM 8 model
+    position = station_index.node_crop(area_id, crop_id)
+    if position is None:
+        return None
     # Get production data from RIBASIM model if it exists
     try:
-        production_commune = production_ds.sel(
-            {"station": production_station, "time": f"{year}-01-01"}
-        )["Actual farm gate pr"].values
+        production_commune = (
+            production_ds["Actual farm gate pr"]
+            .isel(station=position)
+            .sel(time=f"{year}-01-01")
+            .values
+        )
     except KeyError:
         production_commune = None
 
@@ -335,22 +420,26 @@ def get_hectares(
     crop_start_ts_dt: str,
     crop_end_ts_dt: str,
     year: Union[str, int],
+    station_index: Optional[data_reader.StationIndex] = None,
 ):
-    start_ts = f"{year}-{crop_start_ts}"
-    if crop_start_ts_dt >= crop_end_ts_dt:
-        end_ts = f"{year + 1}-{crop_end_ts}"
-    else:
-        end_ts = f"{year}-{crop_end_ts}"
+    start_ts, end_ts = crop_timeframe(
+        year, crop_start_ts, crop_end_ts, crop_start_ts_dt, crop_end_ts_dt
+    )
 
     variable_name = f"P Cr{crop_id}/{crop_name}"
 
     timeframe = slice(start_ts, end_ts)
 
-    node = f"{area_id} / {area}"
-    if node not in hectare_ds.station.values:
-        node = f"{area_id} / {area}_AdvIrr{area_id}"
+    if station_index is None:
+        station_index = data_reader.StationIndex.from_dataset(hectare_ds)
+    position = station_index.node_area(area_id, area)
+    if position is None:
+        position = station_index.node_area(area_id, f"{area}_AdvIrr{area_id}")
+    if position is None:
+        err_msg = f"No hectare station found for {area_id} / {area}"
+        raise KeyError(err_msg)
 
-    selection = hectare_ds.sel(station=node, time=timeframe)[variable_name]
+    selection = hectare_ds[variable_name].isel(station=position).sel(time=timeframe)
 
     if selection.sizes.get("time", 0) == 0:
         return np.nan
@@ -370,18 +459,15 @@ def compute_salinity(
     communes_gdf: gpd.GeoDataFrame,
     salinity_crs: str,
     area_crs: str,
+    raster_cache: Optional["SalinityRasterCache"] = None,
 ):
-    # Create salinity raster for the year
-    salinity_file = Path(str(salinity_filename).replace("{YEAR}", str(year)))
-    raster = create_salinity_raster(
-        Path(salinity_dir) / salinity_file, crs=salinity_crs
+    # Create the salinity raster for the year, masked with the landuse file
+    if raster_cache is None:
+        raster_cache = SalinityRasterCache(maxsize=1)
+    masked_raster = raster_cache.get(
+        year, salinity_dir, salinity_filename, mask_dir, mask_filename, salinity_crs
     )
 
-    # Create mask from landuse file
-    mask_file = mask_filename.replace("{YEAR}", str(year))
-    mask = rasterio.open(Path(mask_dir) / mask_file, "r")
-    masked_raster = overlap_landuse_mask(raster, mask)
-
     # Get the salinity value for the commune
     overlapped_raster = overlap_ec_commune(
         masked_raster, area, communes_gdf, communes_crs=area_crs
@@ -393,6 +479,225 @@ def compute_salinity(
     return salinity, overlapped_raster
 
 
+def create_masked_salinity_raster(
+    salinity_file: Union[str, Path], mask_file: Union[str, Path], salinity_crs: str
+):
+    raster = create_salinity_raster(salinity_file, crs=salinity_crs)
+    with rasterio.open(mask_file, "r") as mask:
+        return overlap_landuse_mask(raster, mask)
+
+
+class SalinityRasterCache:
+    """Bounded cache of the salinity rasters masked with the land use, per year.
+
+    The masked raster of a year only depends on the salinity map and land use mask
+    of that year, so it is parsed and masked once and reused for every area and
+    crop. The least recently used rasters are closed when more than maxsize years
+    are cached. With a cache_dir the masked rasters are also stored as tiled
+    GeoTIFFs, named by the salinity map, mask and CRS they were made from. They are
+    reused while they are newer than the salinity map and mask.
+    """
+
+    def __init__(
+        self, maxsize: int = 4, cache_dir: Optional[Union[str, Path]] = None
+    ) -> None:
+        """Instantiate a SalinityRasterCache object."""
+        self.maxsize = maxsize
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._rasters = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._rasters)
+
+    def __getstate__(self) -> dict:
+        # Open rasters are not shared with worker processes
+        return {**self.__dict__, "_rasters": OrderedDict()}
+
+    def get(
+        self,
+        year: Union[str, int],
+        salinity_dir: Union[str, Path],
+        salinity_filename: Union[str, Path],
+        mask_dir: Union[str, Path],
+        mask_filename: str,
+        salinity_crs: str,
+    ):
+        """Return the masked salinity raster of a year.
+
+        Args:
+            year (str | int): Year that replaces {YEAR} in the file names.
+            salinity_dir (str | Path): Directory of the .xyz salinity maps.
+            salinity_filename (str | Path): File name template of the salinity map.
+            mask_dir (str | Path): Directory of the land use masks.
+            mask_filename (str): File name template of the land use mask.
+            salinity_crs (str): CRS of the salinity map.
+
+        Returns:
+            rasterio dataset with the salinity (PSU) on land use cells, NaN elsewhere.
+
+        """
+        salinity_file = Path(salinity_dir) / Path(
+            str(salinity_filename).replace("{YEAR}", str(year))
+        )
+        mask_file = Path(mask_dir) / mask_filename.replace("{YEAR}", str(year))
+        key = (salinity_file, mask_file, salinity_crs)
+        if key in self._rasters:
+            self._rasters.move_to_end(key)
+            return self._rasters[key]
+
+        raster = self._read_persisted(salinity_file, mask_file, salinity_crs)
+        if raster is None:
+            raster = create_masked_salinity_raster(
+                salinity_file, mask_file, salinity_crs
+            )
+            self._persist(raster, salinity_file, mask_file, salinity_crs)
+        self._rasters[key] = raster
+        while len(self._rasters) > self.maxsize:
+            _, evicted = self._rasters.popitem(last=False)
+            evicted.close()
+        return raster
+
+    def clear(self) -> None:
+        """Close and remove all cached rasters."""
+        while self._rasters:
+            _, raster = self._rasters.popitem()
+            raster.close()
+
+    def _cache_file(
+        self, salinity_file: Path, mask_file: Path, salinity_crs: str
+    ) -> Path:
+        # The stems keep the file readable, the hash tells sources with equal stems
+        # or another CRS apart
+        key = json.dumps(
+            [str(salinity_file.resolve()), str(mask_file.resolve()), str(salinity_crs)]
+        )
+        digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+        return self.cache_dir / f"{salinity_file.stem}_{mask_file.stem}_{digest}.tif"
+
+    def _read_persisted(self, salinity_file: Path, mask_file: Path, salinity_crs: str):
+        if self.cache_dir is None:
+            return None
+        cache_file = self._cache_file(salinity_file, mask_file, salinity_crs)
+        if not cache_file.exists() or cache_file.stat().st_mtime_ns < max(
+            salinity_file.stat().st_mtime_ns, mask_file.stat().st_mtime_ns
+        ):
+            return None
+        logger.debug("Reading masked salinity raster %s", cache_file)
+        return rasterio.open(cache_file)
+
+    def _persist(
+        self, raster, salinity_file: Path, mask_file: Path, salinity_crs: str
+    ) -> None:
+        if self.cache_dir is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        cache_file = self._cache_file(salinity_file, mask_file, salinity_crs)
+        # Write next to the target and rename, so readers never see a partial file
+        tmp_file = cache_file.with_name(f"{cache_file.stem}.{os.getpid()}.tmp.tif")
+        profile = {**raster.meta, "driver": "GTiff", "compress": "deflate"}
+        if raster.width >= 256 and raster.height >= 256:
+            profile.update(tiled=True, blockxsize=256, blockysize=256)
+        with rasterio.open(tmp_file, "w", **profile) as dst:
+            dst.write(raster.read(1), 1)
+        os.replace(tmp_file, cache_file)
+
+
+class CommuneSalinity:
+    """Salinity statistics of all communes per year, from a commune label grid.
+
+    The communes are reprojected and rasterized once onto the grid of the salinity
+    rasters. The statistics of every commune are then computed in a single pass per
+    year, and salinity queries for a commune and year are table lookups. Communes
+    are looked up by OBJECTID, and by Name when no OBJECTID matches, as in
+    overlap_ec_commune.
+    """
+
+    def __init__(
+        self,
+        communes_gdf: gpd.GeoDataFrame,
+        salinity_dir: Union[str, Path],
+        salinity_filename: Union[str, Path],
+        mask_dir: Union[str, Path],
+        mask_filename: str,
+        salinity_crs: str,
+        area_crs: str = "EPSG:4326",
+        raster_cache: Optional[SalinityRasterCache] = None,
+    ) -> None:
+        """Instantiate a CommuneSalinity object."""
+        self.communes_gdf = communes_gdf.set_crs(area_crs)
+        self.salinity_files = (
+            salinity_dir,
+            salinity_filename,
+            mask_dir,
+            mask_filename,
+            salinity_crs,
+        )
+        self.raster_cache = raster_cache or SalinityRasterCache()
+        self._rows = {}
+        for column in ("Name", "OBJECTID"):
+            for i, key in enumerate(self.communes_gdf[column]):
+                self._rows.setdefault(column, {}).setdefault(key, []).append(i)
+        self._zones = {}
+        self._tables = {}
+        self._masks = {}
+
+    def rows(self, commune) -> list[int]:
+        """Return the positions of the rows of a commune in communes_gdf."""
+        rows = self._rows["OBJECTID"].get(commune)
+        if rows is None:
+            rows = self._rows["Name"].get(commune)
+        if rows is None:
+            err_msg = f"Commune {commune} not found in the communes"
+            raise ValueError(err_msg)
+        return rows
+
+    def table(self, year: Union[str, int]) -> pd.DataFrame:
+        """Return the EC statistics of every commune row for a year."""
+        if year not in self._tables:
+            raster = self.raster_cache.get(year, *self.salinity_files)
+            labels, overlap = self._grid_zones(raster)
+            table = zonal.zonal_statistics(
+                labels, psu_to_ec(raster.read(1)), n_zones=len(self.communes_gdf)
+            )
+            table.insert(0, "Name", self.communes_gdf["Name"].to_numpy())
+            table.insert(0, "OBJECTID", self.communes_gdf["OBJECTID"].to_numpy())
+            table.attrs["overlap"] = overlap
+            self._tables[year] = table
+        return self._tables[year]
+
+    def salinity(self, commune, year: Union[str, int]):
+        """Return the median EC of a commune in a year."""
+        rows = self.rows(commune)
+        table = self.table(year)
+        if len(rows) == 1 and not table.attrs["overlap"]:
+            return table["median"].iloc[rows[0]]
+        # Communes with several rows or overlapping communes, mask their geometries
+        raster = self.raster_cache.get(year, *self.salinity_files)
+        key = (tuple(rows), *self._grid_key(raster))
+        if key not in self._masks:
+            geometries = self._zones[self._grid_key(raster)][0].iloc[rows]
+            self._masks[key] = geometry_mask(
+                geometries, out_shape=raster.shape, transform=raster.transform
+            )
+        return np.nanmedian(psu_to_ec(raster.read(1))[~self._masks[key]])
+
+    @staticmethod
+    def _grid_key(raster) -> tuple:
+        return (raster.crs.to_string(), raster.shape, tuple(raster.transform))
+
+    def _grid_zones(self, raster) -> tuple[np.ndarray, bool]:
+        key = self._grid_key(raster)
+        if key not in self._zones:
+            geometries = self.communes_gdf.to_crs(raster.crs).geometry
+            labels = zonal.rasterize_zones(geometries, raster.shape, raster.transform)
+            overlap = zonal.zones_overlap(geometries, raster.shape, raster.transform)
+            if overlap:
+                logger.warning("Communes overlap, their salinity is masked per commune")
+            self._zones[key] = (geometries, labels, overlap)
+        _, labels, overlap = self._zones[key]
+        return labels, overlap
+
+
 def get_salinity_parameters(salinity_param_df: pd.DataFrame, crop_fao_salt: str):
     salinity_crop_row = salinity_param_df[
         salinity_param_df["Common name"] == crop_fao_salt
@@ -554,7 +859,17 @@ def yield_correction_xyz(
     area_crs: str,
     a: Union[int, float],
     b: Union[int, float],
+    raster_cache: Optional[SalinityRasterCache] = None,
+    commune_salinity: Optional[CommuneSalinity] = None,
 ):
+    if commune_salinity is not None:
+        # Look up the median salinity in the table of the year
+        salinity = commune_salinity.salinity(area, year)
+        reduction = yield_reduction(
+            salinity, threshold=a, yield_decrease=b, is_raster=False
+        )
+        return corrected_production(production_area, reduction), salinity
+
     salinity, overlapped_raster = compute_salinity(
         area,
         year,
@@ -565,6 +880,7 @@ def yield_correction_xyz(
         communes_gdf,
         salinity_crs,
         area_crs,
+        raster_cache=raster_cache,
     )
     corrected_yield = apply_yield_correction(production_area, overlapped_raster, a, b)
 
@@ -588,17 +904,18 @@ def yield_correction_his(
     if salinity_ds is None:
         ribasim_path = Path(ribasim_path)
         salinity_his = data_reader.HisFile(ribasim_path / salinity_filename, crop=None)
-        salinity_his.read(hia=True)
+        # Check the station names first, only load the data for a known area
+        if area not in salinity_his.open_metadata(hia=True).stations:
+            return (None, None, None)
+        salinity_his.read(hia=True, params=["TDS"])
         salinity_ds = salinity_his.ds.copy(deep=True)
 
     if area not in salinity_ds.station:
         return (None, None, salinity_ds)
 
-    start_ts = f"{year}-{crop_start_ts}"
-    if crop_start_ts_dt >= crop_end_ts_dt:
-        end_ts = f"{year + 1}-{crop_end_ts}"
-    else:
-        end_ts = f"{year}-{crop_end_ts}"
+    start_ts, end_ts = crop_timeframe(
+        year, crop_start_ts, crop_end_ts, crop_start_ts_dt, crop_end_ts_dt
+    )
 
     salinity = get_salinity(salinity_ds, area, start_ts, end_ts)
     salinity = ppm_to_ec(salinity)
@@ -613,27 +930,28 @@ def yield_correction_his(
     return corrected_yield, salinity, salinity_ds
 
 
-def correct_crop_yield(
-    land_name: str,
-    fao_client: FAOClient,
+def _correct_crop_yield_loop(
+    production_ds: xr.Dataset,
+    hectare_ds: xr.Dataset,
+    years: np.ndarray,
+    crops: np.ndarray,
+    area_df: pd.DataFrame,
+    mapping_df: pd.DataFrame,
+    fao_mapping_salt_df: pd.DataFrame,
+    fao_mapping_price_df: pd.DataFrame,
+    crop_id_df: pd.DataFrame,
+    salinity_param_df: pd.DataFrame,
+    pp_df: pd.DataFrame,
+    crops_to_correct: List[str],
     ribasim_path: Union[str, Path],
-    input_path: Union[str, Path],
-    his_file: Union[str, Path],
-    hectare_his_file: Union[str, Path],
     salinity_dir: Union[str, Path],
-    salinity_filename: Union[str, Path],
-    salinity_param_file: Union[str, Path],
+    salinity_filename: Path,
     mask_dir: Union[str, Path],
     mask_filename: Union[str, Path],
-    mapping_file: Union[str, Path],
-    fao_mapping_file: Union[str, Path],
-    crops_to_correct: List[str],
-    area_crs: Optional[str] = "EPSG:4326",
-    salinity_crs: Optional[str] = "EPSG:32648",
-    communes_file: Optional[Union[str, Path]] = None,
-    common_unit_filename: Optional[Union[str, Path]] = None,
-    department_file: Optional[Union[str, Path]] = None,
-    department_crs: Optional[str] = None,
+    communes_gdf: gpd.GeoDataFrame,
+    salinity_crs: str,
+    area_crs: str,
+    raster_cache: Optional[SalinityRasterCache] = None,
 ):
     # Initialize a dictionary to store the results (columns in csv)
     df_dict = {
@@ -651,43 +969,21 @@ def correct_crop_yield(
         "comment": [],
         "object_id": [],
     }
-
-    (
-        production_ds,
-        hectare_ds,
-        communes_gdf,
-        salinity_param_df,
-        mapping_df,
-        fao_mapping_salt_df,
-        fao_mapping_price_df,
-        area_df,
-        crop_id_df,
-        pp_df,
-    ) = load_input_data(
-        his_file=his_file,
-        hectare_his_file=hectare_his_file,
-        communes_file=communes_file,
-        salinity_param_file=salinity_param_file,
-        mapping_file=mapping_file,
-        fao_mapping_file=fao_mapping_file,
-        land_name=land_name,
-        ribasim_path=ribasim_path,
-        input_path=input_path,
-        fao_client=fao_client,
-    )
-    logger.info("Starting crop yield correction for %s", land_name)
-
-    crops = mapping_df["crop_name"].values
-    production_ds, years = get_year_info(production_ds=production_ds)
-
-    logger.info(
-        "Loaded input data. Areas=%d, Crops=%d, Years=%d",
-        len(area_df),
-        len(crops),
-        len(years),
-    )
-
+    production_index = data_reader.StationIndex.from_dataset(production_ds)
+    hectare_index = data_reader.StationIndex.from_dataset(hectare_ds)
     salinity_ds = None
+    commune_salinity = None
+    if salinity_filename.suffix == ".xyz" and communes_gdf is not None:
+        commune_salinity = CommuneSalinity(
+            communes_gdf,
+            salinity_dir,
+            salinity_filename,
+            mask_dir,
+            mask_filename,
+            salinity_crs,
+            area_crs=area_crs,
+            raster_cache=raster_cache,
+        )
 
     for area in tqdm(area_df["area_name"], desc="Areas"):
         area_map_name = area_df.loc[area_df["area_name"] == area, "area_map_name"].iloc[
@@ -739,6 +1035,7 @@ def correct_crop_yield(
                     area_id,
                     crop_id,
                     year,
+                    station_index=production_index,
                 )
 
                 if production_area is None:
@@ -761,6 +1058,7 @@ def correct_crop_yield(
                     crop_start_ts_dt=crop_start_ts_dt,
                     crop_end_ts_dt=crop_end_ts_dt,
                     year=year,
+                    station_index=hectare_index,
                 )
 
                 crop_pp = get_producer_prices(
@@ -781,7 +1079,6 @@ def correct_crop_yield(
                         crop_fao_salt,
                     )
 
-                    salinity_filename = Path(salinity_filename)
                     if salinity_filename.suffix == ".xyz":
                         corrected_yield, salinity = yield_correction_xyz(
                             production_area=production_area,
@@ -796,6 +1093,7 @@ def correct_crop_yield(
                             area_crs=area_crs,
                             a=a,
                             b=b,
+                            commune_salinity=commune_salinity,
                         )
                     elif (
                         salinity_filename.suffix == ".his"
@@ -854,6 +1152,459 @@ def correct_crop_yield(
                 df_dict["object_id"].append(object_id)
 
     df = pd.DataFrame(df_dict)
+    return df
+
+
+def _correct_crop_yield_vectorized(
+    production_ds: xr.Dataset,
+    hectare_ds: xr.Dataset,
+    years: np.ndarray,
+    crops: np.ndarray,
+    area_df: pd.DataFrame,
+    mapping_df: pd.DataFrame,
+    fao_mapping_salt_df: pd.DataFrame,
+    fao_mapping_price_df: pd.DataFrame,
+    crop_id_df: pd.DataFrame,
+    salinity_param_df: pd.DataFrame,
+    pp_df: pd.DataFrame,
+    crops_to_correct: List[str],
+    ribasim_path: Union[str, Path],
+    salinity_dir: Union[str, Path],
+    salinity_filename: Path,
+    mask_dir: Union[str, Path],
+    mask_filename: Union[str, Path],
+    communes_gdf: gpd.GeoDataFrame,
+    salinity_crs: str,
+    area_crs: str,
+    raster_cache: Optional[SalinityRasterCache] = None,
+):
+    # Same result as _correct_crop_yield_loop, but production, hectares and salinity
+    # are gathered once as arrays indexed by (area, crop, year) and the yield
+    # correction is applied to all areas and years of a crop at once.
+    first_rows = area_df.drop_duplicates("area_name").set_index("area_name")
+    areas = area_df["area_name"].to_numpy()
+    area_ids = first_rows.loc[areas, "area_id"].to_numpy()
+    area_map_names = first_rows.loc[areas, "area_map_name"].to_numpy()
+    crops = np.asarray(crops)
+    years = np.asarray(years)
+    crop_infos = [
+        get_crop_info(
+            mapping_df, fao_mapping_salt_df, fao_mapping_price_df, crop_id_df, crop
+        )
+        for crop in crops
+    ]
+
+    # Production cube, cells without a production station do not become rows
+    production_index = data_reader.StationIndex.from_dataset(production_ds)
+    positions = production_index.node_crop_positions(
+        area_ids, [info[3] for info in crop_infos]
+    )
+    production = (
+        production_ds["Actual farm gate pr"].transpose("time", "station").to_numpy()
+    )
+    production_cube = production[:, positions].transpose(1, 2, 0)
+    rows = np.broadcast_to((positions >= 0)[..., None], production_cube.shape).copy()
+
+    hectare_positions = _hectare_positions(hectare_ds, areas, area_ids)
+    missing = rows.any(axis=(1, 2)) & (hectare_positions < 0)
+    if missing.any():
+        i = np.flatnonzero(missing)[0]
+        err_msg = f"No hectare station found for {area_ids[i]} / {areas[i]}"
+        raise KeyError(err_msg)
+    hectare_times = hectare_ds.indexes["time"]
+
+    correct = np.array([crop in crops_to_correct for crop in crops], dtype=bool)
+    needs_salinity = rows[:, correct, :].any(axis=1)
+    known = np.ones(len(areas), dtype=bool)
+    if needs_salinity.any() and salinity_filename.suffix == ".xyz":
+        commune_salinity = CommuneSalinity(
+            communes_gdf,
+            salinity_dir,
+            salinity_filename,
+            mask_dir,
+            mask_filename,
+            salinity_crs,
+            area_crs=area_crs,
+            raster_cache=raster_cache,
+        )
+        xyz_salinity = _xyz_salinity(
+            needs_salinity, area_map_names, years, commune_salinity
+        )
+    elif needs_salinity.any() and salinity_filename.suffix in (".his", ".HIS"):
+        tds, tds_times, tds_columns, known = _his_salinity(
+            areas, Path(ribasim_path) / salinity_filename
+        )
+    elif needs_salinity.any():
+        err_msg = f"Unsupported salinity file: {salinity_filename}"
+        raise ValueError(err_msg)
+
+    shape = production_cube.shape
+    hectare_cube = np.full(shape, np.nan)
+    hectare_found = np.zeros(shape, dtype=bool)
+    hectare_dtypes = []
+    salinity_cube = np.full(shape, np.nan)
+    salinity_dtypes = []
+    crop_pps = [0] * len(crops)
+    a_values = [0] * len(crops)
+    b_values = [0] * len(crops)
+    comments = ["No correction needed"] * len(crops)
+
+    for c, crop in enumerate(tqdm(crops, desc="Crops")):
+        (
+            _,
+            crop_fao_salt,
+            crop_fao_price,
+            crop_id,
+            crop_start_ts,
+            crop_end_ts,
+            crop_start_ts_dt,
+            crop_end_ts_dt,
+        ) = crop_infos[c]
+        crop_rows = rows[:, c, :]
+        if correct[c]:
+            # Areas that are not a station of the salinity hisfile are skipped
+            crop_rows &= known[:, None]
+        if not crop_rows.any():
+            continue
+        timeframes = [
+            crop_timeframe(
+                year, crop_start_ts, crop_end_ts, crop_start_ts_dt, crop_end_ts_dt
+            )
+            for year in years
+        ]
+
+        # Maximum cultivated area within the growing season of every year
+        area_rows = crop_rows.any(axis=1)
+        stations, inverse = np.unique(
+            hectare_positions[area_rows], return_inverse=True
+        )
+        hectares = (
+            hectare_ds[f"P Cr{crop_id}/{crop}"]
+            .isel(station=stations)
+            .transpose("time", "station")
+            .to_numpy()[:, inverse]
+        )
+        hectare_dtypes.append(hectares.dtype)
+        for y, (start_ts, end_ts) in enumerate(timeframes):
+            window = hectares[hectare_times.slice_indexer(start_ts, end_ts)]
+            if len(window) > 0:
+                hectare_cube[area_rows, c, y] = np.fmax.reduce(window, axis=0)
+                hectare_found[area_rows, c, y] = True
+
+        if correct[c]:
+            a_values[c], b_values[c], comments[c] = get_salinity_parameters(
+                salinity_param_df, crop_fao_salt
+            )
+            if salinity_filename.suffix == ".xyz":
+                salinity = xyz_salinity
+            else:
+                salinity = _his_season_salinity(
+                    tds, tds_times, timeframes
+                )[:, tds_columns].T
+                salinity = ppm_to_ec(salinity)
+            salinity_cube[:, c, :] = salinity
+            salinity_dtypes.append(salinity.dtype)
+
+        crop_pps[c] = get_producer_prices(pp_df=pp_df, crop_name=crop_fao_price)
+
+    # Yield reduction of all cells at once. The parameters are python scalars in
+    # yield_reduction, so they are cast to the type of the salinity like numpy does.
+    salinity_dtype = production_cube.dtype
+    if salinity_dtypes:
+        salinity_dtype = np.result_type(*salinity_dtypes)
+    salinity_cube = salinity_cube.astype(salinity_dtype)
+    a_cube = np.asarray(a_values, dtype=float).astype(salinity_dtype)[None, :, None]
+    b_cube = (np.asarray(b_values, dtype=float) / 100).astype(salinity_dtype)
+    reduction = np.clip(1 - b_cube[None, :, None] * (salinity_cube - a_cube), 0, 1)
+    applied = rows & correct[None, :, None] & ~np.isnan(reduction)
+    corrected_cube = np.where(applied, reduction * production_cube, production_cube)
+
+    # Rows are ordered by area, crop and year, as in the loop engine. The columns
+    # are cast to the types of the columns of the loop engine, which reads the
+    # production and hectares per row as 0-d arrays.
+    area_idx, crop_idx, year_idx = np.nonzero(rows)
+    correct_rows = correct[crop_idx]
+    production_values = production_cube[rows]
+    corrected_values = corrected_cube[rows]
+    applied_rows = applied[rows]
+
+    if correct_rows.all():
+        salinity_column = salinity_cube[rows]
+    elif correct_rows.any():
+        salinity_column = np.where(correct_rows, salinity_cube[rows], 0).astype(
+            np.result_type(salinity_dtype, np.int64)
+        )
+    else:
+        salinity_column = np.zeros(len(crop_idx), dtype=np.int64)
+
+    hectare_found_rows = hectare_found[rows]
+    hectare_column = hectare_cube[rows]
+    if hectare_found_rows.any():
+        hectare_values = hectare_column[hectare_found_rows]
+        hectare_column = hectare_column.astype(object)
+        hectare_column[hectare_found_rows] = _as_arrays(
+            hectare_values.astype(np.result_type(*hectare_dtypes))
+        )
+
+    if applied_rows.all():
+        corrected_column = corrected_values
+    else:
+        corrected_column = _as_arrays(production_values)
+        corrected_column[applied_rows] = list(corrected_values[applied_rows])
+
+    pp_values = np.asarray(crop_pps, dtype=float).astype(corrected_values.dtype)
+    df = pd.DataFrame(
+        {
+            "area_map_name": _take(areas, area_idx),
+            "crop_name": _take(crops, crop_idx),
+            "crop_name_fao": _take([info[0] for info in crop_infos], crop_idx),
+            "salinity": salinity_column,
+            "yield": _as_arrays(production_values),
+            "hectares": hectare_column,
+            "year": years[year_idx],
+            "a": _take(a_values, crop_idx),
+            "b": _take(b_values, crop_idx),
+            "corrected_yield": corrected_column,
+            "corrected_yield_pp": corrected_values / 1000 * pp_values[crop_idx],
+            "comment": _take(comments, crop_idx),
+            "object_id": _take(area_map_names, area_idx),
+        }
+    )
+    return df
+
+
+def _as_arrays(values: np.ndarray) -> np.ndarray:
+    # Object array of 0-d arrays, the values of the loop engine
+    return np.fromiter(map(np.asarray, values), dtype=object, count=len(values))
+
+
+def _take(values, positions: np.ndarray) -> pd.Series:
+    # Values at positions, with the type pandas infers for the values that are used
+    used, inverse = np.unique(positions, return_inverse=True)
+    return pd.Series([values[i] for i in used]).take(inverse).reset_index(drop=True)
+
+
+def _hectare_positions(
+    hectare_ds: xr.Dataset, areas: np.ndarray, area_ids: np.ndarray
+):
+    # Station positions of the "<area_id> / <area>" hectare stations, -1 if missing
+    station_index = data_reader.StationIndex.from_dataset(hectare_ds)
+    positions = np.full(len(areas), -1, dtype=np.intp)
+    for i, (area, area_id) in enumerate(zip(areas, area_ids)):
+        position = station_index.node_area(area_id, area)
+        if position is None:
+            position = station_index.node_area(area_id, f"{area}_AdvIrr{area_id}")
+        if position is not None:
+            positions[i] = position
+    return positions
+
+
+def _xyz_salinity(
+    needs_salinity: np.ndarray,
+    area_map_names: np.ndarray,
+    years: np.ndarray,
+    commune_salinity: CommuneSalinity,
+):
+    # Median salinity per (area, year), looked up once for every mapped area name
+    codes, names = pd.factorize(area_map_names)
+    needed = np.zeros((len(names), len(years)), dtype=bool)
+    np.logical_or.at(needed, codes, needs_salinity)
+    keys = np.nonzero(needed)
+    medians = np.array(
+        [commune_salinity.salinity(names[i], years[j]) for i, j in zip(*keys)]
+    )
+    table = np.full(needed.shape, np.nan, dtype=np.result_type(medians, np.float32))
+    table[keys] = medians
+    return table[codes]
+
+
+def _his_salinity(areas: np.ndarray, his_file: Path):
+    # TDS series of the areas that are a station of the salinity hisfile
+    salinity_his = data_reader.HisFile(his_file, crop=None)
+    stations = set(salinity_his.open_metadata(hia=True).stations)
+    known = np.array([area in stations for area in areas], dtype=bool)
+    columns = {name: i for i, name in enumerate(dict.fromkeys(areas[known]))}
+    tds_columns = np.array([columns.get(area, 0) for area in areas], dtype=np.intp)
+    if not columns:
+        return np.empty((0, 0)), pd.DatetimeIndex([]), tds_columns, known
+    salinity_his.read(hia=True, params=["TDS"], stations=list(columns))
+    tds = salinity_his.ds["TDS"].transpose("time", "station").to_numpy()
+    return tds, salinity_his.ds.indexes["time"], tds_columns, known
+
+
+def _his_season_salinity(tds: np.ndarray, tds_times: pd.DatetimeIndex, timeframes):
+    # Median TDS of every station within the growing season of every year
+    return np.stack(
+        [
+            np.nanmedian(tds[tds_times.slice_indexer(start_ts, end_ts)], axis=0)
+            for start_ts, end_ts in timeframes
+        ]
+    )
+
+
+_ENGINES = {
+    "loop": _correct_crop_yield_loop,
+    "vectorized": _correct_crop_yield_vectorized,
+}
+
+# Inputs of the correction engine in a worker process, set by _init_worker
+_worker_inputs = {}
+
+
+def _init_worker(ribasim_path, his_file, hectare_his_file, communes_file, inputs):
+    # The hisfiles are memory-mapped and the communes read once per worker, so the
+    # datasets are shared through the page cache instead of pickled to every task
+    production_ds, hectare_ds = read_his_inputs(
+        ribasim_path, his_file, hectare_his_file
+    )
+    production_ds, _ = get_year_info(production_ds=production_ds)
+    communes_gdf = gpd.read_file(communes_file) if communes_file else None
+    _worker_inputs.clear()
+    _worker_inputs.update(
+        inputs,
+        production_ds=production_ds,
+        hectare_ds=hectare_ds,
+        communes_gdf=communes_gdf,
+    )
+
+
+def _correct_area_shard(engine: str, area_df: pd.DataFrame):
+    return _ENGINES[engine](area_df=area_df, **_worker_inputs)
+
+
+def _correct_crop_yield_parallel(
+    engine: str,
+    area_df: pd.DataFrame,
+    workers: int,
+    his_inputs: tuple,
+    inputs: dict,
+):
+    # Areas are looked up by their first row, resolve those before sharding so that
+    # every shard sees the same area ids and mapped names
+    first_rows = area_df.drop_duplicates("area_name").set_index("area_name")
+    area_df = area_df.assign(
+        area_id=first_rows.loc[area_df["area_name"], "area_id"].to_numpy(),
+        area_map_name=first_rows.loc[area_df["area_name"], "area_map_name"].to_numpy(),
+    )
+    shards = [
+        area_df.iloc[rows]
+        for rows in np.array_split(np.arange(len(area_df)), workers)
+        if len(rows) > 0
+    ]
+    logger.info("Correcting %d areas with %d workers", len(area_df), len(shards))
+    with ProcessPoolExecutor(
+        max_workers=len(shards),
+        initializer=_init_worker,
+        initargs=(*his_inputs, inputs),
+    ) as executor:
+        # map returns the shards in submission order, keeping the rows deterministic
+        results = list(executor.map(_correct_area_shard, repeat(engine), shards))
+    results = [df for df in results if len(df) > 0] or results[:1]
+    return pd.concat(results, ignore_index=True)
+
+
+def correct_crop_yield(
+    land_name: str,
+    fao_client: FAOClient,
+    ribasim_path: Union[str, Path],
+    input_path: Union[str, Path],
+    his_file: Union[str, Path],
+    hectare_his_file: Union[str, Path],
+    salinity_dir: Union[str, Path],
+    salinity_filename: Union[str, Path],
+    salinity_param_file: Union[str, Path],
+    mask_dir: Union[str, Path],
+    mask_filename: Union[str, Path],
+    mapping_file: Union[str, Path],
+    fao_mapping_file: Union[str, Path],
+    crops_to_correct: List[str],
+    area_crs: Optional[str] = "EPSG:4326",
+    salinity_crs: Optional[str] = "EPSG:32648",
+    communes_file: Optional[Union[str, Path]] = None,
+    common_unit_filename: Optional[Union[str, Path]] = None,
+    department_file: Optional[Union[str, Path]] = None,
+    department_crs: Optional[str] = None,
+    engine: str = "vectorized",
+    workers: int = 1,
+    raster_cache_size: int = 4,
+    raster_cache_dir: Optional[Union[str, Path]] = None,
+):
+    if engine not in _ENGINES:
+        err_msg = f"Unknown engine '{engine}', expected one of {list(_ENGINES)}"
+        raise ValueError(err_msg)
+
+    (
+        production_ds,
+        hectare_ds,
+        communes_gdf,
+        salinity_param_df,
+        mapping_df,
+        fao_mapping_salt_df,
+        fao_mapping_price_df,
+        area_df,
+        crop_id_df,
+        pp_df,
+    ) = load_input_data(
+        his_file=his_file,
+        hectare_his_file=hectare_his_file,
+        communes_file=communes_file,
+        salinity_param_file=salinity_param_file,
+        mapping_file=mapping_file,
+        fao_mapping_file=fao_mapping_file,
+        land_name=land_name,
+        ribasim_path=ribasim_path,
+        input_path=input_path,
+        fao_client=fao_client,
+    )
+    logger.info("Starting crop yield correction for %s", land_name)
+
+    crops = mapping_df["crop_name"].values
+    production_ds, years = get_year_info(production_ds=production_ds)
+    salinity_filename = Path(salinity_filename)
+
+    logger.info(
+        "Loaded input data. Areas=%d, Crops=%d, Years=%d",
+        len(area_df),
+        len(crops),
+        len(years),
+    )
+
+    inputs = {
+        "years": years,
+        "crops": crops,
+        "mapping_df": mapping_df,
+        "fao_mapping_salt_df": fao_mapping_salt_df,
+        "fao_mapping_price_df": fao_mapping_price_df,
+        "crop_id_df": crop_id_df,
+        "salinity_param_df": salinity_param_df,
+        "pp_df": pp_df,
+        "crops_to_correct": crops_to_correct,
+        "ribasim_path": ribasim_path,
+        "salinity_dir": salinity_dir,
+        "salinity_filename": salinity_filename,
+        "mask_dir": mask_dir,
+        "mask_filename": mask_filename,
+        "salinity_crs": salinity_crs,
+        "area_crs": area_crs,
+        # Every salinity map is parsed and masked once per run (and worker)
+        "raster_cache": SalinityRasterCache(raster_cache_size, raster_cache_dir),
+    }
+    if workers > 1 and len(area_df) > 1:
+        df = _correct_crop_yield_parallel(
+            engine,
+            area_df,
+            workers,
+            his_inputs=(ribasim_path, his_file, hectare_his_file, communes_file),
+            inputs=inputs,
+        )
+    else:
+        df = _ENGINES[engine](
+            production_ds=production_ds,
+            hectare_ds=hectare_ds,
+            area_df=area_df,
+            communes_gdf=communes_gdf,
+            **inputs,
+        )
     logger.info("Created dataframe with %d rows", len(df))
 
     if department_file:
@@ -877,6 +1628,7 @@ def correct_crop_yield(
                 mask_filename=mask_filename,
                 communes_gdf=common_unit_gdf,
                 area_crs=department_crs,
+                raster_cache=inputs["raster_cache"],
             )
             logger.info(
                 "Department aggregation complete. Rows=%d",
@@ -884,6 +1636,7 @@ def correct_crop_yield(
             )
     else:
         df = df.drop(columns=["object_id"])
+    inputs["raster_cache"].clear()
 
     logger.info("Crop yield correction finished successfully")
 
@@ -899,7 +1652,18 @@ def correct_salinity(
     mask_filename,
     communes_gdf,
     area_crs,
+    raster_cache: Optional[SalinityRasterCache] = None,
 ):
+    commune_salinity = CommuneSalinity(
+        communes_gdf,
+        salinity_dir,
+        salinity_filename,
+        mask_dir,
+        mask_filename,
+        salinity_crs,
+        area_crs=area_crs,
+        raster_cache=raster_cache,
+    )
     for i, row in df.iterrows():
         a, b = row["a"], row["b"]
         if a == 0 and b == 0:
@@ -918,6 +1682,7 @@ def correct_salinity(
                 area_crs=area_crs,
                 a=a,
                 b=b,
+                commune_salinity=commune_salinity,
             )
             df.loc[i, "corrected_yield"] = corrected_yield
             df.loc[i, "salinity"] = salinity
@@ -939,6 +1704,7 @@ def generate_crop_yield_csv(
     cfg_path = Path(config_path)
     config = ConfigReader(cfg_path)
     salinity_config = config["salinity_correction"]
+    options = salinity_config.get("options", {})
 
     if convert_departments:
         common_unit_filename = salinity_config["departments"]["common_unit_path"]
@@ -970,6 +1736,10 @@ def generate_crop_yield_csv(
         common_unit_filename=common_unit_filename,
         department_file=department_file,
         department_crs=department_crs,
+        engine=options.get("engine", "vectorized"),
+        workers=options.get("workers", 1),
+        raster_cache_size=options.get("raster_cache_size", 4),
+        raster_cache_dir=options.get("raster_cache_dir"),
     )
 
     if add_labor:
@@ -1,5 +1,6 @@
 """Module containing utility functions."""
 
+import re
 from pathlib import Path
 from typing import Union
 
@@ -8,6 +9,9 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from scipy.sparse import coo_matrix
 
+# Columns of food items are named <item>_<item code>
+ITEM_COLUMN_PATTERN = re.compile(r"^[A-Z ,/]+_[0-9]+$")
+
 
 def _prep_conversion_table(conversion_df: pd.DataFrame) -> pd.DataFrame:
     # drop duplicate occurrences of item code, retaining the first occurrence
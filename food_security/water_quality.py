@@ -36,12 +36,18 @@ def load_input_data(
     input_path = Path(input_path)
 
     wq_his_file = data_reader.HisFile(ribasim_path / wq_his_file, crop=None)
-    wq_his_file.read(hia=True)
+    wq_his_file.read(
+        hia=True,
+        params=["Supply from network (m3/s)", "Demand from network (m3/s)"],
+    )
     wq_ds = wq_his_file.ds.copy(deep=True)
 
     # Read the HIS file and create a dataset for crop production data.
     prod_his_file = data_reader.HisFile(ribasim_path / prod_his_file, crop=None)
-    prod_his_file.read(hia=True)
+    prod_his_file.read(
+        hia=True,
+        params=["Area cultivated actual (ha)", "Supply (mm/day)"],
+    )
     prod_ds = prod_his_file.ds.copy(deep=True)
 
     area_df = pd.read_excel(
@@ -73,23 +79,40 @@ def get_departmental_yield(
     return departmental_yields
 
 
-def get_hectares(prod_ds: xr.Dataset, area, area_id, year, timesteps=False):
+def _node_position(
+    prod_ds: xr.Dataset,
+    area,
+    area_id,
+    station_index: Optional[data_reader.StationIndex] = None,
+) -> int:
+    if station_index is None:
+        station_index = data_reader.StationIndex.from_dataset(prod_ds)
+    position = station_index.node_area(area_id, area)
+    if position is None:
+        err_msg = f"No station found for {area_id} / {area}"
+        raise KeyError(err_msg)
+    return position
+
+
+def get_hectares(
+    prod_ds: xr.Dataset,
+    area,
+    area_id,
+    year,
+    timesteps=False,
+    station_index: Optional[data_reader.StationIndex] = None,
+):
     start_ts = f"{year}-10-01"
     end_ts = f"{year + 1}-10-1"
     timeframe = slice(start_ts, end_ts)
 
-    node = f"{area_id} / {area}"
+    position = _node_position(prod_ds, area, area_id, station_index)
+    selection = prod_ds.isel(station=position).sel(time=timeframe)
 
     if timesteps:
-        hectares = prod_ds.sel({"station": node, "time": timeframe})[
-            "Area cultivated actual (ha)"
-        ].values
+        hectares = selection["Area cultivated actual (ha)"].values
     else:
-        hectares = (
-            prod_ds.sel({"station": node, "time": timeframe})
-            .mean(dim="time")["Area cultivated actual (ha)"]
-            .values
-        )
+        hectares = selection.mean(dim="time")["Area cultivated actual (ha)"].values
     return hectares
 
 
@@ -111,24 +134,36 @@ def compute_water_productivity(wq_ds: xr.Dataset, producer_price, area, year):
     return water_productivity
 
 
-def get_timesteps(prod_ds: xr.Dataset, area, area_id, year):
+def get_timesteps(
+    prod_ds: xr.Dataset,
+    area,
+    area_id,
+    year,
+    station_index: Optional[data_reader.StationIndex] = None,
+):
     start_ts = f"{year}-10-01"
     end_ts = f"{year + 1}-10-01"
     timeframe = slice(start_ts, end_ts)
-    node = f"{area_id} / {area}"
-    timesteps = prod_ds.sel({"station": node, "time": timeframe})["time"].values
+    position = _node_position(prod_ds, area, area_id, station_index)
+    timesteps = prod_ds.isel(station=position).sel(time=timeframe)["time"].values
 
     return timesteps
 
 
-def compute_water_use(prod_ds: xr.Dataset, area, area_id, year):
+def compute_water_use(
+    prod_ds: xr.Dataset,
+    area,
+    area_id,
+    year,
+    station_index: Optional[data_reader.StationIndex] = None,
+):
     start_ts = f"{year}-10-01"
     end_ts = f"{year + 1}-10-01"
     timeframe = slice(start_ts, end_ts)
-    node = f"{area_id} / {area}"
-    water_use = prod_ds.sel({"station": node, "time": timeframe})[
-        "Supply (mm/day)"
-    ].values
+    position = _node_position(prod_ds, area, area_id, station_index)
+    water_use = (
+        prod_ds["Supply (mm/day)"].isel(station=position).sel(time=timeframe).values
+    )
 
     return water_use
 
@@ -281,6 +316,7 @@ def create_water_df(
 
     years = corrected_df["year"].unique()
     areas = corrected_df["area_map_name"].unique()
+    prod_index = data_reader.StationIndex.from_dataset(prod_ds)
 
     for year in years:
         for area in areas:
@@ -290,10 +326,19 @@ def create_water_df(
                 continue
 
             hectares = get_hectares(
-                prod_ds=prod_ds, area=area, area_id=area_id, year=year
+                prod_ds=prod_ds,
+                area=area,
+                area_id=area_id,
+                year=year,
+                station_index=prod_index,
             )
             hectares_t = get_hectares(
-                prod_ds=prod_ds, area=area, area_id=area_id, year=year, timesteps=True
+                prod_ds=prod_ds,
+                area=area,
+                area_id=area_id,
+                year=year,
+                timesteps=True,
+                station_index=prod_index,
             )
             producer_price = corrected_df[
                 (corrected_df["year"] == year) & (corrected_df["area_map_name"] == area)
@@ -304,10 +349,18 @@ def create_water_df(
             )
 
             timesteps = get_timesteps(
-                prod_ds=prod_ds, area=area, area_id=area_id, year=year
+                prod_ds=prod_ds,
+                area=area,
+                area_id=area_id,
+                year=year,
+                station_index=prod_index,
             )
             water_use = compute_water_use(
-                prod_ds=prod_ds, area=area, area_id=area_id, year=year
+                prod_ds=prod_ds,
+                area=area,
+                area_id=area_id,
+                year=year,
+                station_index=prod_index,
             )
             water_supply = get_water_supply(wq_ds=wq_ds, area=area, year=year)
             water_demand = get_water_demand(wq_ds=wq_ds, area=area, year=year)
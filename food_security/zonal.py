@@ -0,0 +1,331 @@
+"""Zonal statistics over integer label rasters.
+
+Polygons are rasterized once into a label grid, after which the statistics of all
+zones are computed in a single pass over a value raster by sorting the cells on
+their label. This avoids masking the value raster for every polygon separately.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+from rasterio.features import MergeAlg, rasterize
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+    from affine import Affine
+    from shapely.geometry.base import BaseGeometry
+
+logger = logging.getLogger(__name__)
+
+ZONAL_STATS = ("count", "min", "max", "sum", "mean", "median")
+# Maximum number of bins in which the values of all zones are counted at once to
+# select the medians of blocks
+MEDIAN_BINS = 2**22
+
+
+def rasterize_zones(
+    geometries: Sequence[BaseGeometry],
+    shape: tuple[int, int],
+    transform: Affine,
+    *,
+    all_touched: bool = False,
+) -> np.ndarray:
+    """Rasterize geometries into a label grid.
+
+    Cells are assigned to a geometry with the same rule as ``rasterio.mask.mask``.
+    The label of the i-th geometry is i + 1, cells outside all geometries are 0.
+    Cells covered by more than one geometry get the label of the last one.
+
+    Args:
+        geometries (Sequence[BaseGeometry]): Geometries in the CRS of the grid.
+        shape (tuple[int, int]): Number of rows and columns of the grid.
+        transform (Affine): Transform of the grid.
+        all_touched (bool, optional): Include all cells touched by a geometry.
+            Defaults to False.
+
+    Returns:
+        np.ndarray: int32 label grid.
+
+    """
+    shapes = [
+        (geometry, label)
+        for label, geometry in enumerate(geometries, start=1)
+        if geometry is not None and not geometry.is_empty
+    ]
+    if not shapes:
+        return np.zeros(shape, dtype=np.int32)
+    return rasterize(
+        shapes,
+        out_shape=shape,
+        transform=transform,
+        fill=0,
+        all_touched=all_touched,
+        dtype="int32",
+    )
+
+
+def zones_overlap(
+    geometries: Sequence[BaseGeometry],
+    shape: tuple[int, int],
+    transform: Affine,
+    *,
+    all_touched: bool = False,
+) -> bool:
+    """Check if any cell of the grid is covered by more than one geometry."""
+    shapes = [
+        (geometry, 1)
+        for geometry in geometries
+        if geometry is not None and not geometry.is_empty
+    ]
+    if len(shapes) < 2:  # noqa: PLR2004
+        return False
+    counts = rasterize(
+        shapes,
+        out_shape=shape,
+        transform=transform,
+        fill=0,
+        all_touched=all_touched,
+        merge_alg=MergeAlg.add,
+        dtype="int32",
+    )
+    return bool(counts.max() > 1)
+
+
+def zonal_statistics(
+    labels: np.ndarray,
+    values: np.ndarray,
+    n_zones: int,
+    stats: Iterable[str] = ZONAL_STATS,
+    nodata: float | None = None,
+) -> pd.DataFrame:
+    """Compute statistics of the values in every zone of a label grid.
+
+    NaN values and values equal to nodata are ignored, like ``np.nanmedian`` does.
+    Zones without values get a count of 0 and NaN for the other statistics.
+
+    Args:
+        labels (np.ndarray): Label grid with zone labels 1..n_zones, 0 is no zone.
+        values (np.ndarray): Value grid with the same shape as labels.
+        n_zones (int): Number of zones.
+        stats (Iterable[str], optional): Statistics to compute, a subset of
+            ZONAL_STATS. Defaults to all of them.
+        nodata (float | None, optional): Value to ignore. Defaults to None.
+
+    Returns:
+        pd.DataFrame: Statistics per zone, indexed by the zone position label - 1.
+
+    """
+    stats = list(stats)
+    unknown = [stat for stat in stats if stat not in ZONAL_STATS]
+    if unknown:
+        err_msg = f"Unknown statistics {unknown}, expected any of {ZONAL_STATS}"
+        raise ValueError(err_msg)
+
+    labels, values = _valid_cells(labels, values, n_zones, nodata)
+
+    # Sort the cells on label and then value, each zone becomes a sorted segment
+    order = np.lexsort((values, labels))
+    labels = labels[order]
+    values = values[order]
+    counts = np.bincount(labels, minlength=n_zones + 1)[1:]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    filled = counts > 0
+    first = starts[filled]
+    last = first + counts[filled] - 1
+
+    result = {}
+    for stat in stats:
+        if stat == "count":
+            result[stat] = counts
+            continue
+        column = np.full(n_zones, np.nan)
+        if stat == "min":
+            column[filled] = values[first]
+        elif stat == "max":
+            column[filled] = values[last]
+        elif stat in ("sum", "mean"):
+            sums = np.bincount(labels, weights=values, minlength=n_zones + 1)[1:]
+            if stat == "sum":
+                column = np.where(filled, sums, np.nan)
+            else:
+                column[filled] = sums[filled] / counts[filled]
+        elif stat == "median":
+            column = np.full(n_zones, np.nan, dtype=np.result_type(values, np.float32))
+            lower = values[first + (counts[filled] - 1) // 2]
+            upper = values[first + counts[filled] // 2]
+            # Same as np.median: the mean of the two middle values of an even count
+            column[filled] = np.where(
+                counts[filled] % 2 == 1, lower, (lower + upper) / 2
+            )
+        result[stat] = column
+    return pd.DataFrame(result, index=pd.RangeIndex(n_zones, name="zone"))
+
+
+def zonal_statistics_blocks(
+    blocks: Iterable[tuple[np.ndarray, np.ndarray]],
+    n_zones: int,
+    stats: Iterable[str] = ZONAL_STATS,
+    nodata: float | None = None,
+) -> pd.DataFrame:
+    """Compute statistics of the zones of a label grid that is read block by block.
+
+    Gives the same result as zonal_statistics on the full grid, while only one
+    block is in memory at a time. The median is selected from the bits of the
+    values in a few more passes over the blocks, see _blocks_median, so the blocks
+    should be iterable more than once when it is requested, like a list.
+
+    Args:
+        blocks (Iterable[tuple[np.ndarray, np.ndarray]]): Label and value grid of
+            every block.
+        n_zones (int): Number of zones.
+        stats (Iterable[str], optional): Statistics to compute, a subset of
+            ZONAL_STATS. Defaults to all of them.
+        nodata (float | None, optional): Value to ignore. Defaults to None.
+
+    Raises:
+        ValueError: The median is requested of blocks that can be iterated once.
+
+    Returns:
+        pd.DataFrame: Statistics per zone, indexed by the zone position label - 1.
+
+    """
+    stats = list(stats)
+    unknown = [stat for stat in stats if stat not in ZONAL_STATS]
+    if unknown:
+        err_msg = f"Unknown statistics {unknown}, expected any of {ZONAL_STATS}"
+        raise ValueError(err_msg)
+    if "median" in stats and iter(blocks) is blocks:
+        err_msg = "The median needs blocks that can be iterated more than once"
+        raise ValueError(err_msg)
+
+    counts = np.zeros(n_zones, dtype=np.int64)
+    sums = np.zeros(n_zones)
+    minima = np.full(n_zones, np.nan)
+    maxima = np.full(n_zones, np.nan)
+    dtype = None
+    for block_labels, block_values in blocks:
+        labels, values = _valid_cells(block_labels, block_values, n_zones, nodata)
+        dtype = values.dtype if dtype is None else np.result_type(dtype, values)
+        block = zonal_statistics(labels, values, n_zones, ("count", "min", "max"))
+        counts += block["count"].to_numpy()
+        sums += np.bincount(labels, weights=values, minlength=n_zones + 1)[1:]
+        minima = np.fmin(minima, block["min"].to_numpy())
+        maxima = np.fmax(maxima, block["max"].to_numpy())
+
+    filled = counts > 0
+    result = {}
+    for stat in stats:
+        if stat == "count":
+            result[stat] = counts
+        elif stat == "min":
+            result[stat] = minima
+        elif stat == "max":
+            result[stat] = maxima
+        elif stat == "sum":
+            result[stat] = np.where(filled, sums, np.nan)
+        elif stat == "mean":
+            result[stat] = np.where(filled, sums / np.maximum(counts, 1), np.nan)
+        elif stat == "median":
+            result[stat] = _blocks_median(
+                blocks, counts, nodata, np.dtype(float) if dtype is None else dtype
+            )
+    return pd.DataFrame(result, index=pd.RangeIndex(n_zones, name="zone"))
+
+
+def _blocks_median(
+    blocks: Iterable[tuple[np.ndarray, np.ndarray]],
+    counts: np.ndarray,
+    nodata: float | None,
+    dtype: np.dtype,
+) -> np.ndarray:
+    # The values are mapped to unsigned integer keys with the same order. The keys
+    # of the two middle values of every zone are then selected a few bits at a time:
+    # every pass over the blocks counts the keys that start with the bits selected so
+    # far in a bin per value of the next bits. The bins of all zones together hold
+    # at most MEDIAN_BINS counts, memory does not depend on the size of the zones.
+    n_zones = len(counts)
+    zones = np.flatnonzero(counts)
+    median = np.full(n_zones, np.nan, dtype=np.result_type(dtype, np.float32))
+    if len(zones) == 0:
+        return median
+    float_dtype = np.dtype(
+        np.float32 if np.can_cast(dtype, np.float32, "safe") else np.float64
+    )
+    width = 8 * float_dtype.itemsize
+    # Target of the label of a cell, the upper middle value is len(zones) further
+    targets = np.full(n_zones + 1, -1, dtype=np.intp)
+    targets[zones + 1] = np.arange(len(zones))
+    ranks = np.concatenate([(counts[zones] - 1) // 2, counts[zones] // 2])
+    n_targets = len(ranks)
+    key_dtype = np.dtype(f"u{float_dtype.itemsize}")
+    prefix = np.zeros(n_targets, dtype=key_dtype)
+    step = int(np.clip(np.log2(max(1, MEDIAN_BINS // n_targets)), 1, 16))
+
+    selected = 0
+    while selected < width:
+        bits = min(step, width - selected)
+        shift = key_dtype.type(width - selected - bits)
+        hist = np.zeros(n_targets << bits, dtype=np.int64)
+        for block_labels, block_values in blocks:
+            labels, values = _valid_cells(block_labels, block_values, n_zones, nodata)
+            keys = _sort_keys(values.astype(float_dtype))
+            bins = ((keys >> shift) & key_dtype.type((1 << bits) - 1)).astype(np.intp)
+            for offset in (0, len(zones)):
+                target = targets[labels] + offset
+                match = np.ones(len(keys), dtype=bool)
+                if selected > 0:
+                    high = key_dtype.type(width - selected)
+                    match = (keys >> high) == (prefix[target] >> high)
+                hist += np.bincount(
+                    (target[match] << bits) + bins[match], minlength=len(hist)
+                )
+        cumulative = np.cumsum(hist.reshape(n_targets, 1 << bits), axis=1)
+        # First bin in which the count reaches the rank of the target
+        chosen = np.argmax(cumulative > ranks[:, None], axis=1)
+        below = cumulative[np.arange(n_targets), chosen - 1]
+        ranks -= np.where(chosen > 0, below, 0)
+        prefix |= chosen.astype(key_dtype) << shift
+        selected += bits
+
+    middle = _from_sort_keys(prefix, float_dtype).astype(dtype)
+    lower = middle[: len(zones)]
+    upper = middle[len(zones) :]
+    # Same as np.median: the mean of the two middle values of an even count
+    median[zones] = np.where(counts[zones] % 2 == 1, lower, (lower + upper) / 2)
+    return median
+
+
+def _sort_keys(values: np.ndarray) -> np.ndarray:
+    # Unsigned integers in the order of the float values: the sign bit is set for
+    # positive values, all bits are flipped for negative values
+    key_dtype = np.dtype(f"u{values.dtype.itemsize}")
+    sign = key_dtype.type(1) << key_dtype.type(8 * values.dtype.itemsize - 1)
+    bits = values.view(key_dtype)
+    return np.where(bits & sign, ~bits, bits | sign)
+
+
+def _from_sort_keys(keys: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    sign = keys.dtype.type(1) << keys.dtype.type(8 * keys.dtype.itemsize - 1)
+    return np.where(keys & sign, keys ^ sign, ~keys).view(dtype)
+
+
+def _valid_cells(
+    labels: np.ndarray, values: np.ndarray, n_zones: int, nodata: float | None
+) -> tuple[np.ndarray, np.ndarray]:
+    # Labels and values of the cells inside a zone that hold a value
+    if labels.shape != values.shape:
+        err_msg = f"Labels {labels.shape} and values {values.shape} differ in shape"
+        raise ValueError(err_msg)
+    labels = labels.ravel()
+    values = values.ravel()
+    valid = (labels > 0) & (labels <= n_zones)
+    if np.issubdtype(values.dtype, np.floating):
+        valid &= ~np.isnan(values)
+    if nodata is not None and not np.isnan(nodata):
+        valid &= values != nodata
+    return labels[valid], values[valid]
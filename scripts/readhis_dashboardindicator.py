@@ -18,12 +18,14 @@ from datetime import datetime, timedelta
 from os.path import getsize
 import os
 from pathlib import Path
-from struct import pack, unpack
+from struct import unpack
 
 import numpy as np
 import pandas as pd
 import xarray as xr
 
+from food_security.data_reader import write_his
+
 import warnings
 
 warnings.simplefilter(action="ignore", category=FutureWarning)
@@ -103,38 +105,7 @@ def read(hisfile, hia=True):
 
 def write(hisfile, ds):
     """Writes an xarray.Dataset with extra attributes to a hisfile."""
-    with open(hisfile, "wb") as f:
-        header = ds.attrs["header"]
-        scu = ds.attrs["scu"]
-        t0 = ds.attrs["t0"]
-        f.write(header.ljust(120)[:120].encode("ascii"))  # enforce length
-        t0str = t0.strftime("%Y.%m.%d %H:%M:%S")
-        timeinfo = "T0: {}  (scu={:8d}s)".format(t0str, scu)
-        f.write(timeinfo.encode("ascii"))
-        noout = len(ds)
-        notim, noseg = ds.time.size, ds.station.size
-        f.write(pack("ii", noout, noseg))
-        params = np.array(list(ds.keys()), dtype="S20")
-        params = np.char.ljust(params, 20)
-        params.tofile(f)
-        locs = np.array(ds.station, dtype="S20")
-        locs = np.char.ljust(locs, 20)
-        for locnr, loc in enumerate(locs):
-            f.write(pack("i", locnr))
-            f.write(loc)
-        da = ds.to_array()
-        assert da.dims != ("variable", "time", "station")
-        data = da.values.astype(np.float32)
-        for t, date in enumerate(ds.time.values):
-            date = pd.Timestamp(date).to_pydatetime()
-            ts = int((date - t0).total_seconds() / scu)
-            f.write(pack("i", ts))
-            for s in range(noseg):
-                data[:, t, s].tofile(f)
-        countmsg = "hisfile written is not the correct length"
-        assert f.tell() == 160 + 8 + 20 * noout + (4 + 20) * noseg + notim * (
-            4 + noout * noseg * 4
-        ), countmsg
+    write_his(hisfile, ds)
 
 
 def toBCM(ds, list_var):
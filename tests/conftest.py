@@ -1,8 +1,12 @@
 from pathlib import Path
+from struct import pack
 
 import geopandas as gpd
+import numpy as np
+import pandas as pd
 import pytest
 
+from food_security import fao_api
 from food_security.config import ConfigReader
 
 DATA_DIR = Path(__file__).absolute().parent.parent / "data"
@@ -29,6 +33,45 @@ def his_file() -> Path:
     return TEST_DATA_DIR / "RIB_CULT_prod.his"
 
 
+@pytest.fixture
+def his_params() -> list[str]:
+    return ["Actual farm gate pr", "Actual farm gate pr", "TDS"]
+
+
+@pytest.fixture
+def his_stations() -> list[str]:
+    return ["Nd______42 / Cr__1 /", "Nd______42 / Cr__2 /", "Nd_____175 / Cr__1 /"]
+
+
+@pytest.fixture
+def his_values(his_params, his_stations) -> np.ndarray:
+    # (time, station, param) block with unique values per cell
+    notim = 5
+    shape = (notim, len(his_stations), len(his_params))
+    return np.arange(np.prod(shape), dtype=np.float32).reshape(shape)
+
+
+@pytest.fixture
+def synthetic_his_file(tmp_path, his_params, his_stations, his_values) -> Path:
+    """Write a small HIS file with yearly timesteps starting at 2014-01-01."""
+    path = tmp_path / "synthetic.his"
+    scu = 86400
+    with path.open("wb") as f:
+        f.write(b"synthetic his file".ljust(120))
+        f.write(b"T0: 2014.01.01 00:00:00  (scu=   86400s)")
+        f.write(pack("ii", len(his_params), len(his_stations)))
+        for param in his_params:
+            f.write(param.encode("ascii").ljust(20))
+        for nr, station in enumerate(his_stations):
+            f.write(pack("i", nr))
+            f.write(station.encode("ascii").ljust(20))
+        for t, block in enumerate(his_values):
+            elapsed = np.datetime64(f"{2014 + t}-01-01") - np.datetime64("2014-01-01")
+            f.write(pack("i", int(elapsed / np.timedelta64(scu, "s"))))
+            f.write(block.astype("<f4").tobytes())
+    return path
+
+
 @pytest.fixture
 def conversion_table(test_data_dir) -> Path:
     return test_data_dir / "conversion_table.csv"
@@ -47,3 +90,29 @@ def config_toml_file(test_data_dir) -> Path:
 @pytest.fixture
 def config_dict(config_toml_file) -> dict:
     return ConfigReader(config_toml_file)
+
+
+@pytest.fixture
+def fao_calls(monkeypatch):
+    """Replace the FAOSTAT API calls with local responses and count the calls."""
+    calls = []
+
+    def get_par(code, par):
+        calls.append(("get_par", code))
+        return {"Viet Nam": "237"}
+
+    def get_data_df(code, pars, coding, **kwargs):
+        calls.append(("get_data_df", code))
+        if pars.get("year") == "2026":
+            return pd.DataFrame()
+        return pd.DataFrame(
+            {
+                "Area": ["Viet Nam", "Viet Nam"],
+                "Year": ["2020", "2020"],
+                "Value": ["1.5", "2"],
+            }
+        )
+
+    monkeypatch.setattr(fao_api.faostat, "get_par", get_par)
+    monkeypatch.setattr(fao_api.faostat, "get_data_df", get_data_df)
+    return calls
@@ -0,0 +1,19 @@
+from pathlib import Path
+
+import pytest
+
+from food_security import cli
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [["config.toml"], ["run", "config.toml"], ["config.toml", "--offline"]],
+)
+def test_main_run(argv, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        cli, "run", lambda *args, **kwargs: calls.append((args, kwargs))
+    )
+    cli.main(argv)
+    assert calls[0][0][0] == Path("config.toml")
+    assert calls[0][1] == {"offline": "--offline" in argv}
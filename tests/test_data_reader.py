@@ -1,9 +1,26 @@
 import logging
+import os
 from pathlib import Path
 
 import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import rasterio
+import xarray as xr
+from rasterio.transform import from_origin
+from rasterstats import zonal_stats
+from shapely.geometry import box
 
-from food_security.data_reader import Grid, HisFile, read_and_transform_rice_yield_table
+from food_security import data_reader
+from food_security.data_reader import (
+    Grid,
+    HisFile,
+    HisWriter,
+    StationIndex,
+    read_and_transform_rice_yield_table,
+    write_his,
+)
 
 
 def test_Grid_get_region_stat(regions, grid_file):
@@ -49,3 +66,294 @@ def test_HisFile_to_table(his_file: Path):
     his_reader.read()
     df = his_reader.to_table(year=2014)
     assert len(df) == 12
+
+
+def test_HisFile_read_mmap(synthetic_his_file, his_values):
+    his_reader = HisFile(synthetic_his_file, crop=None)
+    his_reader.read()
+    in_memory = HisFile(synthetic_his_file, crop=None)
+    in_memory.read(mmap=False)
+    xr.testing.assert_identical(his_reader.ds, in_memory.ds)
+    assert "Actual farm gate pr_2" in his_reader.ds.data_vars
+    np.testing.assert_array_equal(his_reader.ds["TDS"].to_numpy(), his_values[..., 2])
+    assert his_reader.ds.time.to_index().year.tolist() == [2014, 2015, 2016, 2017, 2018]
+
+
+def test_HisFile_read_selection(synthetic_his_file, his_stations):
+    his_reader = HisFile(synthetic_his_file, crop=None)
+    his_reader.read()
+    expected = his_reader.ds[["TDS"]].sel(
+        station=[his_stations[2], his_stations[0]],
+        time=slice("2015-01-01", "2016-01-01"),
+    )
+    selection = {
+        "params": ["TDS"],
+        "stations": [his_stations[2], his_stations[0]],
+        "time": slice("2015-01-01", "2016-01-01"),
+    }
+    his_reader.read(**selection)
+    xr.testing.assert_identical(his_reader.ds, expected)
+    his_reader.read(lazy=True, **selection)
+    xr.testing.assert_identical(his_reader.ds.load(), expected)
+
+
+def test_HisFile_open_metadata(synthetic_his_file, his_stations, monkeypatch):
+    his_reader = HisFile(synthetic_his_file, crop=None)
+    index = his_reader.open_metadata()
+    assert index.stations == tuple(his_stations)
+    assert index.params == ("Actual farm gate pr", "Actual farm gate pr_2", "TDS")
+    assert index.notim == 5
+    assert his_reader.index is index
+    sidecar = synthetic_his_file.with_name(
+        synthetic_his_file.name + data_reader.HIS_INDEX_SUFFIX
+    )
+    assert sidecar.is_file()
+
+    # A new process only reads the sidecar index
+    data_reader._load_index.cache_clear()
+    monkeypatch.setattr(data_reader, "_parse_his_header", None)
+    persisted = his_reader.open_metadata()
+    assert persisted.stations == index.stations
+    np.testing.assert_array_equal(persisted.times, index.times)
+
+
+def test_HisFile_convert(synthetic_his_file):
+    pytest.importorskip("zarr")
+    his_reader = HisFile(synthetic_his_file, crop=None)
+    his_reader.read(prefer_converted=False)
+    expected = his_reader.ds.load()
+    assert his_reader.converted_store() is None
+
+    store = his_reader.convert(fmt="zarr", chunks=(2, 2))
+    assert store == data_reader.his_store_path(synthetic_his_file, "zarr")
+    assert his_reader.converted_store() == store
+    his_reader.read()
+    xr.testing.assert_identical(his_reader.ds, expected)
+
+    # A changed hisfile makes the store stale
+    mtime_ns = synthetic_his_file.stat().st_mtime_ns + 1_000_000_000
+    os.utime(synthetic_his_file, ns=(mtime_ns, mtime_ns))
+    assert his_reader.converted_store() is None
+
+
+def test_write_his(synthetic_his_file, tmp_path):
+    his_reader = HisFile(synthetic_his_file, crop=None)
+    his_reader.read(lazy=True)
+    out_file = tmp_path / "written.his"
+    write_his(out_file, his_reader.ds, time_chunk=2)
+    assert out_file.read_bytes() == synthetic_his_file.read_bytes()
+
+    # Stream the records in blocks with the writer
+    ds = his_reader.ds.load()
+    values = np.stack([ds[p].to_numpy() for p in ds.data_vars], axis=-1)
+    with HisWriter(
+        tmp_path / "streamed.his",
+        params=["Actual farm gate pr", "Actual farm gate pr", "TDS"],
+        stations=ds["station"].to_numpy().tolist(),
+        t0=ds.attrs["t0"],
+        scu=ds.attrs["scu"],
+        header=ds.attrs["header"],
+    ) as writer:
+        for start in range(0, ds.sizes["time"], 3):
+            block = slice(start, start + 3)
+            writer.write(ds["time"].to_numpy()[block], values[block])
+    assert (tmp_path / "streamed.his").read_bytes() == synthetic_his_file.read_bytes()
+
+
+def test_HisFile_write_read_same_path(synthetic_his_file, tmp_path):
+    his_reader = HisFile(synthetic_his_file, crop=None)
+    his_reader.read()
+    tds = his_reader.ds["TDS"].to_numpy() * 2
+    his_reader.ds["TDS"] = his_reader.ds["TDS"] * 2
+    # The read dataset memory-maps the hisfile that is overwritten
+    his_reader.write()
+    np.testing.assert_array_equal(his_reader.ds["TDS"].to_numpy(), tds)
+
+    his_reader = HisFile(synthetic_his_file, crop=None)
+    his_reader.read()
+    np.testing.assert_array_equal(his_reader.ds["TDS"].to_numpy(), tds)
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_StationIndex():
+    index = StationIndex(
+        ["Nd______42 / Cr__1 /", "Nd_____175 / Cr_12 /", "43 / Ca Mau", "TDS node"]
+    )
+    assert index.node_crop(42, "1") == 0
+    assert index.node_crop("175", 12) == 1
+    assert index.node_crop(42, 2) is None
+    assert index.node_area(43, "Ca Mau") == 2
+    assert index.position("TDS node") == 3
+    positions = index.node_crop_positions([42, 175], [1, 12])
+    np.testing.assert_array_equal(positions, [[0, -1], [-1, 1]])
+
+
+def test_HisFile_to_table_synthetic(synthetic_his_file, his_values):
+    his_reader = HisFile(synthetic_his_file, crop="rice")
+    his_reader.read()
+    df = his_reader.to_table(year=2015)
+    assert len(df) == 12
+    # Vihn Long (node 42) has two crops, the first parameter is summed
+    rice = df.set_index("region")["rice"]
+    assert rice["Vihn Long"] == his_values[1, 0, 0] + his_values[1, 1, 0]
+    assert rice["Tien Giang"] == his_values[1, 2, 0]
+    assert rice["Ca Mau"] == 0
+
+
+@pytest.fixture
+def synthetic_grid_file(tmp_path):
+    rng = np.random.default_rng(0)
+    data = rng.uniform(0, 100, (40, 50)).astype(np.float32)
+    data[rng.random(data.shape) < 0.1] = np.nan
+    data[rng.random(data.shape) < 0.05] = -999
+    file_path = tmp_path / "grid.tif"
+    with rasterio.open(
+        file_path,
+        "w",
+        driver="GTiff",
+        height=40,
+        width=50,
+        count=1,
+        dtype="float32",
+        crs="EPSG:4326",
+        transform=from_origin(100, 20, 0.1, 0.1),
+    ) as dst:
+        dst.write(data, 1)
+    return file_path
+
+
+@pytest.mark.parametrize("overlap", [False, True])
+def test_Grid_zonal_stats(synthetic_grid_file, overlap):
+    regions = gpd.GeoDataFrame(
+        geometry=[
+            box(100.32, 17.03, 101.52, 18.8),
+            box(101.52, 16.5, 102.6, 18.8),  # partly outside of the grid
+            box(102.1, 19.1, 102.4, 19.6),
+            box(110, 10, 111, 11),  # outside of the grid
+        ],
+        index=[3, 5, 8, 13],
+        crs="EPSG:4326",
+    )
+    if overlap:
+        regions.loc[8, "geometry"] = box(101, 17.5, 102.4, 19.6)
+    stats = ["count", "min", "max", "sum", "mean", "median"]
+    grid = Grid(file_path=synthetic_grid_file)
+    table = grid.zonal_stats(regions, stats=stats)
+    assert table.index.tolist() == regions.index.tolist()
+    # Overlapping regions are read block by block, the full grid is never read
+    assert grid._data is None
+
+    expected = pd.DataFrame(
+        zonal_stats(regions, grid.data, affine=grid.affine, stats=stats),
+        index=regions.index,
+        columns=stats,
+    ).astype(float)
+    assert table.loc[13, "count"] == 0
+    pd.testing.assert_frame_equal(
+        table[["count", "min", "max", "median"]],
+        expected[["count", "min", "max", "median"]],
+        check_dtype=False,
+    )
+    pd.testing.assert_frame_equal(
+        table[["sum", "mean"]], expected[["sum", "mean"]], check_dtype=False, rtol=1e-5
+    )
+
+    region_stats = grid.get_region_stats(
+        regions.copy(), cols={"grid_sum": "sum", "grid_median": "median"}
+    )
+    assert np.allclose(region_stats["grid_sum"], table["sum"], equal_nan=True)
+    assert len(grid._zones) == 1
+
+
+def test_Grid_zonal_stats_rasterstats(synthetic_grid_file):
+    regions = gpd.GeoDataFrame(
+        geometry=[box(100.32, 17.03, 101.52, 18.8), box(101.52, 16.5, 102.6, 18.8)],
+        crs="EPSG:4326",
+    )
+    # The label raster does not support the standard deviation
+    stats = ["count", "std"]
+    grid = Grid(file_path=synthetic_grid_file)
+    table = grid.zonal_stats(regions, stats=stats)
+    # Only the window of the regions is read
+    assert grid._data is None
+    expected = pd.DataFrame(
+        zonal_stats(regions, grid.data, affine=grid.affine, stats=stats),
+        index=regions.index,
+        columns=stats,
+    )
+    pd.testing.assert_frame_equal(table, expected)
+
+    outside = gpd.GeoDataFrame(geometry=[box(110, 10, 111, 11)], crs="EPSG:4326")
+    assert Grid(file_path=synthetic_grid_file).zonal_stats(outside, stats).isna().all(
+        axis=None
+    )
+
+
+def test_Grid_windowed(synthetic_grid_file):
+    grid = Grid(file_path=synthetic_grid_file)
+    aoi_grid = Grid(file_path=synthetic_grid_file, bounds=(101.03, 17.5, 102.0, 19.0))
+    assert aoi_grid.shape == (15, 10)
+    assert aoi_grid._data is None
+    assert np.array_equal(aoi_grid.data, grid.data[10:25, 10:20], equal_nan=True)
+    assert aoi_grid.affine.c == pytest.approx(101.0)
+    assert aoi_grid.affine.f == pytest.approx(19.0)
+
+    decimated_grid = Grid(file_path=synthetic_grid_file, decimation=3)
+    assert decimated_grid.shape == (13, 16)
+    assert decimated_grid.affine.a == pytest.approx(0.3)
+    # A decimated cell takes the value of the source cell at its centre
+    assert np.array_equal(
+        decimated_grid.data, grid.data[1:39:3, 1:48:3], equal_nan=True
+    )
+
+    blocks = list(Grid(file_path=synthetic_grid_file, block_pixels=120).blocks())
+    assert [block.height for block in blocks] == [2] * 20
+    with pytest.raises(ValueError, match="positive"):
+        Grid(file_path=synthetic_grid_file, decimation=0)
+
+
+@pytest.mark.parametrize("overlap", [False, True])
+def test_Grid_zonal_stats_blocks(synthetic_grid_file, overlap):
+    regions = gpd.GeoDataFrame(
+        geometry=[box(100.32, 17.03, 101.52, 18.8), box(101.52, 16.5, 102.6, 18.8)],
+        crs="EPSG:4326",
+    )
+    if overlap:
+        regions.loc[1, "geometry"] = box(101, 17.5, 102.4, 19.6)
+    stats = ["count", "min", "max", "sum", "mean", "median"]
+    expected = Grid(file_path=synthetic_grid_file).zonal_stats(regions, stats)
+    grid = Grid(file_path=synthetic_grid_file, block_pixels=100)
+    table = grid.zonal_stats(regions, stats)
+    pd.testing.assert_frame_equal(table, expected, check_dtype=False)
+    # The blocks are read from the file, the full grid is never read
+    assert grid._data is None
+    assert grid._zones == {}
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_HisFile_read_store_closes(synthetic_his_file, monkeypatch, lazy):
+    pytest.importorskip("zarr")
+    his_reader = HisFile(synthetic_his_file, crop=None)
+    his_reader.convert(fmt="zarr")
+    opened = []
+    closed = []
+    open_store = data_reader._open_store
+
+    def tracking_open_store(store):
+        opened.append(store)
+        ds = open_store(store)
+        close = ds._close
+
+        def tracking_close():
+            closed.append(store)
+            close()
+
+        ds.set_close(tracking_close)
+        return ds
+
+    monkeypatch.setattr(data_reader, "_open_store", tracking_open_store)
+    his_reader.read(lazy=lazy)
+    # An eager read closes the store, a lazy read when its dataset is closed
+    assert len(closed) == len(opened) - lazy
+    his_reader.ds.close()
+    assert len(closed) == len(opened)
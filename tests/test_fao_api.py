@@ -1,13 +1,47 @@
+import time
+
 import pytest
 
-from food_security.fao_api import get_food_production_df
+from food_security import fao_api
+from food_security.fao_api import FAOClient
+from food_security.fao_cache import FAOCache
 
 
 def test_get_food_production_df():
-    df = get_food_production_df(country_name="Viet Nam", year=2020)
+    client = FAOClient()
+    df = client.get_food_production_df(country_name="Viet Nam", year=2020)
     assert not df.empty
     assert df.Year.unique() == "2020"
     assert df.Area.unique() == "Viet Nam"
 
     with pytest.raises(ValueError, match="No FAO data found for the given parameters."):
-        get_food_production_df(country_name="Viet Nam", year=2026)
+        client.get_food_production_df(country_name="Viet Nam", year=2026)
+
+
+def test_FAOClient_prefetch(tmp_path, fao_calls, monkeypatch):
+    get_data_df = fao_api.faostat.get_data_df
+
+    def slow_get_data_df(*args, **kwargs):
+        time.sleep(0.2)
+        return get_data_df(*args, **kwargs)
+
+    monkeypatch.setattr(fao_api.faostat, "get_data_df", slow_get_data_df)
+    client = FAOClient(token="token", cache=FAOCache(tmp_path / "fao.sqlite"))
+    start = time.perf_counter()
+    client.prefetch("Viet Nam", range(2020, 2027), max_workers=14)
+    # The 14 requests run concurrently
+    assert time.perf_counter() - start < 1.4
+    assert sorted(fao_calls) == [("get_data_df", "QCL")] * 7 + [
+        ("get_data_df", "TM")
+    ] * 7 + [("get_par", "QCL"), ("get_par", "TM")]
+
+    fao_calls.clear()
+    df = client.get_food_production_df("Viet Nam", 2020)
+    df["Value"] = 0
+    assert client.get_food_production_df("Viet Nam", 2020)["Value"].sum() == 3.5
+    assert not client.get_trade_matrix_df("Viet Nam", 2021).empty
+    with pytest.raises(ValueError, match="No FAO data found"):
+        client.get_trade_matrix_df("Viet Nam", 2026)
+    assert fao_calls == []
+    with pytest.raises(ValueError, match="Unknown FAO tables"):
+        client.prefetch("Viet Nam", [2020], tables=["prices"])
@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from food_security.fao_api import FAOClient
+from food_security.fao_cache import FAOCache, request_key
+
+
+def test_request_key():
+    assert request_key({"a": 1, "b": [1, 2]}) == request_key({"b": [1, 2], "a": 1})
+    assert request_key({"a": 1}) != request_key({"a": "1"})
+
+
+def test_FAOClient_cache(tmp_path, fao_calls):
+    client = FAOClient(token="token", cache=FAOCache(tmp_path / "fao.sqlite"))
+    df = client.get_food_production_df("Viet Nam", 2020)
+    assert df["Value"].tolist() == [1.5, 2.0]
+    assert len(fao_calls) == 2
+
+    cached_df = client.get_food_production_df("Viet Nam", 2020)
+    pd.testing.assert_frame_equal(cached_df, df)
+    assert cached_df["Year"].tolist() == ["2020", "2020"]
+    assert len(fao_calls) == 2
+
+    # Empty responses are not cached
+    for _ in range(2):
+        with pytest.raises(ValueError, match="No FAO data found"):
+            client.get_food_production_df("Viet Nam", 2026)
+    assert len(fao_calls) == 4
+
+    offline_client = FAOClient(cache=FAOCache(tmp_path / "fao.sqlite", offline=True))
+    pd.testing.assert_frame_equal(
+        offline_client.get_food_production_df("Viet Nam", 2020), df
+    )
+    with pytest.raises(LookupError, match="offline"):
+        offline_client.get_trade_matrix_df("Viet Nam", 2020)
+    assert len(fao_calls) == 4
+
+
+def test_FAOCache_ttl(tmp_path, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("food_security.fao_cache.time.time", lambda: now)
+    cache = FAOCache(tmp_path / "fao.sqlite", ttl=60)
+    cache.set({"par": "area"}, {"Viet Nam": "237"})
+    assert cache.get({"par": "area"}) == {"Viet Nam": "237"}
+
+    now = 1100.0
+    assert cache.get({"par": "area"}) is None
+    # Offline caches serve expired responses
+    offline_cache = FAOCache(tmp_path / "fao.sqlite", ttl=60, offline=True)
+    assert offline_cache.get({"par": "area"}) == {"Viet Nam": "237"}
+    cache.evict()
+    assert len(cache) == 0
+
+
+def test_FAOCache_max_bytes(tmp_path, monkeypatch):
+    now = 0.0
+
+    def clock():
+        nonlocal now
+        now += 1
+        return now
+
+    monkeypatch.setattr("food_security.fao_cache.time.time", clock)
+    cache = FAOCache(tmp_path / "fao.sqlite", ttl=None, max_bytes=300)
+    for year in range(3):
+        cache.set({"year": year}, ["x" * 20] * 4)
+    cache.get({"year": 0})
+    # Exceeds the limit, the least recently used response is evicted
+    cache.set({"year": 3}, ["x" * 20] * 4)
+    assert len(cache) == 3
+    assert cache.get({"year": 1}) is None
+    assert cache.get({"year": 0}) is not None
+    assert cache.get({"year": 2}) is not None
+    cache.clear()
+    assert len(cache) == 0
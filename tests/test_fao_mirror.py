@@ -0,0 +1,87 @@
+import zipfile
+
+import pandas as pd
+import pytest
+
+from food_security.fao_api import FAOClient
+from food_security.fao_mirror import FAOMirror
+
+TM_BULK = """\
+Reporter Country Code,Reporter Countries,Partner Country Code,Partner Countries,\
+Item Code,Item,Element Code,Element,Year Code,Year,Unit,Value,Flag
+351,China,237,Viet Nam,'0027,"Rice, paddy",5910,Export quantity,2020,2020,t,5,A
+237,Viet Nam,351,China,'0027,"Rice, paddy",5910,Export quantity,2020,2020,t,10,A
+237,Viet Nam,351,China,'0027,"Rice, paddy",5610,Import quantity,2020,2020,t,2.5,A
+237,Viet Nam,40,Côte d'Ivoire,'0027,"Rice, paddy",5910,Export quantity,2020,2020,t,7,A
+237,Viet Nam,351,China,'0027,"Rice, paddy",5622,Import value,2020,2020,1000 USD,4,A
+237,Viet Nam,351,China,'0027,"Rice, paddy",5610,Import quantity,2021,2021,t,3,A
+237,Viet Nam,351,China,'0056,Maize,5610,Import quantity,2020,2020,t,,M
+"""
+
+
+@pytest.fixture
+def tm_bulk_zip(tmp_path):
+    zip_path = tmp_path / "Trade_DetailedTradeMatrix_E_All_Data.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("Trade_DetailedTradeMatrix_E_Flags.csv", "Flag\nA\n")
+        archive.writestr(
+            "Trade_DetailedTradeMatrix_E_All_Data_(Normalized).csv",
+            TM_BULK.encode("latin-1"),
+        )
+    return zip_path
+
+
+def test_FAOMirror_import_bulk(tmp_path, tm_bulk_zip):
+    mirror = FAOMirror(tmp_path / "mirror.sqlite")
+    assert mirror.datasets() == []
+    # Missing values are left out, like the API does
+    assert mirror.import_bulk("TM", tm_bulk_zip, chunksize=3) == 6
+    assert "TM" in mirror
+
+    df = mirror.query("TM", "Viet Nam", years=[2020], elements=["5910", "5610"])
+    assert len(df) == 3
+    assert df["Item Code"].unique().tolist() == ["0027"]
+    assert df["Reporter Country Code (FAO)"].unique().tolist() == ["237"]
+    assert "Côte d'Ivoire" in df["Partner Countries"].to_numpy()
+    assert df["Value"].tolist() == ["10", "2.5", "7"]
+
+    # Imports replace the earlier import of a dataset
+    assert mirror.import_bulk("TM", tm_bulk_zip) == 6
+    assert len(mirror.query("TM", "Viet Nam")) == 5
+    with pytest.raises(ValueError, match="cannot be mirrored"):
+        mirror.import_bulk("FBS", tm_bulk_zip)
+    with pytest.raises(ValueError, match="no Area column"):
+        mirror.import_bulk("QCL", tm_bulk_zip)
+
+
+def test_FAOMirror_import_download(tmp_path, data_dir):
+    mirror = FAOMirror(tmp_path / "mirror.sqlite")
+    mirror.import_bulk("QCL", data_dir / "FAOSTAT_data_en_11-18-2024.csv")
+    df = mirror.query("QCL", "Viet Nam", years=["2014"], elements=["5610"])
+    expected = pd.read_csv(
+        data_dir / "FAOSTAT_data_en_11-18-2024.csv",
+        dtype=str,
+        keep_default_na=False,
+        encoding="utf-8-sig",
+    )
+    expected = expected[
+        (expected["Year"] == "2014")
+        & (expected["Element Code"] == "5610")
+        & (expected["Value"] != "")
+    ]
+    pd.testing.assert_frame_equal(df, expected.reset_index(drop=True))
+
+
+def test_FAOClient_mirror(tmp_path, tm_bulk_zip, monkeypatch):
+    mirror = FAOMirror(tmp_path / "mirror.sqlite")
+    mirror.import_bulk("TM", tm_bulk_zip)
+
+    def get_par(*args):
+        raise AssertionError
+
+    monkeypatch.setattr("food_security.fao_api.faostat.get_par", get_par)
+    client = FAOClient(token="token", mirror=mirror)
+    df = client.get_trade_matrix_df("Viet Nam", 2020)
+    assert df["Value"].tolist() == [10.0, 2.5, 7.0]
+    with pytest.raises(ValueError, match="No FAO data found"):
+        client.get_trade_matrix_df("Viet Nam", 2026)
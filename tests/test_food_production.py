@@ -1,6 +1,9 @@
 import logging
 
 import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import Point
 
 from food_security.components.food_production import FoodProduction
 
@@ -14,5 +17,78 @@ def test_FoodProduction(regions: gpd.GeoDataFrame, config_dict ,caplog):
     assert "Adding modelled rice production to regions" in caplog.text
 
     fp.add_other_crops()
-    assert len(fp.region.columns) == 74
+    assert len(fp.items.expand(fp.region).columns) == 74
     assert "No other crop file found. Pulling other crop data from FAO" in caplog.text
+
+
+def test_FoodProduction_add_modelled_crops(tmp_path):
+    crop_file = tmp_path / "crops.csv"
+    pd.DataFrame(
+        {
+            "year": [2016, 2016, 2016, 2016, 2017, 2016],
+            "region": ["An Giang"] * 2 + ["Ca Mau", "An Giang"] + ["Ca Mau"] * 2,
+            "crop_name": ["rice", "rice", "rice", "maize", "maize", "cassava"],
+            "crop_name_fao": ["RICE", "RICE", "RICE", "MAIZE", "MAIZE", "CASSAVA"],
+            "corrected_yield": [1.0, 2.0, 4.0, 8.0, 16.0, np.nan],
+        }
+    ).to_csv(crop_file, index=False)
+    cfg = {
+        "food_production": {
+            "modelled_crops": {
+                "path": str(crop_file),
+                "region_column": "region",
+                "crops": ["rice", "maize", "cassava"],
+                "maize": {"crop_name_fao": "MAIZE"},
+            }
+        }
+    }
+    regions = gpd.GeoDataFrame(
+        {"Name": ["Ca Mau", "Bac Lieu", "An Giang"]},
+        geometry=[Point(0, 0), Point(1, 1), Point(2, 2)],
+        index=[3, 1, 2],
+    )
+    fp = FoodProduction(year=2016, cfg=cfg, region=regions, fao_client=None)
+    fp.add_modelled_crops()
+    assert fp.region.index.tolist() == [3, 1, 2]
+    assert fp.region["rice"].tolist()[::2] == [4.0, 3.0]
+    assert fp.region["maize"].isna().tolist() == [True, True, False]
+    assert fp.region["maize"].tolist()[2] == 8.0
+    assert fp.region["cassava"].tolist()[0] == 0.0
+    assert len(fp.inputs) == 1
+
+    # The next year is selected from the same table
+    fp.year = 2017
+    fp.region = regions
+    cfg["food_production"]["modelled_crops"]["crops"] = ["maize"]
+    fp.add_modelled_crops()
+    assert "rice" not in fp.region.columns
+    assert fp.region["maize"].tolist()[0] == 16.0
+    assert len(fp.inputs) == 1
+
+
+def test_FoodProduction_add_other_crops_fao(monkeypatch):
+    cfg = {
+        "main": {"country_area": 100},
+        "food_production": {"other_crops": {"path": ""}},
+    }
+    regions = gpd.GeoDataFrame(
+        {"Name": ["An Giang", "Ca Mau"], "area": [10e6, 30e6]},
+        geometry=[Point(0, 0), Point(1, 1)],
+    )
+    other_crops = pd.DataFrame(
+        {
+            "ITEM Nutrition": ["MAIZE", "Sugar (raw)", "MAIZE"],
+            "Item Code": ["56", "162", "56"],
+            "Value": [100, 200, 300],
+        }
+    )
+    monkeypatch.setattr(
+        FoodProduction, "fetch_foastat_production_data", lambda self: other_crops
+    )
+    fp = FoodProduction(year=2016, cfg=cfg, region=regions, fao_client=None)
+    fp.add_other_crops()
+    # Only item columns go to the block, like for other crop files
+    assert fp.items.columns == ["MAIZE_56"]
+    assert fp.items.to_frame()["MAIZE_56"].tolist() == [30.0, 90.0]
+    assert fp.region["Sugar (raw)_162"].tolist() == [20.0, 60.0]
+    assert isinstance(fp.region, gpd.GeoDataFrame)
@@ -1,4 +1,8 @@
+import numpy as np
+import pandas as pd
+
 from food_security.components.food_supply import FoodSupply
+from food_security.items import ItemBlock
 
 
 def test_FoodSupply(food_production_data):
@@ -12,4 +16,26 @@ def test_FoodSupply(food_production_data):
     fs.add_food_supply()
     for food_col in food_cols:
         if any(food_col.endswith(c) for c in changed_food_cols):
-            assert not fs.region[food_col].equals(region[food_col])
+            assert not fs.items.expand(fs.region)[food_col].equals(region[food_col])
+
+
+def test_FoodSupply_calculate_trade_fluxes():
+    region = pd.DataFrame(
+        {
+            "Name": ["An Giang", "Ca Mau"],
+            "land_ratio": [0.25, 0.5],
+            "MAIZE_56": [100.0, np.nan],
+            "RICE, PADDY_27": [10.0, 20.0],
+            "BEANS_176": [1.0, 2.0],
+        }
+    )
+    items, region = ItemBlock.from_region(region)
+    trade_flux = pd.DataFrame(
+        {"Item Code": ["56", "27", "999", "56"], "trade_flux": [8.0, -4.0, 1.0, 2.0]}
+    )
+    FoodSupply._calculate_trade_fluxes(items, region, trade_flux)
+    supply = items.to_frame()
+    assert supply["MAIZE_56"].tolist()[0] == 102.0
+    assert np.isnan(supply["MAIZE_56"].tolist()[1])
+    assert supply["RICE, PADDY_27"].tolist() == [9.0, 18.0]
+    assert supply["BEANS_176"].tolist() == [1.0, 2.0]
@@ -1,12 +1,59 @@
+import geopandas as gpd
 import numpy as np
+from shapely.geometry import LineString, box
 
-from food_security.components.food_transfer_coefficient import FoodTransferCoefficient
+from food_security.components.food_transfer_coefficient import (
+    FoodTransferCoefficient,
+    _road_lengths,
+)
 
 
-def test_calculate_road_density(regions):
+def test_calculate_road_density(regions, tmp_path):
     # Only select one geometry to reduce processing time for testing
     region = regions.iloc[[0]]
-    ftc = FoodTransferCoefficient(cfg={}, region=region)
+    cfg = {
+        "food_transfer_coefficient": {
+            "roads": {"cache": True, "cache_path": str(tmp_path / "roads")}
+        }
+    }
+    ftc = FoodTransferCoefficient(cfg=cfg, region=region)
     ftc.calculate_road_density()
     assert "road_density" in ftc.region.columns
     assert np.isclose(ftc.region.iloc[0]["road_density"], 1.834, rtol=0.001)
+
+
+def test_road_lengths():
+    regions = gpd.GeoSeries(
+        [box(0, 0, 10, 10), box(10, 0, 20, 10), box(50, 50, 60, 60)]
+    )
+    roads = gpd.GeoSeries(
+        [
+            LineString([(-5, 5), (25, 5)]),
+            LineString([(5, 0), (5, 10)]),
+            LineString([(100, 100), (110, 100)]),
+        ]
+    )
+    assert _road_lengths(roads, regions).tolist() == [20.0, 10.0, 0.0]
+
+
+def test_calculate_road_density_offline(regions, monkeypatch):
+    region = regions.iloc[[0, 1]]
+    utm = region.estimate_utm_crs()
+    # A road crossing the first region from west to east
+    minx, miny, maxx, maxy = region.to_crs(utm).total_bounds
+    first = region.to_crs(utm).geometry.iloc[0]
+    y = first.representative_point().y
+    road = LineString([(minx - 1000, y), (maxx + 1000, y)])
+    roads = gpd.GeoDataFrame(geometry=[road], crs=utm).to_crs(region.crs)
+    monkeypatch.setattr(FoodTransferCoefficient, "get_roads", lambda self: roads)
+    ftc = FoodTransferCoefficient(cfg={}, region=region)
+    ftc.calculate_road_density()
+    expected = [
+        first.intersection(road).length,
+        region.to_crs(utm).geometry.iloc[1].intersection(road).length,
+    ]
+    assert np.allclose(ftc.region["road_length"], expected, rtol=1e-4)
+    assert np.allclose(
+        ftc.region["road_density"],
+        ftc.region["road_length"] / 1000 / (region["area"] / 1e6),
+    )
@@ -1,7 +1,9 @@
 import geopandas as gpd
 import numpy as np
+import pandas as pd
 
 from food_security.components import FoodValue
+from food_security.items import ItemBlock
 
 
 def test_food_value(config_dict, test_data_dir):
@@ -20,3 +22,26 @@ def test_food_value(config_dict, test_data_dir):
     assert "cal_per_capita_per_day" in fv.region.columns
     assert not fv.region["total_cals"].isna().all()
     assert not fv.region["cal_per_capita_per_day"].isna().all()
+
+
+def test_FoodValue_calc_caloric_value():
+    region = pd.DataFrame(
+        {
+            "Name": ["An Giang", "Ca Mau"],
+            "rice": [1.0, 2.0],
+            "WHEAT_15": [1.0, np.nan],
+            "MAIZE_56": [0.5, 2.0],
+            "BEANS_176": [1.0, 2.0],
+        }
+    )
+    items, region = ItemBlock.from_region(region)
+    calories_table = pd.DataFrame(
+        {"Item Code": ["15", "56", "56"], "CALORIES kcal": [334, 362, 100]}
+    )
+    FoodValue.calc_caloric_value(items, calories_table)
+    calories = items.expand(region)
+    assert calories["WHEAT_15"].tolist()[0] == 3340000.0
+    assert np.isnan(calories["WHEAT_15"].tolist()[1])
+    assert calories["MAIZE_56"].tolist() == [1810000.0, 7240000.0]
+    assert calories["BEANS_176"].tolist() == [1.0, 2.0]
+    assert calories["rice"].tolist() == [1.0, 2.0]
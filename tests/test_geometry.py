@@ -0,0 +1,32 @@
+import geopandas as gpd
+import numpy as np
+
+from food_security.geometry import RegionGeometry
+
+
+def test_RegionGeometry(regions, monkeypatch):
+    geometry = RegionGeometry(regions)
+    subset = regions.iloc[[3, 1]]
+    expected = subset.to_crs(regions.estimate_utm_crs()).area
+    projections = []
+    to_crs = gpd.GeoSeries.to_crs
+
+    def counting_to_crs(self, *args, **kwargs):
+        projections.append(len(self))
+        return to_crs(self, *args, **kwargs)
+
+    monkeypatch.setattr(gpd.GeoSeries, "to_crs", counting_to_crs)
+    assert geometry.utm_crs == regions.estimate_utm_crs()
+    assert np.array_equal(geometry.bounds, regions.total_bounds)
+
+    # Areas of regions of the AOI are looked up, the AOI is projected once
+    area = geometry.areas(subset)
+    assert area.index.tolist() == [3, 1]
+    assert np.allclose(area, expected)
+    geometry.areas(regions)
+    assert projections == [len(regions)]
+
+    # Other regions are projected on their own
+    other = subset.assign(Name=["a", "b"])
+    assert np.allclose(geometry.areas(other), area)
+    assert projections == [len(regions), 2]
@@ -0,0 +1,57 @@
+import os
+
+import pandas as pd
+import pytest
+
+from food_security.inputs import InputRegistry
+
+
+def test_InputRegistry_read_table(tmp_path, monkeypatch):
+    csv_file = tmp_path / "population.csv"
+    pd.DataFrame({"Name": ["An Giang", "Ca Mau"], "population": [1, 2]}).to_csv(
+        csv_file, index=False
+    )
+    reads = []
+    read_csv = pd.read_csv
+
+    def counting_read_csv(*args, **kwargs):
+        reads.append(args[0])
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_csv", counting_read_csv)
+    inputs = InputRegistry()
+    table = inputs.read_table(csv_file)
+    table["population"] = 0
+    # Tables are read once and callers get their own copy
+    assert inputs.read_table(csv_file)["population"].tolist() == [1, 2]
+    assert len(reads) == 1
+
+    pd.DataFrame({"Name": ["An Giang"], "population": [3]}).to_csv(
+        csv_file, index=False
+    )
+    os.utime(csv_file, ns=(0, 0))
+    assert inputs.read_table(csv_file)["population"].tolist() == [3]
+    assert len(reads) == 2
+    assert len(inputs) == 1
+    inputs.read_table(csv_file, usecols=["Name"])
+    assert len(inputs) == 2
+    inputs.clear()
+    assert len(inputs) == 0
+
+    with pytest.raises(ValueError, match="CSV or Excel"):
+        inputs.read_table(tmp_path / "population.parquet")
+
+
+def test_InputRegistry_read_rows(tmp_path):
+    csv_file = tmp_path / "crops.csv"
+    pd.DataFrame({"year": [2016, 2017, 2016], "yield": [1.0, 2.0, 3.0]}).to_csv(
+        csv_file, index=False
+    )
+    inputs = InputRegistry()
+    rows = inputs.read_rows(csv_file, "year", 2016)
+    assert rows["yield"].tolist() == [1.0, 3.0]
+    rows["yield"] = 0
+    assert inputs.read_rows(csv_file, "year", 2016)["yield"].tolist() == [1.0, 3.0]
+    assert inputs.read_rows(csv_file, "year", 2017)["yield"].tolist() == [2.0]
+    assert inputs.read_rows(csv_file, "year", 2018).empty
+    assert len(inputs) == 1
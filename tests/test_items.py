@@ -0,0 +1,64 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import Point
+
+from food_security.items import ItemBlock
+
+
+@pytest.fixture
+def region():
+    return gpd.GeoDataFrame(
+        {
+            "Name": ["An Giang", "Bac Lieu", "Ca Mau"],
+            "land_ratio": [0.25, 0.5, 0.25],
+            "WHEAT_15": [1.0, 2.0, np.nan],
+            "rice": [3.0, 4.0, 5.0],
+            "MAIZE_56": [0.5, 2.0, 1.0],
+        },
+        geometry=[Point(0, 0), Point(1, 1), Point(2, 2)],
+    )
+
+
+def test_ItemBlock_from_region(region):
+    items, other = ItemBlock.from_region(region)
+    assert items.columns == ["WHEAT_15", "MAIZE_56"]
+    assert items.codes == ["15", "56"]
+    assert other.columns.tolist() == ["Name", "land_ratio", "rice", "geometry"]
+    assert np.array_equal(items.total(), [1.5, 4.0, 1.0])
+
+    expanded = items.expand(other)
+    assert isinstance(expanded, gpd.GeoDataFrame)
+    pd.testing.assert_frame_equal(expanded[region.columns], region)
+
+
+def test_ItemBlock_set_items(region):
+    items, region = ItemBlock.from_region(region)
+    items.set_items(
+        ["BEANS", "WHEAT", "BEANS"],
+        ["176", "15", "176"],
+        np.array([[1.0, 10.0, 2.0], [1.0, 20.0, 3.0], [1.0, 30.0, 4.0]]),
+    )
+    assert items.columns == ["WHEAT_15", "MAIZE_56", "BEANS_176"]
+    assert items.to_frame()["BEANS_176"].tolist() == [2.0, 3.0, 4.0]
+    assert items.to_frame()["WHEAT_15"].tolist() == [10.0, 20.0, 30.0]
+
+    items.add_outer(
+        region["land_ratio"].to_numpy(), pd.Series([4.0, 1.0], index=["56", "999"])
+    )
+    items.scale(pd.Series([2.0, 3.0], index=["176", "176"]))
+    frame = items.to_frame()
+    assert frame["MAIZE_56"].tolist() == [1.5, 4.0, 2.0]
+    assert frame["BEANS_176"].tolist() == [4.0, 6.0, 8.0]
+
+
+def test_ItemBlock_align(region):
+    items, region = ItemBlock.from_region(region)
+    items.align(["Ca Mau", "An Giang", "Dong Thap"])
+    frame = items.to_frame()
+    assert frame.index.tolist() == ["Ca Mau", "An Giang", "Dong Thap"]
+    assert frame["MAIZE_56"].tolist()[:2] == [1.0, 0.5]
+    assert frame.loc["Dong Thap"].isna().all()
+    with pytest.raises(ValueError, match="does not match"):
+        ItemBlock(["An Giang"], ["WHEAT"], ["15"], np.ones((2, 1)))
@@ -1,6 +1,7 @@
 from pathlib import Path
 
 import geopandas as gpd
+import pandas as pd
 
 from food_security.main import FoodSecurity
 
@@ -13,3 +14,54 @@ def test_food_security(config_toml_file, tmp_path):
     gdf = gpd.read_file(tmp_path)
     assert len(gdf.columns) == 78
 
+
+class _PrefetchClient:
+    def __init__(self):
+        self.prefetched = []
+
+    def prefetch(self, country_name, years, tables):
+        self.prefetched.append((country_name, list(years), tables))
+
+
+class _YearComponent:
+    def __init__(
+        self, year, cfg, region, fao_client, inputs=None, items=None, geometry=None
+    ):
+        self.year = year
+        self.region = region
+        self.inputs = inputs
+
+    def run(self):
+        self.region["value"] = self.region.get("value", 0) + self.year
+        # Number of input tables that were read before the component ran
+        self.region["tables"] = len(self.inputs)
+        return self.region
+
+
+def test_food_security_max_workers(config_toml_file, tmp_path, monkeypatch):
+    for component in ("FoodProduction", "FoodSupply", "FoodValue"):
+        monkeypatch.setattr(f"food_security.main.{component}", _YearComponent)
+    root = Path(__file__).parent.parent
+    results = []
+    for max_workers in (1, 2):
+        fao_client = _PrefetchClient()
+        output_path = tmp_path / f"results_{max_workers}.gpkg"
+        fs = FoodSecurity(
+            cfg_path=config_toml_file,
+            fao_client=fao_client,
+            output_path=output_path,
+            root=root,
+            max_workers=max_workers,
+        )
+        fs.run()
+        assert fao_client.prefetched == [
+            ("Viet Nam", [2015, 2016], ["trade_matrix", "production"])
+        ]
+        results.append(gpd.read_file(output_path))
+    assert results[1]["year"].tolist() == [2015] * 13 + [2016] * 13
+    assert (results[1]["value"] == 3 * results[1]["year"]).all()
+    # The workers get the modelled crops and population tables read by the parent
+    assert (results[1]["tables"] == 2).all()
+    pd.testing.assert_frame_equal(
+        results[0].drop(columns="tables"), results[1].drop(columns="tables")
+    )
@@ -0,0 +1,127 @@
+import geopandas as gpd
+import pytest
+from shapely.geometry import LineString, Point
+
+from food_security.roads import (
+    CachedRoads,
+    OSMnxRoads,
+    ParquetRoads,
+    PBFRoads,
+    RoadSource,
+    road_source,
+)
+
+OSM_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6" generator="test">
+  <node id="1" lat="10.0" lon="105.0" version="1"/>
+  <node id="2" lat="10.0" lon="105.1" version="1"/>
+  <node id="3" lat="11.0" lon="107.0" version="1"/>
+  <node id="4" lat="11.0" lon="107.1" version="1"/>
+  <way id="10" version="1">
+    <nd ref="1"/><nd ref="2"/><tag k="highway" v="primary"/>
+  </way>
+  <way id="11" version="1">
+    <nd ref="1"/><nd ref="2"/><tag k="waterway" v="canal"/>
+  </way>
+  <way id="12" version="1">
+    <nd ref="3"/><nd ref="4"/><tag k="highway" v="residential"/>
+  </way>
+</osm>
+"""
+
+
+class _CountingRoads(RoadSource):
+    def __init__(self):
+        self.reads = 0
+
+    @property
+    def key(self):
+        return "counting"
+
+    def _read(self, bounds):
+        self.reads += 1
+        return gpd.GeoDataFrame(
+            {"highway": ["primary", None], "name": ["a", "b"]},
+            geometry=[LineString([(0, 0), (1, 1)]), Point(0, 0)],
+            crs="EPSG:4326",
+        )
+
+
+def test_PBFRoads(tmp_path):
+    # The GDAL OSM driver reads OSM XML the same way as PBF extracts
+    osm_file = tmp_path / "roads.osm"
+    osm_file.write_text(OSM_XML)
+    roads = PBFRoads(osm_file).read((104.9, 9.9, 105.2, 10.1))
+    assert roads["highway"].tolist() == ["primary"]
+    assert roads.columns.tolist() == ["highway", "geometry"]
+    assert roads.geometry.iloc[0].length == pytest.approx(0.1)
+
+
+def test_ParquetRoads(tmp_path):
+    pytest.importorskip("pyarrow")
+    parquet_file = tmp_path / "roads.parquet"
+    gpd.GeoDataFrame(
+        {"highway": ["primary", None, "residential"]},
+        geometry=[
+            LineString([(105, 10), (105.1, 10)]),
+            LineString([(105, 10), (105.1, 10.1)]),
+            LineString([(107, 11), (107.1, 11)]),
+        ],
+        crs="EPSG:4326",
+    ).to_parquet(parquet_file)
+    roads = ParquetRoads(parquet_file).read((104.9, 9.9, 105.2, 10.2))
+    assert roads["highway"].tolist() == ["primary"]
+
+
+def test_CachedRoads(tmp_path):
+    source = _CountingRoads()
+    cached = CachedRoads(source, tmp_path / "roads")
+    roads = cached.read((0, 0, 1, 1))
+    assert roads.columns.tolist() == ["highway", "geometry"]
+    assert len(roads) == 1
+    cached_roads = cached.read((0, 0, 1, 1))
+    assert source.reads == 1
+    assert cached_roads["highway"].tolist() == ["primary"]
+    assert cached_roads.geometry.iloc[0].equals(roads.geometry.iloc[0])
+    # Other bounds are read from the source again
+    cached.read((0, 0, 2, 2))
+    assert source.reads == 2
+    assert len(list((tmp_path / "roads").glob("*.gpkg"))) == 2
+
+
+def test_RoadSource_abstract():
+    class _NoRead(RoadSource):
+        @property
+        def key(self):
+            return "no read"
+
+    with pytest.raises(TypeError, match="abstract"):
+        _NoRead()
+
+
+def test_road_source(tmp_path):
+    osm_file = tmp_path / "roads.osm.pbf"
+    osm_file.touch()
+    cfg = {"food_transfer_coefficient": {"roads": {"path": str(osm_file)}}}
+    # Roads are only cached when the config asks for it
+    assert isinstance(road_source(cfg), PBFRoads)
+    assert isinstance(road_source({}), OSMnxRoads)
+
+    cfg["food_transfer_coefficient"]["roads"].update(
+        cache=True, cache_path=str(tmp_path)
+    )
+    source = road_source(cfg)
+    assert isinstance(source, CachedRoads)
+    assert isinstance(source.source, PBFRoads)
+    assert source.path == tmp_path
+
+    csv_file = tmp_path / "roads.csv"
+    csv_file.touch()
+    cfg["food_transfer_coefficient"]["roads"]["path"] = str(csv_file)
+    with pytest.raises(ValueError, match="OSM PBF or GeoParquet"):
+        road_source(cfg)
+
+    # A configured road file that is missing is not replaced by a download
+    cfg["food_transfer_coefficient"]["roads"]["path"] = str(tmp_path / "missing.pbf")
+    with pytest.raises(FileNotFoundError, match="missing.pbf"):
+        road_source(cfg)
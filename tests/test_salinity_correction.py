@@ -0,0 +1,332 @@
+import shutil
+from datetime import datetime
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+from shapely.geometry import box
+
+from food_security import salinity_correction
+from food_security.data_reader import HisFile, HisWriter
+
+
+def _write_his(path, params, stations, times, seed):
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0, 3000, (len(times), len(stations), len(params)))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    with HisWriter(
+        path, params, stations, t0=datetime(2014, 1, 1), scu=86400
+    ) as writer:
+        writer.write(times, values.astype(np.float32))
+    return path
+
+
+@pytest.fixture
+def salinity_inputs(tmp_path, monkeypatch, data_dir):
+    """Patch load_input_data with synthetic RIBASIM results and mapping tables."""
+    years = pd.date_range("2014-01-01", periods=5, freq="YS")
+    months = pd.date_range("2014-01-01", "2019-12-01", freq="MS")
+    production_file = _write_his(
+        tmp_path / "production.his",
+        ["Actual farm gate pr"],
+        ["Nd______42 / Cr__1 /", "Nd______42 / Cr__2 /", "Nd_____175 / Cr__1 /"],
+        years,
+        seed=1,
+    )
+    hectare_file = _write_his(
+        tmp_path / "hectares.his",
+        ["P Cr1/Rice", "P Cr2/Maize"],
+        ["42 / An", "175 / Bac_AdvIrr175"],
+        months,
+        seed=2,
+    )
+    _write_his(tmp_path / "salinity.his", ["TDS"], ["An", "Ca"], months, seed=3)
+
+    def load_input_data(**kwargs):
+        production = HisFile(production_file, crop=None)
+        production.read(params=["Actual farm gate pr"])
+        hectares = HisFile(hectare_file, crop=None)
+        hectares.read(hia=True, lazy=True)
+        return (
+            production.ds,
+            hectares.ds,
+            None,
+            pd.read_csv(data_dir / "fao-salt-tolerance-parameters.csv"),
+            pd.DataFrame(
+                {"crop_name": ["Rice", "Maize"], "crop_name_fao": ["Rice", "Maize"]}
+            ),
+            pd.DataFrame(
+                {
+                    "FAOSTAT FLC": ["Rice", "Maize"],
+                    "FAOSTAT SALT": ["Rice, paddy", "Corn"],
+                }
+            ),
+            pd.DataFrame(
+                {"fao_flc": ["Rice", "Maize"], "fao_producer": ["Rice", "Maize"]}
+            ),
+            pd.DataFrame(
+                {
+                    "area_name": ["An", "Bac", "Ca"],
+                    "area_id": [42, 175, 7],
+                    "area_map_name": ["A", "B", "C"],
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "crop_name": ["Rice", "Maize"],
+                    "crop_id": ["Cr1", "Cr2"],
+                    "start_ts": ["11-01", "05-01"],
+                    "end_ts": ["03-01", "08-31"],
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "Item": ["Rice", "Rice", "Maize"],
+                    "Year": ["2020", "2021", "2015"],
+                    "Value": ["300", "310", "200"],
+                }
+            ),
+        )
+
+    monkeypatch.setattr(salinity_correction, "load_input_data", load_input_data)
+    return {
+        "land_name": "Viet Nam",
+        "fao_client": None,
+        "ribasim_path": tmp_path,
+        "input_path": tmp_path,
+        "his_file": "production.his",
+        "hectare_his_file": "hectares.his",
+        "salinity_dir": tmp_path,
+        "salinity_filename": "salinity.his",
+        "salinity_param_file": None,
+        "mask_dir": tmp_path,
+        "mask_filename": None,
+        "mapping_file": None,
+        "fao_mapping_file": None,
+    }
+
+
+@pytest.fixture
+def xyz_salinity_inputs(salinity_inputs, salinity_maps, monkeypatch):
+    """Correct the synthetic RIBASIM results with the .xyz salinity maps."""
+    salinity_dir = salinity_maps["salinity_dir"]
+    for year in (2014, 2017, 2018):
+        shutil.copy(
+            salinity_dir / "salinity_2015.xyz", salinity_dir / f"salinity_{year}.xyz"
+        )
+        shutil.copy(
+            salinity_dir / "landuse_2016.tif", salinity_dir / f"landuse_{year}.tif"
+        )
+    load_input_data = salinity_correction.load_input_data
+
+    def load_xyz_input_data(**kwargs):
+        inputs = list(load_input_data(**kwargs))
+        inputs[2] = salinity_maps["communes_gdf"]
+        inputs[7] = inputs[7].assign(area_map_name=["West", "East", 1])
+        return tuple(inputs)
+
+    monkeypatch.setattr(salinity_correction, "load_input_data", load_xyz_input_data)
+    return {
+        **salinity_inputs,
+        **{key: value for key, value in salinity_maps.items() if key != "communes_gdf"},
+    }
+
+
+@pytest.mark.parametrize("crops_to_correct", [["Rice"], ["Rice", "Maize"], []])
+def test_correct_crop_yield_engines(salinity_inputs, crops_to_correct):
+    loop_df = salinity_correction.correct_crop_yield(
+        **salinity_inputs, crops_to_correct=crops_to_correct, engine="loop"
+    )
+    vectorized_df = salinity_correction.correct_crop_yield(
+        **salinity_inputs, crops_to_correct=crops_to_correct, engine="vectorized"
+    )
+    assert len(vectorized_df) > 0
+    # Bac is not a station of the salinity hisfile, its corrected rows are skipped
+    corrected = vectorized_df["crop_name"].isin(crops_to_correct)
+    assert "Bac" not in vectorized_df.loc[corrected, "area_map_name"].to_numpy()
+    pd.testing.assert_frame_equal(vectorized_df, loop_df, check_dtype=True)
+    # Both engines write the same CSV
+    assert vectorized_df.to_csv() == loop_df.to_csv()
+
+
+@pytest.mark.parametrize("crops_to_correct", [["Rice"], ["Rice", "Maize"], []])
+def test_correct_crop_yield_engines_xyz(xyz_salinity_inputs, crops_to_correct):
+    loop_df = salinity_correction.correct_crop_yield(
+        **xyz_salinity_inputs, crops_to_correct=crops_to_correct, engine="loop"
+    )
+    vectorized_df = salinity_correction.correct_crop_yield(
+        **xyz_salinity_inputs, crops_to_correct=crops_to_correct, engine="vectorized"
+    )
+    corrected = vectorized_df["crop_name"].isin(crops_to_correct)
+    # Every area has a commune, none of the corrected rows are skipped
+    assert set(vectorized_df.loc[corrected, "area_map_name"]) == (
+        {"An", "Bac"} if crops_to_correct else set()
+    )
+    pd.testing.assert_frame_equal(vectorized_df, loop_df, check_dtype=True)
+    assert vectorized_df.to_csv() == loop_df.to_csv()
+
+
+def test_correct_crop_yield_unknown_engine(salinity_inputs):
+    with pytest.raises(ValueError, match="Unknown engine"):
+        salinity_correction.correct_crop_yield(
+            **salinity_inputs, crops_to_correct=[], engine="parallel"
+        )
+
+
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+def test_correct_crop_yield_workers(salinity_inputs, engine):
+    serial_df = salinity_correction.correct_crop_yield(
+        **salinity_inputs, crops_to_correct=["Rice"], engine=engine
+    )
+    parallel_df = salinity_correction.correct_crop_yield(
+        **salinity_inputs, crops_to_correct=["Rice"], engine=engine, workers=2
+    )
+    pd.testing.assert_frame_equal(parallel_df, serial_df)
+
+
+def test_grid_xyz(tmp_path):
+    xyz_file = tmp_path / "salinity_2015.xyz"
+    x, y = np.meshgrid([0.0, 1.0, 2.0, 3.0], [0.0, 0.9, 1.8, 2.7])
+    points = np.column_stack([x.ravel(), y.ravel(), np.arange(x.size, dtype=float)])
+    # Drop a point and add a later duplicate, which overwrites the first value
+    points = np.vstack([points[1:], [3.0, 2.7, 99.0]])
+    np.savetxt(xyz_file, points)
+
+    raster, transform = salinity_correction.grid_xyz(xyz_file, chunksize=5)
+    assert raster.shape == (4, 5)
+    assert transform.c == 0.0
+    assert transform.f == 2.7
+    # Rows are counted from the top, the fourth x value lands in the last column
+    assert np.isnan(raster[3, 0])
+    assert raster[3, 1] == 1.0
+    assert raster[0, 4] == 99.0
+    assert np.isnan(raster[:, 3]).all()
+    assert np.array_equal(
+        salinity_correction.read_xyz(xyz_file), np.loadtxt(xyz_file)
+    )
+
+
+@pytest.fixture
+def salinity_maps(tmp_path):
+    """Write .xyz salinity maps and land use masks on a 4 x 4 grid for two years."""
+    x, y = np.meshgrid(500000 + np.arange(4) * 1000.0, 1100000 + np.arange(4) * 900.0)
+    transform = from_origin(500000, 1102700, 750, 675)
+    for year in (2015, 2016):
+        values = np.arange(x.size, dtype=float) + year - 2015
+        np.savetxt(
+            tmp_path / f"salinity_{year}.xyz",
+            np.column_stack([x.ravel(), y.ravel(), values]),
+        )
+        with rasterio.open(
+            tmp_path / f"landuse_{year}.tif",
+            "w",
+            driver="GTiff",
+            height=4,
+            width=4,
+            count=1,
+            dtype="uint8",
+            crs="EPSG:32648",
+            transform=transform,
+        ) as dst:
+            dst.write(np.tril(np.ones((4, 4), dtype="uint8")), 1)
+    communes_gdf = gpd.GeoDataFrame(
+        {"OBJECTID": [1, 2], "Name": ["West", "East"]},
+        geometry=[
+            box(500000, 1100000, 501500, 1102700),
+            box(501500, 1100000, 503000, 1102700),
+        ],
+    )
+    return {
+        "salinity_dir": tmp_path,
+        "salinity_filename": "salinity_{YEAR}.xyz",
+        "mask_dir": tmp_path,
+        "mask_filename": "landuse_{YEAR}.tif",
+        "communes_gdf": communes_gdf,
+        "salinity_crs": "EPSG:32648",
+        "area_crs": "EPSG:32648",
+    }
+
+
+def test_SalinityRasterCache(salinity_maps, tmp_path, monkeypatch):
+    created = []
+    create = salinity_correction.create_masked_salinity_raster
+
+    def counting_create(*args):
+        created.append(args[0])
+        return create(*args)
+
+    monkeypatch.setattr(
+        salinity_correction, "create_masked_salinity_raster", counting_create
+    )
+    cache = salinity_correction.SalinityRasterCache(
+        maxsize=1, cache_dir=tmp_path / "cache"
+    )
+    for year in (2015, 2016):
+        for area in ("West", "East"):
+            expected, _ = salinity_correction.compute_salinity(
+                area, year, **salinity_maps
+            )
+            salinity, _ = salinity_correction.compute_salinity(
+                area, year, **salinity_maps, raster_cache=cache
+            )
+            assert salinity == expected
+    # Two uncached calls per year and a single cached one
+    assert len(created) == 6
+    assert len(cache) == 1
+
+    # A new cache reads the masked rasters stored by the first one
+    created.clear()
+    cache = salinity_correction.SalinityRasterCache(cache_dir=tmp_path / "cache")
+    salinity, _ = salinity_correction.compute_salinity(
+        "East", 2016, **salinity_maps, raster_cache=cache
+    )
+    assert salinity == expected
+    assert created == []
+
+    # Maps with the same names in another directory are not read from the cache
+    other_dir = tmp_path / "other"
+    other_dir.mkdir()
+    xyz = np.loadtxt(tmp_path / "salinity_2016.xyz")
+    xyz[:, 2] += 10
+    np.savetxt(other_dir / "salinity_2016.xyz", xyz)
+    shutil.copy(tmp_path / "landuse_2016.tif", other_dir / "landuse_2016.tif")
+    other_maps = {**salinity_maps, "salinity_dir": other_dir, "mask_dir": other_dir}
+    other, _ = salinity_correction.compute_salinity(
+        "East", 2016, **other_maps, raster_cache=cache
+    )
+    assert other != expected
+    assert len(created) == 1
+    assert len(list((tmp_path / "cache").glob("*.tif"))) == 3
+    cache.clear()
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize("overlap", [False, True])
+def test_CommuneSalinity(salinity_maps, overlap):
+    if overlap:
+        salinity_maps["communes_gdf"].loc[1, "geometry"] = box(
+            501000, 1100000, 503000, 1102700
+        )
+    commune_salinity = salinity_correction.CommuneSalinity(
+        salinity_maps["communes_gdf"],
+        salinity_maps["salinity_dir"],
+        salinity_maps["salinity_filename"],
+        salinity_maps["mask_dir"],
+        salinity_maps["mask_filename"],
+        salinity_maps["salinity_crs"],
+        area_crs=salinity_maps["area_crs"],
+    )
+    for year in (2015, 2016):
+        for commune in ("West", "East", 1, 2):
+            expected, _ = salinity_correction.compute_salinity(
+                commune, year, **salinity_maps
+            )
+            assert commune_salinity.salinity(commune, year) == expected
+        table = commune_salinity.table(year)
+        assert table["OBJECTID"].tolist() == [1, 2]
+        assert table.attrs["overlap"] == overlap
+    with pytest.raises(ValueError, match="not found"):
+        commune_salinity.salinity("North", 2015)
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from rasterio.transform import from_origin
+from shapely.geometry import box
+
+from food_security import zonal
+from food_security.zonal import (
+    rasterize_zones,
+    zonal_statistics,
+    zonal_statistics_blocks,
+    zones_overlap,
+)
+
+
+def test_zonal_statistics():
+    rng = np.random.default_rng(0)
+    labels = rng.integers(0, 6, (50, 40))
+    values = rng.normal(size=labels.shape).astype(np.float32)
+    values[rng.random(values.shape) < 0.1] = np.nan
+    values[labels == 5] = np.nan
+
+    table = zonal_statistics(labels, values, n_zones=6)
+
+    assert list(table.index) == list(range(6))
+    for zone in range(4):
+        zone_values = values[labels == zone + 1]
+        assert table.loc[zone, "count"] == np.count_nonzero(~np.isnan(zone_values))
+        assert table.loc[zone, "median"] == np.nanmedian(zone_values)
+        assert table.loc[zone, "min"] == np.nanmin(zone_values)
+        assert table.loc[zone, "max"] == np.nanmax(zone_values)
+        assert table.loc[zone, "sum"] == pytest.approx(np.nansum(zone_values))
+        assert table.loc[zone, "mean"] == pytest.approx(np.nanmean(zone_values))
+    # Zones without values
+    assert table.loc[4, "count"] == 0
+    assert np.isnan(table.loc[4, "median"])
+    assert table.loc[5, "count"] == 0
+
+
+def test_zonal_statistics_nodata():
+    labels = np.array([[1, 1, 2], [2, 2, 0]])
+    values = np.array([[1, -9, 4], [2, 3, 7]])
+    table = zonal_statistics(labels, values, 2, stats=["count", "median"], nodata=-9)
+    assert list(table.columns) == ["count", "median"]
+    assert table["count"].tolist() == [1, 3]
+    assert table["median"].tolist() == [1.0, 3.0]
+    with pytest.raises(ValueError, match="Unknown statistics"):
+        zonal_statistics(labels, values, 2, stats=["mode"])
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64, np.int16, np.int32])
+def test_zonal_statistics_blocks(monkeypatch, dtype):
+    rng = np.random.default_rng(0)
+    labels = rng.integers(0, 7, (60, 40))
+    values = (rng.normal(size=labels.shape) * 100).astype(dtype)
+    # Equal values and a zone with a single value
+    values[:5] = 3
+    labels[labels == 6] = 0
+    labels[0, 0] = 6
+    if np.issubdtype(dtype, np.floating):
+        values[rng.random(values.shape) < 0.1] = np.nan
+    blocks = [(labels[i : i + 7], values[i : i + 7]) for i in range(0, 60, 7)]
+    expected = zonal_statistics(labels, values, n_zones=7)
+
+    table = zonal_statistics_blocks(blocks, n_zones=7)
+    pd.testing.assert_frame_equal(table, expected)
+    # Few bins per zone take more passes over the blocks
+    monkeypatch.setattr(zonal, "MEDIAN_BINS", 1)
+    table = zonal_statistics_blocks(blocks, n_zones=7, stats=["median"])
+    pd.testing.assert_frame_equal(table, expected[["median"]])
+
+    with pytest.raises(ValueError, match="iterated more than once"):
+        zonal_statistics_blocks(iter(blocks), n_zones=7, stats=["median"])
+
+
+def test_rasterize_zones():
+    transform = from_origin(0, 4, 1, 1)
+    geometries = [box(0, 0, 2, 4), box(2, 0, 4, 2)]
+    labels = rasterize_zones(geometries, (4, 4), transform)
+    assert labels.tolist() == [
+        [1, 1, 0, 0],
+        [1, 1, 0, 0],
+        [1, 1, 2, 2],
+        [1, 1, 2, 2],
+    ]
+    assert not zones_overlap(geometries, (4, 4), transform)
+    assert zones_overlap([*geometries, box(1, 1, 3, 3)], (4, 4), transform)